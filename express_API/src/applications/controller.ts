@@ -584,6 +584,7 @@ export async function addInterviewQuestionData(
   questionEmotions: any[],
   questionEyeCheatingDurations: Array<any>,
   questionSpeakingCheatingDurations: Array<any>,
+  idempotencyKey?: string,
 ): Promise<void> {
   const questionData: InterviewQuestionData = {
     questionEyeCheating,
@@ -593,9 +594,36 @@ export async function addInterviewQuestionData(
     questionEyeCheatingDurations,
     questionSpeakingCheatingDurations,
   };
-  await Application.addInterviewQuestionData(applicationID, questionData).catch(
-    (err) => {
-      throw err;
-    },
+  await Application.addInterviewQuestionData(
+    applicationID,
+    questionData,
+    idempotencyKey,
+  ).catch((err) => {
+    throw err;
+  });
+}
+
+export async function addInterviewQuestionsData(
+  applicationID: string,
+  interviewQuestionsData: InterviewQuestionData[],
+  idempotencyKey?: string,
+): Promise<void> {
+  const questionsData: InterviewQuestionData[] = interviewQuestionsData.map(
+    (questionData) => ({
+      questionEyeCheating: questionData.questionEyeCheating,
+      questionFaceSpeechCheating: questionData.questionFaceSpeechCheating,
+      questionSimilarity: questionData.questionSimilarity,
+      questionEmotions: questionData.questionEmotions,
+      questionEyeCheatingDurations: questionData.questionEyeCheatingDurations,
+      questionSpeakingCheatingDurations:
+        questionData.questionSpeakingCheatingDurations,
+    }),
   );
+  await Application.addInterviewQuestionsData(
+    applicationID,
+    questionsData,
+    idempotencyKey,
+  ).catch((err) => {
+    throw err;
+  });
 }
@@ -56,6 +56,7 @@ export interface IApplication extends mongoose.Document {
   questionsCount?: number;
   quizEyeCheatingDurations?: Array<any>;
   quizSpeakingCheatingDurations?: Array<any>;
+  appliedKeys?: string[];
 }
 
 // Define the schema for the application collection
@@ -94,6 +95,8 @@ const applicationSchema = new Schema({
   questionsCount: { type: Number },
   quizEyeCheatingDurations: [{ type: Array }],
   quizSpeakingCheatingDurations: [{ type: Array }],
+  // Idempotency keys of the analysis results already added, so that a retried request is not added twice
+  appliedKeys: [{ type: String }],
 });
 
 // Create a mongoose model based on the schema
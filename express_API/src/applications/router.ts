@@ -1369,6 +1369,12 @@ applicationRoutes.post(
  *           type: string
  *         required: true
  *         description: The ID of the application
+ *       - in: header
+ *         name: Idempotency-Key
+ *         schema:
+ *           type: string
+ *         required: false
+ *         description: Key of the request, the data of a key already added is not added again
  *     requestBody:
  *       required: true
  *       content:
@@ -1443,6 +1449,7 @@ applicationRoutes.post(
         questionEmotions,
         questionEyeCheatingDurations,
         questionSpeakingCheatingDurations,
+        req.get('Idempotency-Key'),
       );
       res.status(200).send('Interview question data updated successfully');
     } catch (err) {
@@ -1455,6 +1462,113 @@ applicationRoutes.post(
   },
 );
 
+/**
+ * @swagger
+ * /application/{applicationID}/interviewQuestionsData:
+ *   post:
+ *     summary: Add the data of all the interview questions of a specific application in a single request
+ *     tags: [Application]
+ *     security:
+ *       - bearerAuth: []
+ *     parameters:
+ *       - in: path
+ *         name: applicationID
+ *         schema:
+ *           type: string
+ *         required: true
+ *         description: The ID of the application
+ *       - in: header
+ *         name: Idempotency-Key
+ *         schema:
+ *           type: string
+ *         required: false
+ *         description: Key of the request, the data of a key already added is not added again
+ *     requestBody:
+ *       required: true
+ *       content:
+ *         application/json:
+ *           schema:
+ *             type: object
+ *             properties:
+ *               questions:
+ *                 type: array
+ *                 items:
+ *                   type: object
+ *                   properties:
+ *                     questionEyeCheating:
+ *                       type: number
+ *                     questionFaceSpeechCheating:
+ *                       type: number
+ *                     questionSimilarity:
+ *                       type: number
+ *                     questionEmotions:
+ *                       type: array
+ *                       items:
+ *                         type: object
+ *                         properties:
+ *                           emotion:
+ *                             type: string
+ *                           ratio:
+ *                             type: number
+ *     responses:
+ *       200:
+ *         description: Interview questions data updated successfully
+ *       400:
+ *         description: Bad request, required parameters are missing
+ *       500:
+ *         description: Internal server error
+ */
+
+applicationRoutes.post(
+  '/:applicationID/interviewQuestionsData',
+  requireAuth,
+  requireAdmin,
+  async (req, res) => {
+    const applicationID = req.params.applicationID;
+    const { questions } = req.body;
+    if (
+      !Array.isArray(questions) ||
+      questions.some(
+        (question) =>
+          question === null ||
+          typeof question !== 'object' ||
+          [
+            'questionEyeCheating',
+            'questionFaceSpeechCheating',
+            'questionSimilarity',
+            'questionEmotions',
+            'questionEyeCheatingDurations',
+            'questionSpeakingCheatingDurations',
+          ].some(
+            (field) =>
+              typeof question[field] === 'undefined' ||
+              question[field] === null,
+          ),
+      )
+    ) {
+      return res
+        .status(400)
+        .send(
+          'questions with questionEyeCheating, questionFaceSpeechCheating, questionSimilarity, questionEyeCheatingDurations, questionSpeakingCheatingDurations , and questionEmotions are required',
+        );
+    }
+    try {
+      await Application.addInterviewQuestionsData(
+        applicationID,
+        questions,
+        req.get('Idempotency-Key'),
+      );
+      res.status(200).send('Interview questions data updated successfully');
+    } catch (err) {
+      if (err instanceof CodedError) {
+        res.status(err.code).send(err.message);
+      } else {
+        res.status(500).send(err);
+      }
+    }
+  },
+);
+
 // Config the .env file
 dotenv.config();
 
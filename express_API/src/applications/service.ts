@@ -1,5 +1,6 @@
 // application.service.ts
 
+import { FilterQuery } from 'mongoose';
 import { CodedError, ErrorCode, ErrorMessage } from '../util/error';
 import ApplicationModel, {
   IApplication,
@@ -205,9 +206,25 @@ export async function addQuizCheatingData(
   });
 }
 
+/**
+ * Filter of an update applied only once per idempotency key
+ * @param applicationID - The ID of the application to update
+ * @param idempotencyKey - The key of the update, if any
+ * @returns The filter matching the application if the key was not applied yet
+ */
+function idempotencyFilter(
+  applicationID: string,
+  idempotencyKey?: string,
+): FilterQuery<IApplication> {
+  return idempotencyKey
+    ? { _id: applicationID, appliedKeys: { $ne: idempotencyKey } }
+    : { _id: applicationID };
+}
+
 export async function addInterviewQuestionData(
   applicationID: string,
   interviewQuestionData: InterviewQuestionData,
+  idempotencyKey?: string,
 ): Promise<void> {
   const application = await ApplicationModel.findById(applicationID).catch(
     (error) => {
@@ -217,6 +234,10 @@ export async function addInterviewQuestionData(
   if (!application) {
     throw new Error('Application not found');
   }
+  // The data of this key was already added by a previous attempt
+  if (idempotencyKey && application.appliedKeys?.includes(idempotencyKey)) {
+    return;
+  }
   if (!application.totalSimilarity) {
     application.totalSimilarity = 0;
   }
@@ -237,12 +258,72 @@ export async function addInterviewQuestionData(
     application.totalSimilarity + interviewQuestionData.questionSimilarity;
   const newCount = application.questionsCount + 1;
   const newAverage = newTotal / newCount;
-  await ApplicationModel.findByIdAndUpdate(applicationID, {
-    $push: { interviewQuestionsData: interviewQuestionData },
-    totalSimilarity: newTotal,
-    questionsCount: newCount,
-    averageSimilarity: newAverage,
-  }).catch((error) => {
+  await ApplicationModel.findOneAndUpdate(
+    idempotencyFilter(applicationID, idempotencyKey),
+    {
+      $push: idempotencyKey
+        ? {
+            interviewQuestionsData: interviewQuestionData,
+            appliedKeys: idempotencyKey,
+          }
+        : { interviewQuestionsData: interviewQuestionData },
+      totalSimilarity: newTotal,
+      questionsCount: newCount,
+      averageSimilarity: newAverage,
+    },
+  ).catch((error) => {
+    throw error;
+  });
+}
+
+export async function addInterviewQuestionsData(
+  applicationID: string,
+  interviewQuestionsData: InterviewQuestionData[],
+  idempotencyKey?: string,
+): Promise<void> {
+  const application = await ApplicationModel.findById(applicationID).catch(
+    (error) => {
+      throw error;
+    },
+  );
+  if (!application) {
+    throw new Error('Application not found');
+  }
+  // The data of this key was already added by a previous attempt
+  if (idempotencyKey && application.appliedKeys?.includes(idempotencyKey)) {
+    return;
+  }
+  if (!application.interviewQuestionsData) {
+    throw new CodedError(
+      ErrorMessage.interviewQuestionDataIsNotAvailable,
+      ErrorCode.NotFound,
+    );
+  }
+  let newTotal = application.totalSimilarity || 0;
+  interviewQuestionsData.forEach((interviewQuestionData) => {
+    if (!interviewQuestionData.questionSimilarity) {
+      interviewQuestionData.questionSimilarity = 0;
+    }
+    newTotal += interviewQuestionData.questionSimilarity;
+  });
+  // Update the total and count once for all the questions
+  const newCount =
+    (application.questionsCount || 0) + interviewQuestionsData.length;
+  const newAverage = newCount ? newTotal / newCount : 0;
+  await ApplicationModel.findOneAndUpdate(
+    idempotencyFilter(applicationID, idempotencyKey),
+    {
+      $push: idempotencyKey
+        ? {
+            interviewQuestionsData: { $each: interviewQuestionsData },
+            appliedKeys: idempotencyKey,
+          }
+        : { interviewQuestionsData: { $each: interviewQuestionsData } },
+      totalSimilarity: newTotal,
+      questionsCount: newCount,
+      averageSimilarity: newAverage,
+    },
+  ).catch((error) => {
     throw error;
   });
 }
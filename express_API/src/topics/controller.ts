@@ -52,3 +52,41 @@ export async function addTopic(
   };
   return topicData;
 }
+
+// Add several new topics, skipping the ones that already exist
+
+export async function addTopics(
+  topics: TopicData[],
+): Promise<{ created: string[]; existing: string[] }> {
+  const existing = await Topic.getExistingTopicsNames(
+    topics.map((topic) => topic.name),
+  ).catch((error) => {
+    throw error;
+  });
+  const newTopics = topics.filter((topic) => !existing.includes(topic.name));
+  const created = await Topic.addTopics(newTopics).catch((error) => {
+    throw error;
+  });
+  return { created: created.map((topic) => topic.name), existing };
+}
+
+// Add questions to an existing topic
+
+export async function addTopicQuestions(
+  topicName: string,
+  questions: QuestionData[],
+): Promise<TopicData> {
+  const topic = await Topic.addTopicQuestions(topicName, questions).catch(
+    (error) => {
+      throw error;
+    },
+  );
+  if (!topic) {
+    throw new CodedError(ErrorMessage.TopicNotFound, ErrorCode.NotFound);
+  }
+  const topicData: TopicData = {
+    name: topic.name,
+    questions: topic.questions,
+  };
+  return topicData;
+}
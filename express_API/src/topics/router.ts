@@ -167,4 +167,141 @@ topicRoutes.post('/', requireAuth, requireAdmin, async (req, res) => {
   }
 });
 
+/**
+ * @swagger
+ * /topic/bulk:
+ *   post:
+ *     summary: Add several new topics in a single request
+ *     tags: [Topic]
+ *     security:
+ *       - bearerAuth: []
+ *     requestBody:
+ *       required: true
+ *       content:
+ *         application/json:
+ *           schema:
+ *             type: object
+ *             required:
+ *               - topics
+ *             properties:
+ *               topics:
+ *                 type: array
+ *                 items:
+ *                   $ref: '#/components/schemas/TopicData'
+ *     responses:
+ *       201:
+ *         description: The names of the created topics and of the topics that already existed
+ *         content:
+ *           application/json:
+ *             schema:
+ *               type: object
+ *               properties:
+ *                 created:
+ *                   type: array
+ *                   items:
+ *                     type: string
+ *                 existing:
+ *                   type: array
+ *                   items:
+ *                     type: string
+ *       400:
+ *         description: topics parameter is required
+ *       500:
+ *         description: Internal Server Error
+ */
+topicRoutes.post('/bulk', requireAuth, requireAdmin, async (req, res) => {
+  try {
+    const topics = req.body.topics;
+    if (
+      !topics ||
+      !Array.isArray(topics) ||
+      topics.some((topic) => !topic.name || !Array.isArray(topic.questions))
+    ) {
+      return res
+        .status(400)
+        .send('topics parameter with names and questions is required');
+    }
+    const result = await Topic.addTopics(topics);
+    res.status(201).json(result);
+  } catch (error) {
+    if (error instanceof CodedError) {
+      res.status(error.code).send(error.message);
+    } else {
+      res.status(500).send('Internal Server Error');
+    }
+  }
+});
+
+/**
+ * @swagger
+ * /topic/{topicName}/questions:
+ *   post:
+ *     summary: Add questions to an existing topic
+ *     tags: [Topic]
+ *     security:
+ *       - bearerAuth: []
+ *     parameters:
+ *       - in: path
+ *         name: topicName
+ *         schema:
+ *           type: string
+ *         required: true
+ *         description: The name of the topic
+ *     requestBody:
+ *       required: true
+ *       content:
+ *         application/json:
+ *           schema:
+ *             type: object
+ *             required:
+ *               - questions
+ *             properties:
+ *               questions:
+ *                 type: array
+ *                 items:
+ *                   type: object
+ *                   properties:
+ *                     question:
+ *                       type: array
+ *                       items:
+ *                         type: string
+ *                     answer:
+ *                       type: string
+ *     responses:
+ *       200:
+ *         description: The updated topic
+ *         content:
+ *           application/json:
+ *             schema:
+ *               $ref: '#/components/schemas/TopicData'
+ *       400:
+ *         description: questions parameter is required
+ *       404:
+ *         description: Topic not found
+ *       500:
+ *         description: Internal Server Error
+ */
+topicRoutes.post(
+  '/:topicName/questions',
+  requireAuth,
+  requireAdmin,
+  async (req, res) => {
+    try {
+      const topicName = req.params.topicName;
+      const questions = req.body.questions;
+      if (!questions || !Array.isArray(questions)) {
+        return res.status(400).send('questions parameter is required');
+      }
+      const topic = await Topic.addTopicQuestions(topicName, questions);
+      res.status(200).json(topic);
+    } catch (error) {
+      if (error instanceof CodedError) {
+        res.status(error.code).send(error.message);
+      } else {
+        res.status(500).send('Internal Server Error');
+      }
+    }
+  },
+);
+
 export default topicRoutes;
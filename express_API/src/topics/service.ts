@@ -39,6 +39,59 @@ export async function addTopic(
   });
 }
 
+/**
+ * Adds several new topics to the database in a single write.
+ * @param topics The names and questions of the topics to add.
+ * @returns The newly created topic documents.
+ */
+
+export async function addTopics(
+  topics: Array<{ name: string; questions: Array<QuestionData> }>,
+): Promise<ITopic[]> {
+  return TopicModel.insertMany(topics).catch((error) => {
+    throw error;
+  });
+}
+
+/**
+ * Retrieves the names of the given topics that exist in the database.
+ * @param topicNames The names of the topics to look for.
+ * @returns The names of the existing topics.
+ */
+
+export async function getExistingTopicsNames(
+  topicNames: string[],
+): Promise<string[]> {
+  const topics = await TopicModel.find(
+    { name: { $in: topicNames } },
+    { name: 1 },
+  ).catch((error) => {
+    throw error;
+  });
+  return topics.map((topic) => topic.name);
+}
+
+/**
+ * Appends questions to an existing topic.
+ * @param topicName The name of the topic to update.
+ * @param questions The questions to append to the topic.
+ * @returns The updated topic document if found, otherwise null.
+ */
+
+export async function addTopicQuestions(
+  topicName: string,
+  questions: Array<QuestionData>,
+): Promise<ITopic | null> {
+  return TopicModel.findOneAndUpdate(
+    { name: topicName },
+    // Skip the questions already in the topic, so that a retried request does not add them twice
+    { $addToSet: { questions: { $each: questions } } },
+    { new: true },
+  ).catch((error) => {
+    throw error;
+  });
+}
+
 /**
  * Deletes a topic from the database by its name.
  * @param topicName The name of the topic to delete.
@@ -0,0 +1,234 @@
+import os
+import sys
+import socket
+import secrets
+import argparse
+import ipaddress
+import threading
+import multiprocessing
+from multiprocessing.connection import Listener, Client
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Add the directory path of Interview.py and Quiz.py to the Python path
+sys.path.append(os.path.abspath('models/HireUp_Interview/'))
+
+
+def get_address():
+    """Address of the analysis service, read from the environment."""
+    return (os.getenv('ANALYSIS_SERVICE_HOST', 'localhost'), int(os.getenv('ANALYSIS_SERVICE_PORT', 6001)))
+
+def get_authkey():
+    """Key authenticating the socket processes to the analysis service, read from the environment, or None if it is not set."""
+    key = os.getenv('ANALYSIS_SERVICE_KEY')
+    return key.encode() if key else None
+
+def is_loopback(host):
+    """Whether a host only accepts the connections of this machine."""
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+def ensure_authkey():
+    """
+    Generate a random key for an analysis service listening on this machine only, unless one is configured.
+    The key is set in the environment, so the analysis service and the socket processes started afterwards share it.
+    A service reachable from other machines needs an explicit ANALYSIS_SERVICE_KEY.
+
+    Returns:
+    - bool: True if there is a key, False otherwise.
+    """
+    if get_authkey() is None and is_loopback(get_address()[0]):
+        os.environ['ANALYSIS_SERVICE_KEY'] = secrets.token_hex(32)
+    return get_authkey() is not None
+
+def get_workers():
+    """Number of pre-warmed workers of the analysis service, read from the environment."""
+    return int(os.getenv('ANALYSIS_WORKERS', 2))
+
+
+def warm_up():
+    """Import the analysis modules and load the models once, when a worker starts."""
+    import Interview
+    import Similarity
+    import VAD
+    import ASR
+
+    print(f'Warming up analysis worker {os.getpid()}')
+    for load in (Interview.loadSvmModel, Similarity.loadModel, VAD.loadModel, ASR.get_recognizer):
+        try:
+            load()
+        except BaseException as e:
+            # Let the job load it again, and report the error
+            print(f'Could not load {load.__module__}.{load.__name__} in worker {os.getpid()}: {e}')
+
+def run_job(kind, params):
+    """
+    Run an analysis job in a worker.
+
+    Parameters:
+    - kind (str): 'interview' for an interview question, 'quiz' for a quiz, 'references' for the correct answers of a job,
+      'similarities' for the answers of all the questions of an interview.
+    - params (dict): The arguments of Interview.Interview, Quiz.Quiz, Similarity.precomputeReferenceEmbeddings or Similarity.getSimilarities.
+
+    Returns:
+    - The interview question data or the quiz cheating data, as sent to the Express server, the number of correct answers embedded,
+      or the list of similarities. The interview question data of a question without correct answers has its applicantAnswers
+      instead of its questionSimilarity, to be scored with the other questions of the interview.
+    """
+    import Interview
+    import Quiz
+    import Similarity
+
+    try:
+        if kind == 'references':
+            return Similarity.precomputeReferenceEmbeddings(**params)
+        if kind == 'similarities':
+            return [float(similarity) for similarity in Similarity.getSimilarities(**params)]
+        if kind == 'interview':
+            results = Interview.Interview(**params)
+            questionData = Interview.get_interview_question_data(*results[:6])
+            if params.get('correctAnswers') is None:
+                questionData['applicantAnswers'] = results[6]
+            return questionData
+        if kind == 'quiz':
+            return Quiz.get_quiz_cheating_data(*Quiz.Quiz(**params))
+    except SystemExit as e:
+        # The analysis modules exit when a model cannot be loaded, which must not stop the worker
+        raise RuntimeError(f'Analysis exited with status {e.code}')
+    raise ValueError(f"Unknown analysis job kind '{kind}'")
+
+
+class AnalysisService:
+    """
+    Long-lived service running the interview and quiz analyses on a pool of pre-warmed workers.
+
+    The workers import the analysis modules and load the models once, and keep them resident between jobs.
+    Each connection submits one job and receives its result, so the jobs of several connections run in parallel
+    on the workers.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.executor = self.create_executor()
+
+    def create_executor(self):
+        # Spawn the workers so that they do not inherit the state of the service
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=warm_up)
+        # Start and warm up all the workers now instead of on the first jobs
+        for _ in range(self.workers):
+            executor.submit(os.getpid)
+        return executor
+
+    def submit(self, kind, params):
+        with self.lock:
+            try:
+                return self.executor.submit(run_job, kind, params)
+            except BrokenProcessPool:
+                # A worker died, e.g. out of memory, replace the pool
+                print('Analysis workers broken, restarting them')
+                self.executor = self.create_executor()
+                return self.executor.submit(run_job, kind, params)
+
+    def handle(self, connection):
+        try:
+            kind, params = connection.recv()
+            print(f'Running {kind} analysis of {params.get("videoPath", "the answers")}')
+            try:
+                result = ('ok', self.submit(kind, params).result())
+            except Exception as e:
+                print(f'{kind} analysis of {params.get("videoPath", "the answers")} failed: {e}')
+                result = ('error', str(e))
+            connection.send(result)
+        except (EOFError, OSError) as e:
+            print(f'Connection to the analysis service lost: {e}')
+        finally:
+            connection.close()
+
+    def serve(self, address, authkey):
+        with Listener(address, authkey=authkey) as listener:
+            print(f'Analysis service listening on {address[0]}:{address[1]} with {self.workers} workers')
+            while True:
+                try:
+                    connection = listener.accept()
+                except Exception as e:
+                    # e.g. a client with the wrong key
+                    print(f'Rejected connection to the analysis service: {e}')
+                    continue
+                threading.Thread(target=self.handle, args=(connection,), daemon=True).start()
+
+
+def submit_jobs(kind, paramsList):
+    """
+    Run analysis jobs on the analysis service, in parallel, and wait for their results.
+
+    Parameters:
+    - kind (str): 'interview' for interview questions, 'quiz' for quizzes, 'references' for correct answers, 'similarities' for answers.
+    - paramsList (list): The arguments of each job.
+
+    Returns:
+    - list: The result of each job, or None for the jobs that could not run on the service.
+    """
+    authkey = get_authkey()
+    if authkey is None:
+        print('Analysis service unavailable: ANALYSIS_SERVICE_KEY is not set')
+        return [None] * len(paramsList)
+
+    connections = []
+    for params in paramsList:
+        try:
+            connection = Client(get_address(), authkey=authkey)
+            connection.send((kind, params))
+        except Exception as e:
+            print(f'Analysis service unavailable: {e}')
+            connection = None
+        connections.append(connection)
+
+    results = []
+    for connection in connections:
+        result = None
+        if connection is not None:
+            try:
+                status, value = connection.recv()
+                if status == 'ok':
+                    result = value
+                else:
+                    print(f'Analysis failed on the analysis service: {value}')
+            except (EOFError, OSError) as e:
+                print(f'Connection to the analysis service lost: {e}')
+            finally:
+                connection.close()
+        results.append(result)
+    return results
+
+def submit_job(kind, params):
+    """
+    Run an analysis job on the analysis service and wait for its result.
+
+    Parameters:
+    - kind (str): 'interview' for an interview question, 'quiz' for a quiz, 'references' for the correct answers of a job,
+      'similarities' for the answers of all the questions of an interview.
+    - params (dict): The arguments of the job.
+
+    Returns:
+    - dict: The result of the job, or None if it could not run on the service.
+    """
+    return submit_jobs(kind, [params])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the analysis service.')
+    parser.add_argument('--workers', type=int, default=get_workers(), help='Number of pre-warmed analysis workers')
+    args = parser.parse_args()
+
+    # The service runs the jobs it unpickles, so it only accepts the clients knowing the key
+    authkey = get_authkey()
+    if authkey is None:
+        sys.exit('ANALYSIS_SERVICE_KEY must be set to run the analysis service')
+
+    AnalysisService(args.workers).serve(get_address(), authkey)
+
+if __name__ == '__main__':
+    main()
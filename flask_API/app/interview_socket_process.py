@@ -2,8 +2,20 @@ from flask import Flask
 from flask_socketio import SocketIO
 import os
 import argparse
+import sys
 import json  # Import json module
 import subprocess
+from dotenv import load_dotenv
+
+# Add the directory path of Express_Outbox.py to the Python path
+sys.path.append(os.path.abspath('models/'))
+import Express_Outbox
+
+# Add the directory path of Online_Analysis.py to the Python path
+sys.path.append(os.path.abspath('models/HireUp_Interview/'))
+import Online_Analysis
+
+import analysis_service
 
 
 
@@ -21,6 +33,8 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 VIDEO_OUTPUT_DIR = 'interview_video'
 question_counter = 0
 video_writer = None
+online_analysis = None
+online_analyses = []
 
 print(f'Running interview socket process on port {args.port} with ApplicationID {args.ApplicationID} and questions {args.questions}')
 
@@ -72,7 +86,7 @@ def handle_connect():
 
 @socketio.on('videoChunk')
 def handle_video_chunk(chunk):
-    global video_writer
+    global video_writer, online_analysis
     try:
         if video_writer is None:
             # Create a writable stream for the video file
@@ -80,11 +94,17 @@ def handle_video_chunk(chunk):
             video_file_name = f'{args.ApplicationID}_{question_counter}.webm'
             video_output_path = os.path.join(VIDEO_OUTPUT_DIR, video_file_name)
             video_writer = open(video_output_path, 'ab')  # Open in append binary mode
+            if Online_Analysis.ONLINE_ANALYSIS:
+                online_analysis = Online_Analysis.OnlineAnalysis()
         
         # Write the chunk data to the video file
         video_writer.write(chunk)
         video_writer.flush()
 
+        # Analyze the chunk while the question is recorded
+        if online_analysis:
+            online_analysis.feed(chunk)
+
     except Exception as e:
         print(f'Error processing video chunk: {e}')
 
@@ -96,40 +116,114 @@ def finalize_video(file_name):
     os.remove(input_path)  # Remove the original corrupted file
     os.rename(output_path, input_path)  # Rename the finalized file to the original name
     
+def finalize_question_video():
+    global video_writer, online_analysis
+    file_name = f'{args.ApplicationID}_{question_counter}.webm'
+    if online_analysis:
+        online_analysis.end_stream()
+    finalize_video(file_name)
+    print(f'Video file saved')
+    video_writer = None
+    # The online analysis saves its results next to the video in the background
+    if online_analysis:
+        online_analysis.finish(os.path.join(VIDEO_OUTPUT_DIR, file_name))
+        online_analyses.append(online_analysis)
+        online_analysis = None
+
 @socketio.on('nextQuestion')
 def handle_next_question():
-    global video_writer
     # Save the video file when the client requests the next question
     if video_writer:
         video_writer.close()
-        finalize_video(f'{args.ApplicationID}_{question_counter}.webm')
-        print(f'Video file saved')
-        video_writer = None
+        finalize_question_video()
     send_question()
     
 
+def score_answers(pairs, env):
+    """
+    Score the answers of the questions analyzed by the analysis service, on the service or else in a separate process,
+    so that this process never loads the word vectors.
+
+    Parameters:
+    - pairs (list): The (applicant answer, correct answer) pairs.
+    - env (dict): The environment of the scoring process.
+
+    Returns:
+    - list: The similarity of each pair, 0 for all of them if they could not be scored, so that the other results are still sent.
+    """
+    similarities = analysis_service.submit_job('similarities', {'pairs': pairs})
+    if similarities is not None:
+        return similarities
+
+    pairs_path = os.path.join(VIDEO_OUTPUT_DIR, f'{args.ApplicationID}_pairs.json')
+    results_path = os.path.join(VIDEO_OUTPUT_DIR, f'{args.ApplicationID}_similarities.json')
+    try:
+        with open(pairs_path, 'w') as f:
+            json.dump(pairs, f)
+        process = subprocess.run(['python', 'models/HireUp_Interview/Similarity.py', f'--pairsPath={pairs_path}', f'--resultsPath={results_path}'],
+                                 env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        print("SIMILARITY:", process.stdout.decode())
+        if process.returncode == 0:
+            with open(results_path, 'r') as f:
+                return json.load(f)
+    except (Exception, SystemExit) as e:
+        print(f'Scoring the answers failed: {e}')
+    finally:
+        for path in (pairs_path, results_path):
+            if os.path.exists(path):
+                os.remove(path)
+    print('Answers could not be scored, sending the results with a similarity of 0')
+    return [0.0] * len(pairs)
+
 @socketio.on('disconnect')
 def handle_disconnect():
-    global video_writer
     print('Client disconnected')
     if video_writer:
         # Close the video writer when the client disconnects
         video_writer.close()
-        finalize_video(f'{args.ApplicationID}_{question_counter}.webm')
-        print(f'Video file saved')
-        video_writer = None
+        finalize_question_video()
     
+    # Wait for the online analyses to save their landmarks and speech intervals next to the videos, the offline analysis
+    # computes them for the analyses that did not finish in time
+    for analysis in online_analyses:
+        analysis.wait(Online_Analysis.ONLINE_ANALYSIS_TIMEOUT)
+
     env = os.environ.copy()
     current_directory = os.getcwd()
     env['PYTHONPATH'] = current_directory
-    # Run the interview process for each question
-    
+    # Run the analyses of all the questions in parallel on the analysis service, leaving their answers unscored
+    jobs = []
     for i in range(question_counter):
         video_file_name = f'{args.ApplicationID}_{i+1}.webm'
+        jobs.append({
+            'videoPath': os.path.join(VIDEO_OUTPUT_DIR, video_file_name),
+            'topLeftImagePath': f'interview_calibration/{args.ApplicationID}_UpLeft.png',
+            'topRightImagePath': f'interview_calibration/{args.ApplicationID}_UpRight.png',
+            'bottomRightImagePath': f'interview_calibration/{args.ApplicationID}_DownRight.png',
+            'bottomLeftImagePath': f'interview_calibration/{args.ApplicationID}_DownLeft.png',
+            'correctAnswers': None,
+        })
+    serviceResults = analysis_service.submit_jobs('interview', jobs)
+
+    # Score the answers of all the questions analyzed by the service in a single batch
+    analyzed = [i for i in range(question_counter) if serviceResults[i] is not None]
+    pairs = [(serviceResults[i].pop('applicantAnswers', ''), answer_list[i]) for i in analyzed]
+    similarities = score_answers(pairs, env) if pairs else []
+    for i, similarity in zip(analyzed, similarities):
+        serviceResults[i]['questionSimilarity'] = similarity
+
+    # Run the interview process for the questions the analysis service could not analyze, and collect the results
+    questionsData = []
+    for i in range(question_counter):
+        if serviceResults[i] is not None:
+            questionsData.append(serviceResults[i])
+            continue
+        video_file_name = f'{args.ApplicationID}_{i+1}.webm'
         video_output_path = os.path.join(VIDEO_OUTPUT_DIR, video_file_name)
-        command = f'python models/HireUp_Interview/Interview.py --videoPath={video_output_path} --upLeftImagePath=interview_calibration/{args.ApplicationID}_UpLeft.png --upRightImagePath=interview_calibration/{args.ApplicationID}_UpRight.png --downRightImagePath=interview_calibration/{args.ApplicationID}_DownRight.png --downLeftImagePath=interview_calibration/{args.ApplicationID}_DownLeft.png --correctAnswer="{answer_list[i]}" --applicationID={args.ApplicationID}'        
+        results_path = os.path.splitext(video_output_path)[0] + '.json'
+        command = f'python models/HireUp_Interview/Interview.py --videoPath={video_output_path} --upLeftImagePath=interview_calibration/{args.ApplicationID}_UpLeft.png --upRightImagePath=interview_calibration/{args.ApplicationID}_UpRight.png --downRightImagePath=interview_calibration/{args.ApplicationID}_DownRight.png --downLeftImagePath=interview_calibration/{args.ApplicationID}_DownLeft.png --correctAnswer="{answer_list[i]}" --applicationID={args.ApplicationID} --resultsPath={results_path}'        
         
-        process = subprocess.run(command, shell=True, check=True, env= env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        process = subprocess.run(command, shell=True, env= env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
         # Get the standard output and error
         stdout = process.stdout.decode()
@@ -138,6 +232,18 @@ def handle_disconnect():
         # Optionally, print them
         print("STDOUT:", stdout)
         print("STDERR:", stderr)
+
+        if process.returncode != 0 or not os.path.exists(results_path):
+            print(f'Interview analysis of question {i+1} failed')
+            continue
+        with open(results_path, 'r') as f:
+            questionsData.append(json.load(f))
+        os.remove(results_path)
+
+    # Queue the data of all the questions, the outbox flusher sends it to the Express server in a single request
+    load_dotenv()
+    if questionsData:
+        Express_Outbox.enqueue('interviewQuestionsData', args.ApplicationID, questionsData)
     exit(0)
     
 
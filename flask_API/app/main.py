@@ -6,17 +6,42 @@ import sys
 import os
 import base64
 import json
+import threading
 
 from io import BytesIO
 from PIL import Image, ImageFile
+from dotenv import load_dotenv
 
 
 # Add the directory path of Eye_Cheating.py to the Python path
 sys.path.append(os.path.abspath('models/HireUp_Interview/'))
 from Eye_Cheating import calibration
 
+# Add the directory path of Express_Outbox.py to the Python path
+sys.path.append(os.path.abspath('models/'))
+import Express_Outbox
+
+import analysis_service
+
 app = Quart(__name__)
 
+@app.before_serving
+async def start_outbox_flusher():
+    # Send the analysis results queued by the socket processes in the background
+    load_dotenv()
+    Express_Outbox.start_flusher()
+
+@app.before_serving
+async def start_analysis_service():
+    # Run the analyses of the socket processes on pre-warmed workers
+    load_dotenv()
+    if int(os.getenv('ANALYSIS_WORKERS', 2)) > 0:
+        # Share a key between the analysis service and the socket processes started by this app
+        if analysis_service.ensure_authkey():
+            run_analysis_service()
+        else:
+            print("Not running the analysis service: set ANALYSIS_SERVICE_KEY for a service reachable from other machines")
+
 def find_free_port():
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     s.bind(('', 0))
@@ -100,6 +125,33 @@ def run_QG_client_process(port):
     with open(log_file_path, 'w') as log_file:
         subprocess.Popen(command, shell=True, env=env, stdout=log_file, stderr=subprocess.STDOUT)
 
+def run_analysis_service():
+    """Run the analysis service and log the output."""
+    # Ensure the current directory (project root) is in the PYTHONPATH
+    env = os.environ.copy()
+    current_directory = os.getcwd()
+    env['PYTHONPATH'] = current_directory
+    
+    # Ensure the logs directory exists
+    logs_directory = os.path.join(current_directory, 'logs')
+    if not os.path.exists(logs_directory):
+        os.makedirs(logs_directory)
+        
+    print("Running analysis service")
+    
+    command = 'python app/analysis_service.py'
+    
+    # Define log file path
+    log_file_path = os.path.join(logs_directory, 'analysis_service.log')
+    with open(log_file_path, 'w') as log_file:
+        subprocess.Popen(command, shell=True, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+def precompute_reference_embeddings(questions):
+    """Embed the correct answers of the questions on the analysis service in the background, before the interview is scored."""
+    answers = [question.get('answer') for question in questions or [] if isinstance(question, dict) and question.get('answer')]
+    if answers:
+        threading.Thread(target=analysis_service.submit_job, args=('references', {'answers': answers}), daemon=True).start()
+
 def save_calibration_images(pictureUpRight, pictureUpLeft, pictureDownRight, pictureDownLeft, ApplicationID, isQuiz):
     # Base directory where images will be saved
     base_dir = "quiz_calibration" if isQuiz else "interview_calibration"
@@ -147,6 +199,7 @@ async def interview_new_socket():
         return jsonify({'error': 'ApplicationID is required'}), 400
     port = find_free_port()
     run_socket_process(port, application_id, is_quiz, questions)
+    precompute_reference_embeddings(questions)
     ip_address = socket.gethostbyname(socket.gethostname())
     return jsonify({'ip_address': ip_address, 'port': port})
 
@@ -5,6 +5,17 @@ import argparse
 import json  # Import json module
 import sys
 import subprocess
+from dotenv import load_dotenv
+
+# Add the directory path of Online_Analysis.py to the Python path
+sys.path.append(os.path.abspath('models/HireUp_Interview/'))
+import Online_Analysis
+
+# Add the directory path of Express_Outbox.py to the Python path
+sys.path.append(os.path.abspath('models/'))
+import Express_Outbox
+
+import analysis_service
 
 
 
@@ -20,6 +31,7 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 
 VIDEO_OUTPUT_DIR = 'quiz_video'
 video_writer = None
+online_analysis = None
 
 print(f'Running quiz socket process on port {args.port} with ApplicationID {args.ApplicationID}')
 
@@ -29,7 +41,7 @@ def handle_connect():
 
 @socketio.on('videoChunk')
 def handle_video_chunk(chunk):
-    global video_writer
+    global video_writer, online_analysis
     try:
         if video_writer is None:
             # Create a writable stream for the video file
@@ -37,11 +49,17 @@ def handle_video_chunk(chunk):
             video_file_name = f'{args.ApplicationID}.webm'
             video_output_path = os.path.join(VIDEO_OUTPUT_DIR, video_file_name)
             video_writer = open(video_output_path, 'ab')  # Open in append binary mode
+            if Online_Analysis.ONLINE_ANALYSIS:
+                online_analysis = Online_Analysis.OnlineAnalysis()
         
         # Write the chunk data to the video file
         video_writer.write(chunk)
         video_writer.flush()
 
+        # Analyze the chunk while the quiz is recorded
+        if online_analysis:
+            online_analysis.feed(chunk)
+
     except Exception as e:
         print(f'Error processing video chunk: {e}')
 
@@ -62,17 +80,41 @@ def handle_disconnect():
     if video_writer:
         # Close the video writer when the client disconnects
         video_writer.close()
+        if online_analysis:
+            online_analysis.end_stream()
         finalize_video(f'{args.ApplicationID}.webm')
         print(f'Video file saved')
         video_writer = None
+
+        # Wait for the online analysis to save its landmarks and speech intervals next to the video, the offline analysis
+        # computes them if it does not finish in time
+        if online_analysis:
+            online_analysis.finish(os.path.join(VIDEO_OUTPUT_DIR, f'{args.ApplicationID}.webm'))
+            online_analysis.wait(Online_Analysis.ONLINE_ANALYSIS_TIMEOUT)
         
+        video_file_name = f'{args.ApplicationID}.webm'
+        video_output_path = os.path.join(VIDEO_OUTPUT_DIR, video_file_name)
+
+        # Run the quiz analysis on the analysis service
+        quizData = analysis_service.submit_job('quiz', {
+            'videoPath': video_output_path,
+            'topLeftImagePath': f'quiz_calibration/{args.ApplicationID}_UpLeft.png',
+            'topRightImagePath': f'quiz_calibration/{args.ApplicationID}_UpRight.png',
+            'bottomRightImagePath': f'quiz_calibration/{args.ApplicationID}_DownRight.png',
+            'bottomLeftImagePath': f'quiz_calibration/{args.ApplicationID}_DownLeft.png',
+        })
+        if quizData is not None:
+            # Queue the quiz cheating data, the outbox flusher sends it to the Express server
+            load_dotenv()
+            Express_Outbox.enqueue('quizCheatingData', args.ApplicationID, quizData)
+            print("Exiting after running the quiz process.")
+            exit(0)
+
         env = os.environ.copy()
         current_directory = os.getcwd()
         env['PYTHONPATH'] = current_directory
         
-    # Run the quiz process
-        video_file_name = f'{args.ApplicationID}.webm'
-        video_output_path = os.path.join(VIDEO_OUTPUT_DIR, video_file_name)
+    # Run the quiz process if the analysis service is unavailable
         command = f'python models/HireUp_interview/Quiz.py --videoPath={video_output_path} --upLeftImagePath=quiz_calibration/{args.ApplicationID}_UpLeft.png --upRightImagePath=quiz_calibration/{args.ApplicationID}_UpRight.png --downRightImagePath=quiz_calibration/{args.ApplicationID}_DownRight.png --downLeftImagePath=quiz_calibration/{args.ApplicationID}_DownLeft.png --applicationID={args.ApplicationID}'        
         
         process = subprocess.run(command, shell=True, env=env, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
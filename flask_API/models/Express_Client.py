@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import threading
+import requests
+from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+
+# File where the bearer token is shared between the processes of this machine
+TOKEN_FILE = os.getenv('EXPRESS_TOKEN_FILE', os.path.join('logs', 'express_token.json'))
+
+# Number of seconds a token is reused before logging in again
+TOKEN_TTL = int(os.getenv('EXPRESS_TOKEN_TTL', 3600))
+
+# Maximum number of attempts while waiting for the Express server, and maximum delay between two attempts
+WAIT_ATTEMPTS = int(os.getenv('EXPRESS_WAIT_ATTEMPTS', 10))
+MAX_BACKOFF = float(os.getenv('EXPRESS_MAX_BACKOFF', 10))
+
+# Timeout of a single request, in seconds
+REQUEST_TIMEOUT = float(os.getenv('EXPRESS_REQUEST_TIMEOUT', 30))
+
+def idempotency_headers(idempotency_key):
+    """
+    Get the headers letting the Express server ignore a request it already applied.
+
+    Parameters:
+    - idempotency_key (str): The key of the request, or None.
+
+    Returns:
+    - dict: The headers of the request.
+    """
+    return {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+
+class ExpressClient:
+    """
+    Client of the Express server shared by the analysis and topic population processes.
+
+    It keeps a pool of connections to the server, caches the bearer token (in memory and in TOKEN_FILE,
+    so processes started one after another log in only once) and refreshes it when the server rejects it.
+    Requests are retried with a bounded exponential backoff.
+    """
+
+    def __init__(self, address=None, email=None, password=None, pool_size=10):
+        self.address = (address or os.getenv('EXPRESS_SERVER_ADDRESS', 'http://localhost:3000')).strip().rstrip('/')
+        self.email = (email or os.getenv('EXPRESS_SERVER_EMAIL', 'email@example.com')).strip()
+        self.password = (password or os.getenv('EXPRESS_SERVER_PASSWORD', 'password')).strip()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.token = None
+        self.token_time = 0
+        self.lock = threading.Lock()
+
+    def wait_for_server(self, max_attempts=WAIT_ATTEMPTS, max_delay=MAX_BACKOFF):
+        """
+        Wait for the Express server to answer, with a bounded exponential backoff.
+
+        Parameters:
+        - max_attempts (int): The maximum number of attempts.
+        - max_delay (float): The maximum delay between two attempts, in seconds.
+
+        Returns:
+        - bool: True if the server answered, False if it is still unavailable after all the attempts.
+        """
+        delay = 0.5
+        for attempt in range(max_attempts):
+            try:
+                response = self.session.get(self.address, timeout=REQUEST_TIMEOUT)
+                if response.status_code == 200:
+                    print("Express server started.")
+                    return True
+            except requests.exceptions.RequestException:
+                pass
+            print(f"Waiting for the Express server to start... ({attempt + 1}/{max_attempts})")
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+        print("Express server is unavailable.")
+        return False
+
+    def read_token_file(self):
+        """
+        Read the token shared by the other processes if it is still fresh.
+
+        Returns:
+        - bool: True if a fresh token was read, False otherwise.
+        """
+        try:
+            with open(TOKEN_FILE, 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if cached.get('address') != self.address or cached.get('email') != self.email or time.time() - cached.get('time', 0) > TOKEN_TTL:
+            return False
+        self.token = cached['token']
+        self.token_time = cached['time']
+        return True
+
+    def write_token_file(self):
+        """
+        Share the current token with the other processes.
+        """
+        try:
+            os.makedirs(os.path.dirname(TOKEN_FILE) or '.', exist_ok=True)
+            temp_path = f'{TOKEN_FILE}.{os.getpid()}.tmp'
+            with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+                json.dump({'address': self.address, 'email': self.email, 'token': self.token, 'time': self.token_time}, f)
+            os.replace(temp_path, TOKEN_FILE)
+        except OSError as e:
+            print(f"Could not cache the Express token: {e}")
+
+    def login(self, force=False):
+        """
+        Get a bearer token, logging in only if there is no fresh cached token.
+
+        Parameters:
+        - force (bool): Log in even if a cached token exists (e.g. after the server rejected it).
+
+        Returns:
+        - str: The token, or None if the login failed.
+        """
+        with self.lock:
+            if not force:
+                if self.token is not None and time.time() - self.token_time <= TOKEN_TTL:
+                    return self.token
+                if self.read_token_file():
+                    return self.token
+            try:
+                response = self.session.post(f"{self.address}/account/logIn", json={"email": self.email, "password": self.password}, timeout=REQUEST_TIMEOUT)
+            except requests.exceptions.RequestException as e:
+                print(f"Login failed: {e}")
+                return None
+            if response.status_code == 200:
+                print("Login successful.")
+                self.token = response.json().get('token')
+                self.token_time = time.time()
+                self.write_token_file()
+                return self.token
+            else:
+                print("Login failed.")
+                return None
+
+    def request(self, method, path, payload=None, expected=(200, 201), retries=3, headers=None, retry_timeouts=True):
+        """
+        Send an authenticated request to the Express server.
+        The token is refreshed once if the server rejects it, and connection errors and server errors are retried with a bounded backoff.
+
+        Parameters:
+        - method (str): The HTTP method.
+        - path (str): The path of the endpoint, starting with '/'.
+        - payload (dict): The JSON body of the request.
+        - expected (tuple): The status codes of a successful response.
+        - retries (int): The maximum number of retries.
+        - headers (dict): Additional headers of the request.
+        - retry_timeouts (bool): Retry the requests that timed out waiting for the response. A caller retrying on its own
+          (e.g. the outbox) disables it, since the server may have applied the request before the timeout.
+
+        Returns:
+        - requests.Response: The response if it was successful, None otherwise.
+        """
+        refreshed = False
+        delay = 0.5
+        response = None
+        for attempt in range(retries + 1):
+            token = self.login()
+            request_headers = dict(headers or {})
+            if token:
+                request_headers["Authorization"] = f"Bearer {token}"
+            try:
+                response = self.session.request(method, f"{self.address}{path}", json=payload, headers=request_headers, timeout=REQUEST_TIMEOUT)
+            except requests.exceptions.ReadTimeout as e:
+                print(f"Request to {path} timed out: {e}")
+                response = None
+                if not retry_timeouts:
+                    break
+            except requests.exceptions.RequestException as e:
+                print(f"Request to {path} failed: {e}")
+                response = None
+            if response is not None:
+                if response.status_code in expected:
+                    return response
+                # Log in again if the token was rejected
+                if response.status_code in (401, 403) and not refreshed:
+                    self.login(force=True)
+                    refreshed = True
+                    continue
+                # Do not retry the requests rejected by the server
+                if response.status_code < 500:
+                    break
+            if attempt < retries:
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_BACKOFF)
+        return None
+
+    def send_topic(self, topic):
+        """
+        Add a topic to the Express server.
+
+        Parameters:
+        - topic (dict): The topic, with its name and questions.
+
+        Returns:
+        - bool: True if the topic was added, False otherwise.
+        """
+        response = self.request('POST', '/topic', {"name": topic['name'], "questions": topic['questions']}, expected=(201,))
+        if response is not None:
+            print(f"Topic '{topic['name']}' added successfully.")
+            return True
+        print(f"Failed to add topic '{topic['name']}'.")
+        return False
+
+    def send_topics(self, topics):
+        """
+        Add all the topics of a run to the Express server in a single request.
+
+        Parameters:
+        - topics (list): The topics, each with its name and questions.
+
+        Returns:
+        - set: The names of the topics that were added.
+        - set: The names of the topics that already existed on the server, which were left unchanged.
+        """
+        if not topics:
+            return set(), set()
+        response = self.request('POST', '/topic/bulk', {"topics": [{"name": topic['name'], "questions": topic['questions']} for topic in topics]}, expected=(201,))
+        if response is None:
+            print(f"Failed to add {len(topics)} topics.")
+            return set(), set()
+        result = response.json()
+        created = set(result.get('created', []))
+        existing = set(result.get('existing', []))
+        print(f"{len(created)}/{len(topics)} topics added successfully, {len(existing)} already existed.")
+        return created, existing
+
+    def send_topic_questions(self, topic_name, questions):
+        """
+        Add questions to an existing topic of the Express server.
+
+        Parameters:
+        - topic_name (str): The name of the topic.
+        - questions (list): The questions to add.
+
+        Returns:
+        - bool: True if the questions were added, False otherwise.
+        """
+        response = self.request('POST', f"/topic/{quote(topic_name, safe='')}/questions", {"questions": questions}, expected=(200,))
+        if response is not None:
+            print(f"{len(questions)} questions added to topic '{topic_name}'.")
+            return True
+        print(f"Failed to add questions to topic '{topic_name}'.")
+        return False
+
+    def send_interview_question_data(self, applicationID, questionData, idempotency_key=None, retry_timeouts=True):
+        """
+        Add the analysis results of an interview question to an application.
+
+        Parameters:
+        - applicationID (str): The ID of the application.
+        - questionData (dict): The results of the question.
+        - idempotency_key (str): The key of the results, results whose key was already applied are not added again.
+        - retry_timeouts (bool): Retry the request if it timed out, see request.
+
+        Returns:
+        - bool: True if the results were added, False otherwise.
+        """
+        response = self.request('POST', f"/application/{applicationID}/interviewQuestionData", questionData, expected=(200,),
+                                headers=idempotency_headers(idempotency_key), retry_timeouts=retry_timeouts)
+        if response is not None:
+            print("Interview Question Data added successfully.")
+            return True
+        print("Failed to add Interview Question Data.")
+        return False
+
+    def send_interview_questions_data(self, applicationID, questionsData, idempotency_key=None, retry_timeouts=True):
+        """
+        Add the analysis results of all the questions of an interview to an application in a single request.
+
+        Parameters:
+        - applicationID (str): The ID of the application.
+        - questionsData (list): The results of each question, in order.
+        - idempotency_key (str): The key of the results, results whose key was already applied are not added again.
+        - retry_timeouts (bool): Retry the request if it timed out, see request.
+
+        Returns:
+        - bool: True if the results were added, False otherwise.
+        """
+        if not questionsData:
+            return True
+        response = self.request('POST', f"/application/{applicationID}/interviewQuestionsData", {"questions": questionsData}, expected=(200,),
+                                headers=idempotency_headers(idempotency_key), retry_timeouts=retry_timeouts)
+        if response is not None:
+            print(f"Interview Data of {len(questionsData)} questions added successfully.")
+            return True
+        print("Failed to add Interview Data.")
+        return False
+
+    def send_quiz_cheating_data(self, applicationID, quizData, idempotency_key=None, retry_timeouts=True):
+        """
+        Add the cheating analysis results of a quiz to an application.
+
+        Parameters:
+        - applicationID (str): The ID of the application.
+        - quizData (dict): The results of the quiz.
+        - idempotency_key (str): The key of the results. Setting the quiz results twice is harmless, the key is sent for consistency.
+        - retry_timeouts (bool): Retry the request if it timed out, see request.
+
+        Returns:
+        - bool: True if the results were added, False otherwise.
+        """
+        response = self.request('POST', f"/application/{applicationID}/quizCheatingData", quizData, expected=(200,),
+                                headers=idempotency_headers(idempotency_key), retry_timeouts=retry_timeouts)
+        if response is not None:
+            print("Quiz Cheating Data added successfully.")
+            return True
+        print("Failed to add Quiz Cheating Data.")
+        return False
+
+# Client shared by the callers of this process
+client = None
+
+def get_client():
+    """
+    Get the Express client of this process, creating it on first use.
+
+    Returns:
+    - ExpressClient: The shared client.
+    """
+    global client
+    if client is None:
+        client = ExpressClient()
+    return client
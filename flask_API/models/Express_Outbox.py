@@ -0,0 +1,260 @@
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from dotenv import load_dotenv
+import Express_Client
+
+# SQLite database holding the results waiting to be sent to the Express server
+OUTBOX_PATH = os.getenv('EXPRESS_OUTBOX_PATH', os.path.join('logs', 'express_outbox.sqlite3'))
+
+# Number of seconds between two flushes of the outbox
+FLUSH_INTERVAL = float(os.getenv('EXPRESS_OUTBOX_INTERVAL', 5))
+
+# Maximum delay before retrying a failed entry, and number of attempts before giving up on it
+MAX_RETRY_DELAY = float(os.getenv('EXPRESS_OUTBOX_MAX_DELAY', 600))
+MAX_ATTEMPTS = int(os.getenv('EXPRESS_OUTBOX_MAX_ATTEMPTS', 50))
+
+# Number of seconds an entry is reserved by the flusher sending it, so that concurrent flushers do not send it twice
+LEASE = float(os.getenv('EXPRESS_OUTBOX_LEASE', 300))
+
+# Number of seconds the sent entries are kept before being removed
+RETENTION = float(os.getenv('EXPRESS_OUTBOX_RETENTION', 7 * 24 * 3600))
+
+# Methods of the Express client sending each kind of entry
+SENDERS = {
+    'interviewQuestionData': Express_Client.ExpressClient.send_interview_question_data,
+    'interviewQuestionsData': Express_Client.ExpressClient.send_interview_questions_data,
+    'quizCheatingData': Express_Client.ExpressClient.send_quiz_cheating_data,
+}
+
+def connect(outbox_path=OUTBOX_PATH):
+    """
+    Open the outbox, creating it on first use.
+
+    Parameters:
+    - outbox_path (str): The path of the SQLite database.
+
+    Returns:
+    - sqlite3.Connection: The connection to the outbox.
+    """
+    os.makedirs(os.path.dirname(outbox_path) or '.', exist_ok=True)
+    connection = sqlite3.connect(outbox_path, timeout=30, isolation_level=None)
+    # Let the analysis processes append while a flusher is sending
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            application_id TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt REAL NOT NULL,
+            sent REAL,
+            failed REAL,
+            last_error TEXT
+        )
+    ''')
+    connection.execute('CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (sent, failed, next_attempt)')
+    return connection
+
+def enqueue(kind, applicationID, payload, outbox_path=OUTBOX_PATH):
+    """
+    Append a result to the outbox. It is sent to the Express server by the next flush.
+
+    Parameters:
+    - kind (str): The kind of the result, one of SENDERS.
+    - applicationID (str): The ID of the application.
+    - payload (dict or list): The result, as expected by the Express server.
+    - outbox_path (str): The path of the SQLite database.
+
+    Returns:
+    - int: The ID of the entry.
+    """
+    if kind not in SENDERS:
+        raise ValueError(f"Unknown outbox entry kind '{kind}', expected one of {tuple(SENDERS)}")
+    now = time.time()
+    connection = connect(outbox_path)
+    try:
+        cursor = connection.execute(
+            'INSERT INTO outbox (kind, application_id, payload, created, next_attempt) VALUES (?, ?, ?, ?, ?)',
+            (kind, applicationID, json.dumps(payload), now, now),
+        )
+        print(f"{kind} of application {applicationID} queued for the Express server.")
+        return cursor.lastrowid
+    finally:
+        connection.close()
+
+def idempotency_key(entry_id, applicationID, created):
+    """
+    Get the key letting the Express server apply an entry only once, however many times it is sent.
+    The creation time keeps the keys unique if the outbox database is recreated and the IDs start over.
+
+    Parameters:
+    - entry_id (int): The ID of the entry.
+    - applicationID (str): The ID of the application.
+    - created (float): The creation time of the entry.
+
+    Returns:
+    - str: The key of the entry.
+    """
+    return f"outbox-{applicationID}-{entry_id}-{int(created * 1000)}"
+
+def claim_entries(connection, limit):
+    """
+    Reserve the entries that are due for sending.
+
+    Parameters:
+    - connection (sqlite3.Connection): The connection to the outbox.
+    - limit (int): The maximum number of entries to reserve.
+
+    Returns:
+    - list: The (id, kind, application_id, payload, attempts, created) rows of the reserved entries, in order of creation.
+    """
+    now = time.time()
+    rows = connection.execute(
+        'SELECT id, kind, application_id, payload, attempts, created FROM outbox '
+        'WHERE sent IS NULL AND failed IS NULL AND next_attempt <= ? ORDER BY id LIMIT ?',
+        (now, limit),
+    ).fetchall()
+    claimed = []
+    for row in rows:
+        # Only keep the entries that were not reserved by another flusher in the meantime
+        cursor = connection.execute(
+            'UPDATE outbox SET next_attempt = ? WHERE id = ? AND sent IS NULL AND next_attempt <= ?',
+            (now + LEASE, row[0], now),
+        )
+        if cursor.rowcount == 1:
+            claimed.append(row)
+    return claimed
+
+def flush(client=None, outbox_path=OUTBOX_PATH, limit=100):
+    """
+    Send the due entries of the outbox to the Express server.
+    Failed entries are retried later with an exponential backoff, and given up after MAX_ATTEMPTS attempts.
+    Each entry is sent with its idempotency key, so an entry sent again (after a timeout, or by a second flusher once its lease
+    expired) is applied only once by the server.
+
+    Parameters:
+    - client (Express_Client.ExpressClient): The client of the Express server. Defaults to the shared client.
+    - outbox_path (str): The path of the SQLite database.
+    - limit (int): The maximum number of entries sent by this flush.
+
+    Returns:
+    - int: The number of entries sent.
+    """
+    client = client or Express_Client.get_client()
+    connection = connect(outbox_path)
+    sent = 0
+    try:
+        for entry_id, kind, applicationID, payload, attempts, created in claim_entries(connection, limit):
+            try:
+                # The outbox retries the entry itself, and the key makes the retries harmless if the server applied a previous attempt
+                success = SENDERS[kind](client, applicationID, json.loads(payload),
+                                        idempotency_key=idempotency_key(entry_id, applicationID, created), retry_timeouts=False)
+                error = None if success else 'rejected or unavailable'
+            except Exception as e:
+                success = False
+                error = str(e)
+            now = time.time()
+            if success:
+                connection.execute('UPDATE outbox SET sent = ?, attempts = ?, last_error = NULL WHERE id = ?', (now, attempts + 1, entry_id))
+                sent += 1
+            elif attempts + 1 >= MAX_ATTEMPTS:
+                print(f"Giving up on {kind} of application {applicationID} after {attempts + 1} attempts.")
+                connection.execute('UPDATE outbox SET failed = ?, attempts = ?, last_error = ? WHERE id = ?', (now, attempts + 1, error, entry_id))
+            else:
+                delay = min(2 ** attempts, MAX_RETRY_DELAY)
+                connection.execute('UPDATE outbox SET next_attempt = ?, attempts = ?, last_error = ? WHERE id = ?', (now + delay, attempts + 1, error, entry_id))
+
+        # Remove the entries sent long ago
+        connection.execute('DELETE FROM outbox WHERE sent IS NOT NULL AND sent < ?', (time.time() - RETENTION,))
+    finally:
+        connection.close()
+    return sent
+
+def pending_count(outbox_path=OUTBOX_PATH):
+    """
+    Count the entries waiting to be sent.
+
+    Parameters:
+    - outbox_path (str): The path of the SQLite database.
+
+    Returns:
+    - int: The number of entries waiting to be sent.
+    """
+    connection = connect(outbox_path)
+    try:
+        return connection.execute('SELECT COUNT(*) FROM outbox WHERE sent IS NULL AND failed IS NULL').fetchone()[0]
+    finally:
+        connection.close()
+
+class OutboxFlusher(threading.Thread):
+    """
+    Background thread flushing the outbox every FLUSH_INTERVAL seconds.
+    """
+
+    def __init__(self, outbox_path=OUTBOX_PATH, interval=FLUSH_INTERVAL):
+        super().__init__(daemon=True)
+        self.outbox_path = outbox_path
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                flush(outbox_path=self.outbox_path)
+            except Exception as e:
+                print(f"Outbox flush failed: {e}")
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+
+# Flusher started by this process
+flusher = None
+
+def start_flusher(outbox_path=OUTBOX_PATH, interval=FLUSH_INTERVAL):
+    """
+    Start the background flusher of this process, once.
+
+    Parameters:
+    - outbox_path (str): The path of the SQLite database.
+    - interval (float): The number of seconds between two flushes.
+
+    Returns:
+    - OutboxFlusher: The running flusher.
+    """
+    global flusher
+    if flusher is None or not flusher.is_alive():
+        flusher = OutboxFlusher(outbox_path, interval)
+        flusher.start()
+    return flusher
+
+def main():
+    parser = argparse.ArgumentParser(description="Send the analysis results queued in the outbox to the Express server.")
+    parser.add_argument("--outboxPath", default=OUTBOX_PATH, help="Path of the outbox database")
+    parser.add_argument("--interval", type=float, default=FLUSH_INTERVAL, help="Number of seconds between two flushes")
+    parser.add_argument("--once", action="store_true", help="Flush the outbox once and exit")
+    args = parser.parse_args()
+
+    # Load environment variables from .env file
+    load_dotenv()
+
+    if args.once:
+        sent = flush(outbox_path=args.outboxPath)
+        print(f"{sent} entries sent, {pending_count(args.outboxPath)} pending.")
+        return
+
+    while True:
+        try:
+            flush(outbox_path=args.outboxPath)
+        except Exception as e:
+            print(f"Outbox flush failed: {e}")
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import os
+import abc
+import json
+import shutil
+import zipfile
+import argparse
+import tempfile
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import Audio_Extraction
+
+# Speech recognition backend: 'google', 'vosk' (offline) or 'fake' (deterministic stand-in for tests and benchmarks)
+ASR_BACKEND = os.getenv('ASR_BACKEND', 'google')
+
+# Number of chunks transcribed in parallel. The Google backend sends one request at a time by default, since the questions
+# are already analyzed in parallel and its rate limits would turn the failed requests into empty transcripts
+ASR_WORKERS = int(os.getenv('ASR_WORKERS', 1 if ASR_BACKEND == 'google' else 4))
+
+# Maximum duration of a chunk in seconds, longer speech intervals are split
+CHUNK_SECONDS = float(os.getenv('ASR_CHUNK_SECONDS', 30))
+
+# Path to the Vosk model directory, vendored with `python models/HireUp_Interview/ASR.py --vendor`
+VOSK_MODEL_PATH = os.getenv('VOSK_MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vosk-model-small-en-us'))
+
+# Archive of the Vosk model downloaded by the vendoring step
+VOSK_MODEL_URL = os.getenv('VOSK_MODEL_URL', 'https://alphacephei.com/vosk/models/vosk-model-small-en-us-0.15.zip')
+
+class Recognizer(abc.ABC):
+    """
+    Speech to text interface of the interview analysis.
+    """
+
+    @abc.abstractmethod
+    def transcribe(self, samples, sampling_rate=Audio_Extraction.SAMPLING_RATE):
+        """
+        Transcribe a chunk of audio.
+
+        Parameters:
+        samples (numpy.ndarray): The mono float32 samples of the chunk.
+        sampling_rate (int): The sampling rate of the samples.
+
+        Returns:
+        str: The recognized text, empty if nothing was recognized.
+        """
+
+class GoogleRecognizer(Recognizer):
+    """
+    Google speech recognition, through the speech_recognition package. Needs network access.
+    """
+
+    def transcribe(self, samples, sampling_rate=Audio_Extraction.SAMPLING_RATE):
+        import speech_recognition as sr
+
+        r = sr.Recognizer()
+        audioData = sr.AudioData(Audio_Extraction.to_pcm16(samples), sampling_rate, 2)
+        try:
+            return r.recognize_google(audioData)
+        except sr.UnknownValueError:
+            print("Google Speech Recognition could not understand the audio")
+            return ""
+        except sr.RequestError as e:
+            print(f"Could not request results from Google Speech Recognition service; {e}")
+            return ""
+
+class VoskRecognizer(Recognizer):
+    """
+    Offline speech recognition on the CPU with a Vosk model, loaded once and shared by the chunks transcribed in parallel.
+
+    Parameters:
+    model_path (str): Path to the Vosk model directory.
+    """
+
+    def __init__(self, model_path=VOSK_MODEL_PATH):
+        try:
+            import vosk
+        except ImportError:
+            raise ImportError("The 'vosk' ASR backend needs the vosk package, install it with 'pip install vosk'")
+        if not os.path.isdir(model_path):
+            raise FileNotFoundError(f"No Vosk model in {model_path}. Vendor it with 'python models/HireUp_Interview/ASR.py --vendor' "
+                                    f"on a machine with network access, or set VOSK_MODEL_PATH to an existing model.")
+        vosk.SetLogLevel(-1)
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)
+
+    def transcribe(self, samples, sampling_rate=Audio_Extraction.SAMPLING_RATE):
+        recognizer = self.vosk.KaldiRecognizer(self.model, sampling_rate)
+        recognizer.AcceptWaveform(Audio_Extraction.to_pcm16(samples))
+        return json.loads(recognizer.FinalResult()).get('text', '')
+
+class FakeRecognizer(Recognizer):
+    """
+    Deterministic stand-in for the tests and benchmarks: two words per second of audio, from a fixed vocabulary.
+    """
+
+    WORDS = ['the', 'answer', 'is', 'a', 'good', 'example', 'of', 'this', 'question']
+    WORDS_PER_SECOND = 2
+
+    def transcribe(self, samples, sampling_rate=Audio_Extraction.SAMPLING_RATE):
+        count = int(round(len(samples) / sampling_rate * self.WORDS_PER_SECOND))
+        return ' '.join(self.WORDS[i % len(self.WORDS)] for i in range(count))
+
+# Recognizer classes by backend name
+RECOGNIZERS = {
+    'google': GoogleRecognizer,
+    'vosk': VoskRecognizer,
+    'fake': FakeRecognizer,
+}
+
+# Recognizers created by this process, by backend name
+recognizers = {}
+
+def get_recognizer(backend=ASR_BACKEND):
+    """
+    Get the recognizer of a backend, created once per process.
+
+    Parameters:
+    backend (str): The name of the backend, one of RECOGNIZERS.
+
+    Returns:
+    Recognizer: The recognizer.
+    """
+    if backend not in RECOGNIZERS:
+        raise ValueError(f"Unknown ASR backend '{backend}', expected one of {tuple(RECOGNIZERS)}")
+    if backend not in recognizers:
+        recognizers[backend] = RECOGNIZERS[backend]()
+    return recognizers[backend]
+
+def get_chunks(intervals, duration, chunk_seconds=CHUNK_SECONDS):
+    """
+    Split the speech intervals into chunks of at most chunk_seconds.
+
+    Parameters:
+    intervals (list): The speech intervals, as dictionaries with 'start' and 'end' in seconds, or None for the whole audio.
+    duration (float): The duration of the audio in seconds.
+    chunk_seconds (float): The maximum duration of a chunk.
+
+    Returns:
+    list: The (start, end) chunks in seconds, in order.
+    """
+    if intervals is None:
+        intervals = [{'start': 0, 'end': duration}]
+    chunks = []
+    for interval in intervals:
+        start, end = interval['start'], min(interval['end'], duration)
+        while start < end:
+            chunks.append((start, min(start + chunk_seconds, end)))
+            start += chunk_seconds
+    return chunks
+
+def transcribe(audio, intervals=None, recognizer=None, workers=ASR_WORKERS, sampling_rate=Audio_Extraction.SAMPLING_RATE):
+    """
+    Transcribe the speech of an audio, in chunks of the speech intervals transcribed in parallel, and stitch the text in order.
+
+    Parameters:
+    audio (numpy.ndarray): The mono float32 samples.
+    intervals (list, optional): The speech intervals in seconds. Defaults to the whole audio.
+    recognizer (Recognizer, optional): The recognizer. Defaults to the recognizer of ASR_BACKEND.
+    workers (int): The number of chunks transcribed in parallel.
+    sampling_rate (int): The sampling rate of the samples.
+
+    Returns:
+    str: The recognized text.
+    """
+    recognizer = recognizer or get_recognizer()
+    chunks = get_chunks(intervals, len(audio) / sampling_rate)
+    if not chunks:
+        return ""
+    samples = [audio[int(start * sampling_rate):int(end * sampling_rate)] for start, end in chunks]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as executor:
+        texts = list(executor.map(lambda chunk: recognizer.transcribe(chunk, sampling_rate), samples))
+    return ' '.join(text for text in texts if text)
+
+def vendorModel(path=VOSK_MODEL_PATH, url=VOSK_MODEL_URL):
+    """
+    Download the Vosk model and extract it to path, so that the 'vosk' backend runs without any network access.
+    Run once on a machine with network access, then deploy the model with the other models.
+
+    Parameters:
+    path (str): The directory of the model.
+    url (str): The URL of the zipped model.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        archive_path = os.path.join(temp_dir, 'model.zip')
+        urllib.request.urlretrieve(url, archive_path)
+        with zipfile.ZipFile(archive_path) as archive:
+            archive.extractall(temp_dir)
+        # The archive holds a single directory named after the model version
+        extracted = [os.path.join(temp_dir, name) for name in os.listdir(temp_dir) if os.path.isdir(os.path.join(temp_dir, name))]
+        if len(extracted) != 1:
+            raise ValueError(f"Unexpected content of the Vosk model archive {url}")
+        shutil.copytree(extracted[0], path, dirs_exist_ok=True)
+    print(f"Vosk model vendored to {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the speech recognition models.")
+    parser.add_argument("--vendor", action="store_true", help="Download the Vosk model and extract it to VOSK_MODEL_PATH")
+    parser.add_argument("--path", default=VOSK_MODEL_PATH, help="Directory of the Vosk model")
+    parser.add_argument("--url", default=VOSK_MODEL_URL, help="URL of the zipped Vosk model")
+    args = parser.parse_args()
+
+    if args.vendor:
+        vendorModel(args.path, args.url)
+    else:
+        get_recognizer()
+        print(f"ASR backend '{ASR_BACKEND}' loaded")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import os
+import logging
+import numpy as np
+import cv2
+import Intervals
+
+# Maximum number of landmark extractions per minute of video, 0 to extract the landmarks of every analyzed frame
+FRAME_BUDGET = int(os.getenv('FRAME_BUDGET', 0))
+
+# Number of landmark extractions per second when nothing happens
+BASE_FPS = float(os.getenv('SAMPLING_BASE_FPS', 2))
+
+# Mean absolute difference (0-255) of the downscaled frames above which the candidate moved
+MOTION_THRESHOLD = float(os.getenv('SAMPLING_MOTION_THRESHOLD', 6))
+
+# Mean absolute difference below which a frame is near-identical to the last analyzed one
+STILL_THRESHOLD = float(os.getenv('SAMPLING_STILL_THRESHOLD', 1.5))
+
+# Maximum number of seconds the landmarks of a near-identical frame are reused
+MAX_REUSE_SECONDS = float(os.getenv('SAMPLING_MAX_REUSE_SECONDS', 2))
+
+# Number of seconds analyzed at full rate after the onset of a speech interval
+ONSET_SECONDS = float(os.getenv('SAMPLING_ONSET_SECONDS', 1))
+
+# Size of the downscaled frames and eye regions compared by frame differencing
+THUMBNAIL_SIZE = (32, 32)
+EYE_THUMBNAIL_SIZE = (16, 8)
+
+# Landmarks bounding both eyes, used to watch the gaze between two extractions
+EYES_REGION = [130, 243, 463, 359, 223, 230, 443, 450]
+
+def thumbnail(frame, size=THUMBNAIL_SIZE):
+    """
+    Downscale a frame to a small grayscale image for frame differencing.
+
+    Parameters:
+    frame (numpy.ndarray): The frame, in BGR.
+    size (tuple): The (width, height) of the thumbnail.
+
+    Returns:
+    numpy.ndarray: The float32 thumbnail.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+def eyes_thumbnail(frame, mesh_points):
+    """
+    Downscale the region of the eyes of a frame, located with the landmarks of a previous frame.
+
+    Parameters:
+    frame (numpy.ndarray): The frame, in BGR.
+    mesh_points (numpy.ndarray): The mesh points of a previous frame, or None.
+
+    Returns:
+    numpy.ndarray: The float32 thumbnail of the eyes, or None if there are no landmarks.
+    """
+    if mesh_points is None:
+        return None
+    x_min, y_min = mesh_points[EYES_REGION].min(axis=0)
+    x_max, y_max = mesh_points[EYES_REGION].max(axis=0)
+    height, width = frame.shape[:2]
+    x_min, x_max = max(int(x_min), 0), min(int(x_max) + 1, width)
+    y_min, y_max = max(int(y_min), 0), min(int(y_max) + 1, height)
+    if x_max <= x_min or y_max <= y_min:
+        return None
+    return thumbnail(frame[y_min:y_max, x_min:x_max], EYE_THUMBNAIL_SIZE)
+
+def difference(thumbnail1, thumbnail2):
+    """
+    Mean absolute difference between two thumbnails, infinite if one of them is missing.
+    """
+    if thumbnail1 is None or thumbnail2 is None:
+        return float('inf')
+    return float(np.mean(np.abs(thumbnail1 - thumbnail2)))
+
+class AdaptiveSampler:
+    """
+    Decides which frames go through the landmark extraction, within a budget of extractions per minute of video.
+
+    Frames are analyzed at BASE_FPS when nothing happens, and at the full rate around head motion, eye movements
+    (a possible gaze boundary crossing) and speech onsets, as long as the budget allows it. The landmarks of the last analyzed
+    frame are reused for the skipped frames, so the analyzers still see every frame of the original timeline.
+
+    The budget is a token bucket refilled at budget/60 tokens per second of video, holding up to ten seconds of budget.
+
+    Parameters:
+    fps (int): The number of frames per second of the timeline.
+    budget (int): The maximum number of landmark extractions per minute of video.
+    intervals (list): The speech intervals, as dictionaries with 'start' and 'end' in seconds.
+    base_fps (float): The number of extractions per second when nothing happens.
+    """
+
+    def __init__(self, fps, budget, intervals=(), base_fps=BASE_FPS):
+        self.fps = fps
+        # The base rate alone must fit in the budget
+        self.base_interval = max(1, int(round(fps / min(base_fps, budget / 60))))
+        self.max_reuse = max(self.base_interval, int(round(MAX_REUSE_SECONDS * fps)))
+        self.capacity = budget / 6
+        self.tokens = self.capacity
+        self.refill = budget / 60 / fps
+        # Sorted, disjoint times of the speech intervals extended to the end of their onset, searched for each frame
+        starts, ends = Intervals.to_arrays([(interval['start'], interval['end']) for interval in intervals])
+        self.speech_starts, self.speech_ends = Intervals.merge(starts, np.maximum(ends, starts + ONSET_SECONDS))
+        self.last_thumbnail = None
+        self.last_eyes = None
+        self.since_last = None
+        self.sampled = 0
+        self.frames = 0
+
+    def in_speech(self, t):
+        """
+        Check if a time is inside a speech interval, or right after the onset of one.
+        """
+        i = np.searchsorted(self.speech_starts, t, side='right') - 1
+        return i >= 0 and t < self.speech_ends[i]
+
+    def should_sample(self, t, frame, mesh_points):
+        """
+        Decide if the landmarks of a frame are extracted or reused from the last analyzed frame.
+
+        Parameters:
+        t (float): The time of the frame, in seconds.
+        frame (numpy.ndarray): The frame, in BGR.
+        mesh_points (numpy.ndarray): The mesh points of the last analyzed frame, or None.
+
+        Returns:
+        bool: True if the landmarks of the frame must be extracted.
+        """
+        self.frames += 1
+        self.tokens = min(self.capacity, self.tokens + self.refill)
+        current = thumbnail(frame)
+
+        if self.since_last is None:
+            sample = True
+        else:
+            motion = difference(current, self.last_thumbnail)
+            eyes_motion = difference(eyes_thumbnail(frame, mesh_points), self.last_eyes)
+            if self.since_last >= self.max_reuse:
+                # Never reuse landmarks for too long
+                sample = True
+            elif self.since_last >= self.base_interval:
+                # Sample at the base rate, unless the frame is near-identical to the last analyzed one
+                sample = motion >= STILL_THRESHOLD or eyes_motion >= STILL_THRESHOLD
+            else:
+                # Sample at the full rate around motion, eye movements and speech, within the budget
+                busy = motion >= MOTION_THRESHOLD or eyes_motion >= MOTION_THRESHOLD or self.in_speech(t)
+                sample = busy and self.tokens >= 1
+
+        if sample:
+            self.tokens = max(0.0, self.tokens - 1)
+            self.last_thumbnail = current
+            self.since_last = 1
+            self.sampled += 1
+        else:
+            self.since_last += 1
+        return sample
+
+    def remember_landmarks(self, frame, mesh_points):
+        """
+        Remember the eye region of the last analyzed frame.
+
+        Parameters:
+        frame (numpy.ndarray): The analyzed frame.
+        mesh_points (numpy.ndarray): Its mesh points, or None.
+        """
+        self.last_eyes = eyes_thumbnail(frame, mesh_points)
+
+def iter_landmarks_adaptive(frames, fps, extractor, budget, intervals=()):
+    """
+    Extract the face landmarks of a stream of frames with adaptive sampling.
+
+    Parameters:
+    frames (iterable): The (t, frame) frames of the video, on the original timeline.
+    fps (int): The number of frames per second of the timeline.
+    extractor (LandmarkExtractor): The landmark stage.
+    budget (int): The maximum number of landmark extractions per minute of video.
+    intervals (list): The speech intervals.
+
+    Yields:
+    t (float): The time of the frame, in seconds.
+    frame_shape (tuple): The shape of the frame.
+    mesh_points (numpy.ndarray): The mesh points of the frame, or of the last analyzed frame, if exactly one face is detected, None otherwise.
+    face_count (int): The number of faces detected.
+    """
+    sampler = AdaptiveSampler(fps, budget, intervals)
+    mesh_points, face_count = None, 0
+    for t, frame in frames:
+        if sampler.should_sample(t, frame, mesh_points):
+            mesh_points, face_count = extractor.process(frame)
+            sampler.remember_landmarks(frame, mesh_points)
+        yield t, frame.shape, mesh_points, face_count
+    logging.debug(f"Adaptive sampling: landmarks extracted for {sampler.sampled}/{sampler.frames} frames.")
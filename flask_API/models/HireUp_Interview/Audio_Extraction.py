@@ -0,0 +1,35 @@
+import numpy as np
+import ffmpeg
+
+# Sampling rate of the audio shared by the speech recognition, the VAD and the emotion analysis
+SAMPLING_RATE = 16000
+
+def extract_audio(videoPath, sampling_rate=SAMPLING_RATE):
+    """
+    Decode the audio of a video once, streamed from ffmpeg through a pipe, without any temporary WAV file.
+
+    Parameters:
+    videoPath (str): Path to the video file.
+    sampling_rate (int): The sampling rate of the decoded audio.
+
+    Returns:
+    numpy.ndarray: The mono float32 samples, between -1 and 1.
+    """
+    out, _ = (
+        ffmpeg.input(videoPath)
+        .output('pipe:', format='f32le', acodec='pcm_f32le', ac=1, ar=sampling_rate)
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    return np.frombuffer(out, dtype=np.float32)
+
+def to_pcm16(samples):
+    """
+    Convert float32 samples to the bytes of 16-bit PCM audio, e.g. for the speech recognition.
+
+    Parameters:
+    samples (numpy.ndarray): The float32 samples.
+
+    Returns:
+    bytes: The little-endian 16-bit samples.
+    """
+    return (np.clip(samples, -1, 1) * 32767).astype('<i2').tobytes()
@@ -1,12 +1,10 @@
 import cv2
 import numpy as np
-import mediapipe as mp
 import math
-from Frames_To_Durations import frame_indices_to_durations, merge_overlapping_durations
+from Frames_To_Durations import DurationsBuilder
+from Face_Landmarks import LandmarkExtractor, NUM_LANDMARKS
 
 
-mp_face_mesh = mp.solutions.face_mesh
-
 LEFT_EYE = [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385,384, 398]
 RIGHT_EYE = [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161 , 246] 
 RIGHT_EYE_BOARDER = [130, 247, 30 , 29, 28, 56, 190, 243, 112, 26, 22, 23, 24, 110, 25, 143, 111, 117, 118, 119, 120, 121, 124, 125, 126, 127, 128, 129, 30, 27]
@@ -30,25 +28,52 @@ CENTER = [468, 473]
 
 THRESHOLD = 7
 
-face_mesh = mp_face_mesh.FaceMesh(
-    max_num_faces=2,
-    refine_landmarks=True,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
+# Landmarks used to measure the head motion, i.e. all but the eye, iris and eye border landmarks
+HEAD_MOTION_MASK = np.ones(NUM_LANDMARKS, dtype=bool)
+HEAD_MOTION_MASK[LEFT_EYE + RIGHT_EYE + LEFT_IRIS + RIGHT_IRIS + CENTER + RIGHT_EYE_BOARDER + LEFT_EYE_BOARDER] = False
+
+# Landmarks whose mean is the center of each eye
+LEFT_EYE_BOX = [LEFT_EYE_MOST_RIGHT, LEFT_EYE_MOST_LEFT, LEFT_EYE_MOST_DOWN, LEFT_EYE_MOST_UP]
+RIGHT_EYE_BOX = [RIGHT_EYE_MOST_RIGHT, RIGHT_EYE_MOST_LEFT, RIGHT_EYE_MOST_DOWN, RIGHT_EYE_MOST_UP]
+
+# Number of frames classified together by the eye analyzer
+BATCH_SIZE = 256
+
+landmark_extractor = LandmarkExtractor()
 
 def eculedian_distance(point1, point2):
     """
     Calculates the Euclidean distance between two points in n-dimensional space.
+    Batches of points are supported, the coordinates being on the last axis.
 
     Parameters:
     - point1 (ndarray): The coordinates of the first point.
     - point2 (ndarray): The coordinates of the second point.
 
     Returns:
-    - distance (float): The Euclidean distance between the two points.
+    - distance (float or ndarray): The Euclidean distance between the two points.
+    """
+    return np.sqrt(np.sum((point1 - point2)**2, axis=-1))
+
+def blanking_mask(mesh_points):
+    """
+    Checks if the eyes are blanking based on the ratio of eyelash distance to eye width, for a batch of frames.
+
+    Args:
+        mesh_points (numpy.ndarray): The (..., landmarks, 2) mesh points of the frames.
+
+    Returns:
+        numpy.ndarray: True for the frames where the eyes are blanking.
     """
-    return np.sqrt(np.sum((point1 - point2)**2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Calculate the ratio of eyelash distance to eye width for the left eye
+        left_ratio = eculedian_distance(mesh_points[..., TOP_LEFT_EYELASH, :], mesh_points[..., BOTTOM_LEFT_EYELASH, :]) / eculedian_distance(mesh_points[..., LEFT_EYE[0], :], mesh_points[..., LEFT_EYE[8], :])
+
+        # Calculate the ratio of eyelash distance to eye width for the right eye
+        right_ratio = eculedian_distance(mesh_points[..., TOP_RIGHT_EYELASH, :], mesh_points[..., BOTTOM_RIGHT_EYELASH, :]) / eculedian_distance(mesh_points[..., RIGHT_EYE[0], :], mesh_points[..., RIGHT_EYE[8], :])
+
+    # Check if either of the ratios is less than 0.28
+    return (left_ratio < 0.28) | (right_ratio < 0.28)
 
 def is_blanking(mesh_points):
     """
@@ -60,17 +85,7 @@ def is_blanking(mesh_points):
     Returns:
         bool: True if the eyes are blanking, False otherwise.
     """
-    # Calculate the ratio of eyelash distance to eye width for the left eye
-    left_ratio = eculedian_distance(mesh_points[TOP_LEFT_EYELASH], mesh_points[BOTTOM_LEFT_EYELASH]) / eculedian_distance(mesh_points[LEFT_EYE[0]], mesh_points[LEFT_EYE[8]])
-
-    # Calculate the ratio of eyelash distance to eye width for the right eye
-    right_ratio = eculedian_distance(mesh_points[TOP_RIGHT_EYELASH], mesh_points[BOTTOM_RIGHT_EYELASH]) / eculedian_distance(mesh_points[RIGHT_EYE[0]], mesh_points[RIGHT_EYE[8]])
-
-    # Check if either of the ratios is less than 0.28
-    if left_ratio < 0.28 or right_ratio < 0.28:
-        return True
-    else:
-        return False
+    return bool(blanking_mask(np.asarray(mesh_points)))
 
 def get_mesh_points(frame, preMeshPoints=None):
     """
@@ -92,34 +107,40 @@ def get_mesh_points(frame, preMeshPoints=None):
 
     """
 
-    # Process the frame using the face mesh model
-    results = face_mesh.process(frame)
+    # Extract the mesh points of the frame if exactly one face is detected
+    mesh_points, _ = landmark_extractor.process(frame)
+
+    return filter_head_motion(mesh_points, preMeshPoints)
 
-    # Get the dimensions of the frame
-    frame_height, frame_width, _ = frame.shape
+def head_motion(mesh_points, preMeshPoints):
+    """
+    Calculates the average distance between the mesh points of frames and their previous mesh points, ignoring the eye landmarks.
 
-    if results.multi_face_landmarks and len(results.multi_face_landmarks) == 1:
-        # Extract the mesh points from the face
-        mesh_points = []
-        for i, point in enumerate(results.multi_face_landmarks[0].landmark):
-            mesh_points.append([int(point.x * frame_width), int(point.y * frame_height)])
-        mesh_points = np.array(mesh_points)
+    Args:
+        mesh_points (numpy.ndarray): The (..., landmarks, 2) mesh points of the frames.
+        preMeshPoints (numpy.ndarray): The previous mesh points, with the same shape.
 
-        # Calculate the distance between the current mesh points and the previous mesh points
-        if preMeshPoints is None:
-            preMeshPoints = mesh_points
-        else:
-            distance = 0
-            for i in range(len(mesh_points)):
-                if i not in LEFT_EYE and i not in RIGHT_EYE and i not in LEFT_IRIS and i not in RIGHT_IRIS and i not in CENTER and i not in RIGHT_EYE_BOARDER and i not in LEFT_EYE_BOARDER:
-                    distance += eculedian_distance(mesh_points[i], preMeshPoints[i])
-            distance = distance / len(mesh_points)
+    Returns:
+        float or numpy.ndarray: The average distance for each frame.
+    """
+    mesh_points = np.asarray(mesh_points)
+    distances = eculedian_distance(mesh_points[..., HEAD_MOTION_MASK, :], np.asarray(preMeshPoints)[..., HEAD_MOTION_MASK, :])
+    return distances.sum(axis=-1) / mesh_points.shape[-2]
 
-            # Check if the average distance exceeds the threshold
-            if distance > THRESHOLD:
-                return None
-    else:
-        mesh_points = None
+def filter_head_motion(mesh_points, preMeshPoints=None):
+    """
+    Discards the mesh points of a frame if the head moved too much since the previous mesh points.
+
+    Args:
+        mesh_points (numpy.ndarray): The mesh points of the frame, or None.
+        preMeshPoints (numpy.ndarray, optional): The previous mesh points. Defaults to None.
+
+    Returns:
+        numpy.ndarray: The mesh points, or None if there are none or the head moved too much.
+    """
+    # Check if the average distance to the previous mesh points exceeds the threshold
+    if mesh_points is not None and preMeshPoints is not None and head_motion(mesh_points, preMeshPoints) > THRESHOLD:
+        return None
 
     return mesh_points
 
@@ -180,6 +201,32 @@ def if_same_side(p1, p2, p_center, x, y):
     # Check if the signs are the same for both x and y coordinates
     return point_x_sign == center_x_sign and point_y_sign == center_y_sign
 
+def same_side_mask(p1, p2, p_center, x, y):
+    """
+    Vectorized version of if_same_side for batches of line segments and points.
+
+    Args:
+        p1 (numpy.ndarray): The (..., 2) first points of the line segments.
+        p2 (numpy.ndarray): The (..., 2) second points of the line segments.
+        p_center (numpy.ndarray): The (..., 2) center points.
+        x (numpy.ndarray): The x-coordinates of the points to be checked.
+        y (numpy.ndarray): The y-coordinates of the points to be checked.
+
+    Returns:
+        numpy.ndarray: True where the point lies on the same side as the center point.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Calculate the slope (m) and y-intercept (b) of the lines
+        m = (p2[..., 1] - p1[..., 1]) / (p2[..., 0] - p1[..., 0] + 0.0000001)
+        b = p1[..., 1] - m * p1[..., 0]
+
+        # Calculate the coordinates of the points on the lines
+        point_y, point_x = m * x + b, (y - b) / m
+        center_y, center_x = m * p_center[..., 0] + b, (p_center[..., 1] - b) / m
+
+    # Check if the signs of the differences are the same for both x and y coordinates
+    return (np.copysign(1, x - point_x) == np.copysign(1, p_center[..., 0] - center_x)) & (np.copysign(1, y - point_y) == np.copysign(1, p_center[..., 1] - center_y))
+
 def calibration(topLeftImage, topRightImage, bottomRightImage, bottomLeftImage):
     """
     Perform calibration for eye tracking.
@@ -239,12 +286,209 @@ def calibration(topLeftImage, topRightImage, bottomRightImage, bottomLeftImage):
     return calibrationPoints
     
 
+def get_calibration_constants(calibrationPoints):
+    """
+    Computes once the constants of the calibration used to classify every frame.
+
+    Parameters:
+    calibrationPoints (tuple): Tuple containing the mapping points and reference points for calibration.
+
+    Returns:
+    dict: The mapping points of each eye, their extent, the eye center references and the reference eye width.
+    """
+    mapping_points, left_eye_most_left_ref, left_eye_most_right_ref, left_eye_center_ref, right_eye_center_ref = calibrationPoints
+    left_mapping_points = np.array([point[0] for point in mapping_points]).reshape(-1, 2)
+    right_mapping_points = np.array([point[1] for point in mapping_points]).reshape(-1, 2)
+    return {
+        'left_mapping_points': left_mapping_points,
+        'right_mapping_points': right_mapping_points,
+        'left_range': left_mapping_points.max(axis=0) - left_mapping_points.min(axis=0),
+        'right_range': right_mapping_points.max(axis=0) - right_mapping_points.min(axis=0),
+        'left_eye_center_ref': left_eye_center_ref,
+        'right_eye_center_ref': right_eye_center_ref,
+        'reference_width': eculedian_distance(left_eye_most_left_ref, left_eye_most_right_ref),
+    }
+
+def get_pupil_shapes(mesh_points, frame_sizes, mapping_points, eye_range, eye_center_ref, eye_box, scale):
+    """
+    Moves and scales the calibrated pupil shape of an eye to the current position of the eye, for a batch of frames.
+
+    Parameters:
+    mesh_points (numpy.ndarray): The (frames, landmarks, 2) mesh points.
+    frame_sizes (numpy.ndarray): The (frames, 2) height and width of the frames.
+    mapping_points (numpy.ndarray): The (corners, 2) calibrated pupil positions of the eye.
+    eye_range (numpy.ndarray): The extent of the calibrated pupil positions.
+    eye_center_ref (numpy.ndarray): The calibrated center of the eye.
+    eye_box (list): The landmarks whose mean is the center of the eye.
+    scale (numpy.ndarray): The (frames,) scale of the eye relative to the calibration.
+
+    Returns:
+    numpy.ndarray: The (frames, corners, 2) pupil shapes.
+    """
+    # Calculate new eye centers
+    new_center = mesh_points[:, eye_box].mean(axis=1).astype(int)
+
+    # Calculate movement transformations
+    movement_transformation = new_center - eye_center_ref
+
+    # Calculate opposite shift transformations
+    opposite_shift_transformation = -(movement_transformation / frame_sizes) * eye_range
+
+    # Calculate final transformations
+    transformation = opposite_shift_transformation.astype(int) + movement_transformation
+
+    # Apply transformations to mapping points and scale them around their mean
+    points = mapping_points[None] + transformation[:, None]
+    mean = points.mean(axis=1)[:, None]
+    return ((points - mean) * scale[:, None, None] + mean).astype(int)
+
+def get_iris_centers(mesh_points, iris):
+    """
+    Calculates the centers of the iris of an eye for a batch of frames.
+
+    Parameters:
+    mesh_points (numpy.ndarray): The (frames, landmarks, 2) mesh points.
+    iris (list): The landmarks of the iris.
+
+    Returns:
+    numpy.ndarray: The (frames, 2) centers of the iris.
+    """
+    centers = np.zeros((len(mesh_points), 2))
+    for i, points in enumerate(mesh_points[:, iris]):
+        centers[i] = cv2.minEnclosingCircle(points.astype(np.int32))[0]
+    return centers
+
+def inside_mask(shapes, iris_centers):
+    """
+    Checks if the iris centers are inside the pupil shapes, for a batch of frames.
+
+    Parameters:
+    shapes (numpy.ndarray): The (frames, corners, 2) pupil shapes.
+    iris_centers (numpy.ndarray): The (frames, 2) iris centers.
+
+    Returns:
+    numpy.ndarray: True for the frames where the iris center is on the inner side of every edge of the pupil shape.
+    """
+    # The edges join each corner to the next one, and the last corner to the first one
+    shape_centers = shapes.mean(axis=1).astype(int)[:, None]
+    same_side = same_side_mask(shapes, np.roll(shapes, -1, axis=1), shape_centers, iris_centers[:, None, 0], iris_centers[:, None, 1])
+    return same_side.all(axis=1)
+
+def eye_cheating_kernel(mesh_points, valid, frame_sizes, constants):
+    """
+    Classifies a batch of frames as looking inside or outside the screen.
+
+    Parameters:
+    mesh_points (numpy.ndarray): The (frames, landmarks, 2) mesh points.
+    valid (numpy.ndarray): The (frames,) flags of the frames where exactly one face was detected.
+    frame_sizes (numpy.ndarray): The (frames, 2) height and width of the frames.
+    constants (dict): The calibration constants returned by get_calibration_constants.
+
+    Returns:
+    numpy.ndarray: The (frames,) flags, 1 if the user looks inside the screen, 0 otherwise.
+    """
+    inside = np.zeros(len(valid), dtype=int)
+    indices = np.flatnonzero(valid)
+    if len(indices) == 0:
+        # If the face is not detected or more one face detected, the frames are cheating
+        return inside
+    mesh_points = mesh_points[indices]
+    frame_sizes = frame_sizes[indices]
+
+    # Calculate scale factor
+    scale = eculedian_distance(mesh_points[:, LEFT_EYE_MOST_LEFT], mesh_points[:, LEFT_EYE_MOST_RIGHT]) / constants['reference_width']
+    scale *= 1.3
+
+    # Calculate the pupil shapes of both eyes
+    left_shapes = get_pupil_shapes(mesh_points, frame_sizes, constants['left_mapping_points'], constants['left_range'], constants['left_eye_center_ref'], LEFT_EYE_BOX, scale)
+    right_shapes = get_pupil_shapes(mesh_points, frame_sizes, constants['right_mapping_points'], constants['right_range'], constants['right_eye_center_ref'], RIGHT_EYE_BOX, scale)
+
+    # Check if the iris centers of both eyes are inside the pupil shapes
+    looking_inside = inside_mask(left_shapes, get_iris_centers(mesh_points, LEFT_IRIS)) & inside_mask(right_shapes, get_iris_centers(mesh_points, RIGHT_IRIS))
+
+    # If the eyes are blanking, the user is not cheating
+    inside[indices] = looking_inside | blanking_mask(mesh_points)
+    return inside
+
+class EyeCheatingAnalyzer:
+    """
+    Classifies the frames of a video as looking inside or outside the screen.
+
+    The frames are buffered and classified in batches of batch_size frames by eye_cheating_kernel. Only the current batch,
+    the counters and the merged durations of the cheating frames are kept, so the memory used does not grow with the length of the video.
+
+    Parameters:
+    calibrationPoints (tuple): Tuple containing the mapping points and reference points for calibration.
+    fps (int): Frames per second of the video sequence.
+    batch_size (int): The number of frames classified together.
+    """
+
+    def __init__(self, calibrationPoints, fps, batch_size=BATCH_SIZE):
+        self.constants = get_calibration_constants(calibrationPoints)
+        self.mesh_points = np.zeros((batch_size, NUM_LANDMARKS, 2), dtype=np.int32)
+        self.valid = np.zeros(batch_size, dtype=bool)
+        self.frame_sizes = np.ones((batch_size, 2), dtype=int)
+        self.buffered = 0
+        self.nonCheatingRate = 0
+        self.frame_count = 0
+        self.durations = DurationsBuilder(fps)
+
+    def update(self, frame):
+        """
+        Adds the next frame of the video.
+
+        Parameters:
+        frame (numpy.ndarray): The next frame of the video sequence.
+        """
+        self.update_landmarks(get_mesh_points(frame), frame.shape)
+
+    def update_landmarks(self, mesh_points, frame_shape):
+        """
+        Adds the next frame of the video from its face landmarks, extracted by a shared landmark stage.
+
+        Parameters:
+        mesh_points (numpy.ndarray): The mesh points of the frame if exactly one face is detected, None otherwise.
+        frame_shape (tuple): The shape of the frame.
+        """
+        if mesh_points is not None:
+            self.mesh_points[self.buffered] = mesh_points
+        self.valid[self.buffered] = mesh_points is not None
+        self.frame_sizes[self.buffered] = frame_shape[:2]
+        self.buffered += 1
+        if self.buffered == len(self.valid):
+            self.flush()
+
+    def flush(self):
+        """
+        Classifies the buffered frames.
+        """
+        if self.buffered == 0:
+            return
+        inside = eye_cheating_kernel(self.mesh_points[:self.buffered], self.valid[:self.buffered], self.frame_sizes[:self.buffered], self.constants)
+
+        # Update the cheating rate and the cheating durations
+        self.nonCheatingRate += int(inside.sum())
+        self.durations.add_mask(inside == 0, self.frame_count)
+        self.frame_count += self.buffered
+        self.buffered = 0
+
+    def result(self):
+        """
+        Returns the cheating rate and durations of the frames added so far.
+
+        Returns:
+        float: Cheating rate, a value between 0 and 1 representing the percentage of frames classified as cheating.
+        list: List of merged durations of consecutive cheating frames.
+        """
+        self.flush()
+        return 1 - (self.nonCheatingRate / max(self.frame_count, 1)), self.durations.durations
+
 def eyeCheating(frames, calibrationPoints, fps):
     """
     Calculates the cheating rate and durations of cheating frames.
 
     Parameters:
-    frames (list): List of frames in the video sequence.
+    frames (iterable): The frames of the video sequence, e.g. a list or a generator decoding the video.
     calibrationPoints (tuple): Tuple containing the mapping points and reference points for calibration.
     fps (int): Frames per second of the video sequence.
 
@@ -252,118 +496,7 @@ def eyeCheating(frames, calibrationPoints, fps):
     float: Cheating rate, a value between 0 and 1 representing the percentage of frames classified as cheating.
     list: List of merged durations of consecutive cheating frames.
     """
-
-    mapping_points, left_eye_most_left_ref, left_eye_most_right_ref, left_eye_center_ref, right_eye_center_ref = calibrationPoints
-    nonCheatingRate = 0
-    cheating_frames_idx = []
-
-    for frame_idx, frame in enumerate(frames):
-        frame_height, frame_width, _ = frame.shape
-        inside = 1
-        mesh_points = get_mesh_points(frame)
-
-        if mesh_points is not None:
-            # Calculate new eye centers
-            new_left_center = np.array(mesh_points[[LEFT_EYE_MOST_RIGHT, LEFT_EYE_MOST_LEFT, LEFT_EYE_MOST_DOWN, LEFT_EYE_MOST_UP]]).mean(axis=0).astype(int)
-            new_right_center = np.array(mesh_points[[RIGHT_EYE_MOST_RIGHT, RIGHT_EYE_MOST_LEFT, RIGHT_EYE_MOST_DOWN, RIGHT_EYE_MOST_UP]]).mean(axis=0).astype(int)
-            
-            # Calculate movement transformations
-            left_movement_transformation = new_left_center - left_eye_center_ref
-            right_movement_transformation = new_right_center - right_eye_center_ref
-            
-            # Calculate minimum and maximum points for mapping points
-            left_min = np.array([point[0] for point in mapping_points]).reshape(-1,2).min(axis=0)
-            left_max = np.array([point[0] for point in mapping_points]).reshape(-1,2).max(axis=0)
-            right_min = np.array([point[1] for point in mapping_points]).reshape(-1,2).min(axis=0)
-            right_max = np.array([point[1] for point in mapping_points]).reshape(-1,2).max(axis=0)
-            
-            # Calculate opposite shift transformations
-            left_opposite_shif_transformation = -(left_movement_transformation/np.array(frame.shape[:2])) * (left_max - left_min)
-            right_opposite_shif_transformation = -(right_movement_transformation/np.array(frame.shape[:2])) * (right_max - right_min)
-            
-            # Calculate final transformations
-            left_transformation = left_opposite_shif_transformation.astype(int) + left_movement_transformation
-            right_transformation = right_opposite_shif_transformation.astype(int) + right_movement_transformation
-            
-            # Calculate mean points for mapping points after transformations
-            left_mean = np.array([point[0] + left_transformation for point in mapping_points]).reshape(-1,2).mean(axis=0)
-            right_mean = np.array([point[1] + right_transformation for point in mapping_points]).reshape(-1,2).mean(axis=0)
-            
-            # Calculate scale factor
-            scale = eculedian_distance(mesh_points[LEFT_EYE_MOST_LEFT], mesh_points[LEFT_EYE_MOST_RIGHT]) / eculedian_distance(left_eye_most_left_ref, left_eye_most_right_ref)
-            
-            scale *= 1.3
-            
-            # Initialize list for new mapping points after transformations
-            new_mapping_points = []
-            for point in mapping_points:
-                # Apply transformations to mapping point
-                left_new_point = point[0] + left_transformation
-                # Scale the new point
-                left_new_point = (left_new_point - left_mean) * scale + left_mean
-                left_new_point = left_new_point.astype(int)
-                # Apply transformations to mapping point
-                right_new_point = point[1] + right_transformation
-                # Scale the new point
-                right_new_point = (right_new_point - right_mean) * scale + right_mean
-                right_new_point = right_new_point.astype(int)
-                
-                # Append new mapping points to the list
-                new_mapping_points.append([left_new_point, right_new_point])
-                    
-            left_mapping_points = [point[0] for point in new_mapping_points]
-            left_mapping_points = np.array(left_mapping_points).reshape(-1, 1, 2).astype(int)
-            right_mapping_points = [point[1] for point in new_mapping_points]
-            right_mapping_points = np.array(right_mapping_points).reshape(-1, 1, 2).astype(int)
-            
-            left_lines = []
-            right_lines = []
-            
-            for i in range(len(new_mapping_points)-1):
-                # Append the line segments that construct the pupil shape
-                left_lines.append((new_mapping_points[i][0], new_mapping_points[i+1][0]))
-                right_lines.append((new_mapping_points[i][1], new_mapping_points[i+1][1]))   
-                
-            # Append the last line segment that connects the last and first points    
-            left_lines.append((new_mapping_points[-1][0], new_mapping_points[0][0]))
-            right_lines.append((new_mapping_points[-1][1], new_mapping_points[0][1]))
-                        
-            # Calculate the centers of the pupil shape for both eyes            
-            left_shape_center = np.mean(left_mapping_points, axis=0).astype(int)[0]
-            right_shape_center = np.mean(right_mapping_points, axis=0).astype(int)[0]
-            
-            # Calculate the centers of the iris for both eyes
-            (left_iris_center_x, left_iris_center_y), _ = cv2.minEnclosingCircle(mesh_points[LEFT_IRIS])
-            (right_iris_center_x, right_iris_center_y), _ = cv2.minEnclosingCircle(mesh_points[RIGHT_IRIS])
-            
-            # Check if the iris centers of the left eye are inside the pupil shape
-            for line in left_lines:
-                if not if_same_side(line[0], line[1], left_shape_center, left_iris_center_x, left_iris_center_y):
-                    inside = 0
-            
-            # Check if the iris centers of the left eye are inside the pupil shape        
-            for line in right_lines:
-                if not if_same_side(line[0], line[1], right_shape_center, right_iris_center_x, right_iris_center_y):
-                    inside = 0
-                   
-            # Check if the eyes are blanking
-            if is_blanking(mesh_points):
-                # If the eyes are blanking, set the inside to 1 as the user is not cheating
-                inside = 1
-            
-        else:
-            # If the face is not detected or more one face detected, set the inside flag to 0
-            inside = 0
-            
-        # Update the cheating rate and the list of cheating frames
-        nonCheatingRate += inside
-        if inside == 0:
-            cheating_frames_idx.append(frame_idx)
-            
-    # Get the durations of the cheating frames
-    durations = frame_indices_to_durations(cheating_frames_idx, fps)
-    # Merge the overlapping durations
-    merged_durations = merge_overlapping_durations(durations)
-    
-    return 1 - (nonCheatingRate / len(frames)), merged_durations
-    
\ No newline at end of file
+    analyzer = EyeCheatingAnalyzer(calibrationPoints, fps)
+    for frame in frames:
+        analyzer.update(frame)
+    return analyzer.result()
@@ -0,0 +1,215 @@
+import os
+import numpy as np
+import cv2
+import mediapipe as mp
+
+mp_face_mesh = mp.solutions.face_mesh
+
+# Number of landmarks of the face mesh with refined eye and iris landmarks
+NUM_LANDMARKS = 478
+
+# Run the face mesh model on a crop around the face tracked from the previous landmarks instead of the full frame
+FACE_ROI = os.getenv('FACE_ROI', '0') == '1'
+
+# Padding added around the face on each side, relative to the size of the face
+ROI_PADDING = float(os.getenv('FACE_ROI_PADDING', 0.3))
+
+# Longest side of the crop given to the model, close to the input size of the face landmark model
+ROI_SIZE = int(os.getenv('FACE_ROI_SIZE', 256))
+
+# Longest side of the full frames given to the model in ROI mode
+FULL_FRAME_SIZE = int(os.getenv('FACE_ROI_FULL_FRAME_SIZE', 640))
+
+# Number of frames between two full frame passes in ROI mode, which detect the faces outside of the crop
+ROI_REFRESH_FRAMES = int(os.getenv('FACE_ROI_REFRESH_FRAMES', 15))
+
+def create_face_mesh(max_num_faces=2):
+    """
+    Creates the face mesh model used to extract the face landmarks.
+
+    Parameters:
+    - max_num_faces (int): The maximum number of faces detected. Two faces are enough to tell that more than one person is in the frame.
+
+    Returns:
+    - FaceMesh: The Mediapipe face mesh model.
+    """
+    return mp_face_mesh.FaceMesh(
+        max_num_faces=max_num_faces,
+        refine_landmarks=True,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+def landmarks_to_points(face_landmarks, frame_width, frame_height, offset=None):
+    """
+    Converts the normalized landmarks of a face to pixel coordinates.
+
+    Parameters:
+    - face_landmarks: The landmarks of a face detected by the face mesh model.
+    - frame_width (int): The width of the image given to the model, in pixels of the full frame.
+    - frame_height (int): The height of the image given to the model, in pixels of the full frame.
+    - offset (tuple, optional): The (x, y) position of the image in the full frame, for a crop.
+
+    Returns:
+    - mesh_points (numpy.ndarray): The (NUM_LANDMARKS, 2) int32 pixel coordinates of the landmarks in the full frame.
+    """
+    points = np.array([(point.x, point.y) for point in face_landmarks.landmark], dtype=np.float64)
+    points = points * np.array([frame_width, frame_height])
+    if offset is not None:
+        points += np.array(offset)
+    # Truncate like int() does, in int32 as expected by OpenCV
+    return points.astype(np.int32)
+
+def downscale(image, size):
+    """
+    Downscales an image so that its longest side is at most size pixels.
+
+    Parameters:
+    - image (numpy.ndarray): The image.
+    - size (int): The maximum length of the longest side.
+
+    Returns:
+    - numpy.ndarray: The downscaled image, or the image itself if it is small enough.
+    """
+    height, width = image.shape[:2]
+    scale = size / max(height, width)
+    if scale >= 1:
+        return image
+    return cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+def get_face_box(mesh_points, frame_shape, padding=ROI_PADDING):
+    """
+    Gets a padded square box around the face, clipped to the frame.
+
+    Parameters:
+    - mesh_points (numpy.ndarray): The mesh points of the face.
+    - frame_shape (tuple): The shape of the frame.
+    - padding (float): The padding added on each side, relative to the size of the face.
+
+    Returns:
+    - tuple: The (x_min, y_min, x_max, y_max) box.
+    """
+    frame_height, frame_width = frame_shape[:2]
+    x_min, y_min = mesh_points.min(axis=0)
+    x_max, y_max = mesh_points.max(axis=0)
+    center_x, center_y = (x_min + x_max) / 2, (y_min + y_max) / 2
+    half_size = max(x_max - x_min, y_max - y_min) * (0.5 + padding)
+    return (max(0, int(center_x - half_size)), max(0, int(center_y - half_size)),
+            min(frame_width, int(center_x + half_size) + 1), min(frame_height, int(center_y + half_size) + 1))
+
+def box_contains(box, mesh_points):
+    """
+    Checks if all the mesh points of a face are inside a box.
+    """
+    x_min, y_min = mesh_points.min(axis=0)
+    x_max, y_max = mesh_points.max(axis=0)
+    return box[0] <= x_min and box[1] <= y_min and x_max < box[2] and y_max < box[3]
+
+class LandmarkExtractor:
+    """
+    Runs the face mesh model once per frame and shares its landmarks between the eye and lip analyzers.
+
+    In ROI mode, the model runs on a padded crop around the face tracked from the previous landmarks, downscaled to about
+    the input size of the model, and the landmarks are mapped back to the pixels of the full frame, so the pixel thresholds
+    of the analyzers are unchanged. The crop is kept while the face stays inside it, so that the tracking of the model is stable.
+    The full frame, downscaled, is analyzed when the face is lost and every ROI_REFRESH_FRAMES frames, to detect the faces
+    outside of the crop.
+
+    Parameters:
+    - face_mesh (FaceMesh, optional): The face mesh model. Defaults to a new model detecting up to max_num_faces faces.
+    - roi (bool): Run the model on a crop around the face.
+    - max_num_faces (int): The maximum number of faces detected by the models created by the extractor.
+    """
+
+    def __init__(self, face_mesh=None, roi=FACE_ROI, max_num_faces=2):
+        self.face_mesh = face_mesh if face_mesh is not None else create_face_mesh(max_num_faces)
+        self.roi = roi
+        self.max_num_faces = max_num_faces
+        # The crop has its own model, as the tracking of a model needs images of a stable geometry
+        self.roi_face_mesh = None
+        self.roi_box = None
+        self.frames_since_full = 0
+
+    def process_image(self, face_mesh, image, width, height, offset=None):
+        """
+        Runs a face mesh model on an image and maps the landmarks back to the full frame.
+
+        Parameters:
+        - face_mesh (FaceMesh): The face mesh model.
+        - image (numpy.ndarray): The image given to the model.
+        - width (int): The width of the image, in pixels of the full frame.
+        - height (int): The height of the image, in pixels of the full frame.
+        - offset (tuple, optional): The (x, y) position of the image in the full frame.
+
+        Returns:
+        - mesh_points (numpy.ndarray): The pixel coordinates of the landmarks if exactly one face is detected, None otherwise.
+        - face_count (int): The number of faces detected.
+        """
+        results = face_mesh.process(image)
+        face_count = len(results.multi_face_landmarks) if results.multi_face_landmarks else 0
+        if face_count != 1:
+            return None, face_count
+        return landmarks_to_points(results.multi_face_landmarks[0], width, height, offset), face_count
+
+    def process(self, frame):
+        """
+        Extracts the face landmarks of a frame.
+
+        Parameters:
+        - frame (numpy.ndarray): The frame.
+
+        Returns:
+        - mesh_points (numpy.ndarray): The pixel coordinates of the landmarks if exactly one face is detected, None otherwise.
+        - face_count (int): The number of faces detected.
+        """
+        frame_height, frame_width, _ = frame.shape
+        if not self.roi:
+            return self.process_image(self.face_mesh, frame, frame_width, frame_height)
+
+        mesh_points, face_count = None, 0
+        use_roi = self.roi_box is not None and self.frames_since_full < ROI_REFRESH_FRAMES
+        if use_roi:
+            x_min, y_min, x_max, y_max = self.roi_box
+            if self.roi_face_mesh is None:
+                self.roi_face_mesh = create_face_mesh(self.max_num_faces)
+            crop = downscale(frame[y_min:y_max, x_min:x_max], ROI_SIZE)
+            mesh_points, face_count = self.process_image(self.roi_face_mesh, crop, x_max - x_min, y_max - y_min, (x_min, y_min))
+            self.frames_since_full += 1
+
+        # Analyze the full frame if the face is lost in the crop, or to look for other faces
+        if mesh_points is None:
+            mesh_points, face_count = self.process_image(self.face_mesh, downscale(frame, FULL_FRAME_SIZE), frame_width, frame_height)
+            self.frames_since_full = 0
+
+        # Keep the crop while the face stays inside it
+        if mesh_points is None:
+            self.roi_box = None
+        elif self.roi_box is None or not box_contains(self.roi_box, mesh_points):
+            self.roi_box = get_face_box(mesh_points, frame.shape)
+        return mesh_points, face_count
+
+    def close(self):
+        """
+        Releases the face mesh models.
+        """
+        self.face_mesh.close()
+        if self.roi_face_mesh is not None:
+            self.roi_face_mesh.close()
+
+def extract_landmarks(frames, extractor=None):
+    """
+    Extracts the face landmarks of a sequence of frames, one frame at a time.
+
+    Parameters:
+    - frames (iterable): The frames, e.g. a list or a generator decoding the video.
+    - extractor (LandmarkExtractor, optional): The extractor. Defaults to a new extractor.
+
+    Yields:
+    - frame_shape (tuple): The shape of the frame.
+    - mesh_points (numpy.ndarray): The pixel coordinates of the landmarks if exactly one face is detected, None otherwise.
+    - face_count (int): The number of faces detected.
+    """
+    extractor = extractor if extractor is not None else LandmarkExtractor()
+    for frame in frames:
+        mesh_points, face_count = extractor.process(frame)
+        yield frame.shape, mesh_points, face_count
@@ -1,3 +1,6 @@
+import numpy as np
+import Intervals
+
 def frame_indices_to_durations(frame_indices, fps):
     """
     Converts a list of frame indices to a list of durations.
@@ -16,17 +19,9 @@ def frame_indices_to_durations(frame_indices, fps):
         - The durations are returned as a list of tuples.
 
     """
-    durations = []
-    for frame_index in frame_indices:
-        # Calculate the time in seconds for the current frame index
-        time_in_seconds = frame_index / fps
-        # Find the nearest lower 0.5 boundary for the start of the interval
-        start = (time_in_seconds // 0.5) * 0.5
-        end = start + 0.5
-        # Append the tuple to the list of durations
-        durations.append((start, end))
-        
-    return durations
+    # Find the nearest lower 0.5 boundary of the time of each frame for the start of its interval
+    starts = (np.asarray(frame_indices, dtype=np.float64) / fps // Intervals.STEP) * Intervals.STEP
+    return Intervals.to_tuples(starts, starts + Intervals.STEP)
 
 def merge_overlapping_durations(durations):
     """
@@ -46,19 +41,60 @@ def merge_overlapping_durations(durations):
     if not durations:
         return []
 
-    # Initialize merged durations with the first duration
-    merged_durations = [durations[0]]
+    return Intervals.to_tuples(*Intervals.merge(*Intervals.to_arrays(durations)))
+
+class DurationsBuilder:
+    """
+    Builds the merged durations of a stream of increasing frame indices, one frame at a time.
 
-    for current in durations[1:]:
-        # Get the last interval in the merged_durations list
-        last = merged_durations[-1]
+    It gives the same result as frame_indices_to_durations followed by merge_overlapping_durations,
+    without keeping the list of frame indices.
 
-        # Check if the current interval overlaps with the last interval
-        if current[0] <= last[1]:
-            # If they overlap, merge the intervals
-            merged_durations[-1] = (last[0], max(last[1], current[1]))
+    Args:
+        fps (float): Frames per second of the video.
+
+    Attributes:
+        durations (list): The merged durations of the frames added so far, in the format (start, end).
+    """
+
+    def __init__(self, fps):
+        self.fps = fps
+        self.durations = []
+
+    def add(self, frame_index):
+        """
+        Adds a frame index to the durations.
+
+        Args:
+            frame_index (int): The frame index, not lower than the previous one.
+        """
+        # Find the nearest lower 0.5 boundary for the start of the interval
+        start = ((frame_index / self.fps) // 0.5) * 0.5
+        end = start + 0.5
+        self.extend(start, end)
+
+    def extend(self, start, end):
+        """
+        Adds a duration, not starting before the previous ones.
+
+        Args:
+            start (float): The start of the duration, in seconds.
+            end (float): The end of the duration, in seconds.
+        """
+        # Extend the last duration if they overlap, otherwise start a new one
+        if self.durations and start <= self.durations[-1][1]:
+            self.durations[-1] = (self.durations[-1][0], max(self.durations[-1][1], end))
         else:
-            # If they do not overlap, add the current interval to the list
-            merged_durations.append(current)
+            self.durations.append((start, end))
+
+    def add_mask(self, mask, first_frame):
+        """
+        Adds the frames of a mask to the durations, with a run-length encoding instead of one frame at a time.
 
-    return merged_durations
+        Args:
+            mask (numpy.ndarray): The boolean mask of the frames to add.
+            first_frame (int): The frame index of the first frame of the mask, not lower than the previous frame indices.
+        """
+        starts, ends = Intervals.frames_to_intervals(mask, self.fps, first_frame=first_frame)
+        for start, end in Intervals.to_tuples(starts, ends):
+            self.extend(start, end)
@@ -0,0 +1,103 @@
+import numpy as np
+
+# Step of the durations reported to the Express server, in seconds
+STEP = 0.5
+
+def to_arrays(intervals):
+    """
+    Convert (start, end) tuples to arrays of starts and ends.
+
+    Parameters:
+    intervals (list): The (start, end) intervals.
+
+    Returns:
+    starts (numpy.ndarray): The starts of the intervals.
+    ends (numpy.ndarray): The ends of the intervals.
+    """
+    array = np.asarray(intervals, dtype=np.float64).reshape(-1, 2)
+    return array[:, 0], array[:, 1]
+
+def to_tuples(starts, ends):
+    """
+    Convert arrays of starts and ends to (start, end) tuples of Python floats.
+    """
+    return list(zip(starts.tolist(), ends.tolist()))
+
+def mask_to_runs(mask):
+    """
+    Run-length encode a boolean mask into the runs of consecutive True values.
+
+    Parameters:
+    mask (numpy.ndarray): The per-frame boolean mask.
+
+    Returns:
+    starts (numpy.ndarray): The index of the first frame of each run.
+    ends (numpy.ndarray): The index after the last frame of each run.
+    """
+    changes = np.diff(np.concatenate(([0], np.asarray(mask, dtype=np.int8), [0])))
+    return np.flatnonzero(changes == 1), np.flatnonzero(changes == -1)
+
+def quantize(starts, ends, step=STEP):
+    """
+    Round the starts down and the ends up to a multiple of step.
+    """
+    return np.floor(starts / step) * step, np.ceil(ends / step) * step
+
+def offset(starts, ends, shift):
+    """
+    Shift intervals by shift seconds.
+    """
+    return starts + shift, ends + shift
+
+def pad(starts, ends, padding, lower=0, upper=None):
+    """
+    Widen intervals by padding on each side, clipped to [lower, upper].
+    """
+    starts = np.maximum(starts - padding, lower)
+    ends = ends + padding
+    if upper is not None:
+        ends = np.minimum(ends, upper)
+    return starts, ends
+
+def merge(starts, ends, margin=0):
+    """
+    Merge the intervals that overlap or are less than margin apart.
+
+    Parameters:
+    starts (numpy.ndarray): The starts of the intervals.
+    ends (numpy.ndarray): The ends of the intervals.
+    margin (float): The maximum gap between two merged intervals.
+
+    Returns:
+    starts (numpy.ndarray): The starts of the merged intervals, in increasing order.
+    ends (numpy.ndarray): The ends of the merged intervals.
+    """
+    if len(starts) == 0:
+        return starts, ends
+    order = np.argsort(starts, kind='stable')
+    starts, ends = starts[order], ends[order]
+    # An interval starts a new group if it starts after the end of all the previous intervals, plus the margin
+    reach = np.maximum.accumulate(ends)
+    first = np.concatenate(([0], np.flatnonzero(starts[1:] > reach[:-1] + margin) + 1))
+    return starts[first], np.maximum.reduceat(ends, first)
+
+def frames_to_intervals(mask, fps, step=STEP, first_frame=0):
+    """
+    Get the merged durations of the frames of a mask, each frame covering the step of time it falls in,
+    like frame_indices_to_durations followed by merge_overlapping_durations.
+
+    Parameters:
+    mask (numpy.ndarray): The per-frame boolean mask, e.g. of the cheating frames.
+    fps (float): Frames per second of the video.
+    step (float): The step of the durations, in seconds.
+    first_frame (int): The index of the first frame of the mask in the video.
+
+    Returns:
+    starts (numpy.ndarray): The starts of the durations, in seconds.
+    ends (numpy.ndarray): The ends of the durations, in seconds.
+    """
+    runs_starts, runs_ends = mask_to_runs(mask)
+    starts = ((runs_starts + first_frame) / fps // step) * step
+    ends = ((runs_ends - 1 + first_frame) / fps // step) * step + step
+    # Runs falling in the same or adjacent steps touch each other
+    return merge(starts, ends)
@@ -1,5 +1,4 @@
-import time
-import requests
+import json
 from Quiz import Quiz
 import Similarity
 import Voice_Analysis
@@ -7,13 +6,71 @@ import numpy as np
 import joblib
 import os
 import argparse
-import ffmpeg
+import Audio_Extraction
+from Stage_Executor import StageExecutor, THREAD, PROCESS
 from dotenv import load_dotenv
-import speech_recognition as sr
+import ASR
+import VAD
 import sys
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import Express_Outbox
 
-def Interview(videoPath, topLeftImagePath, topRightImagePath, bottomRightImagePath, bottomLeftImagePath, correctAnswers):
+# Stages of an interview run in processes instead of threads. None by default: the numpy, OpenCV and MediaPipe work of the stages
+# releases the GIL, and the processes would load the models again on every interview instead of using the ones of the worker
+PROCESS_STAGES = set(filter(None, os.getenv('INTERVIEW_PROCESS_STAGES', '').split(',')))
+
+def getStageKind(name):
+    """Get the kind of a stage of an interview, PROCESS if it is in INTERVIEW_PROCESS_STAGES, THREAD otherwise."""
+    return PROCESS if name in PROCESS_STAGES else THREAD
+
+# Trained SVM model for emotion analysis, loaded once per process
+svm_model = None
+
+def loadSvmModel():
+    """
+    Load the trained SVM model for emotion analysis on first use and keep it resident for the next interviews.
+
+    Returns:
+    - svm_model: The SVM model.
+    """
+    global svm_model
+    if svm_model is None:
+        model_filename = 'models\HireUp_interview\\svm_emotion_model.pkl'
+        svm_model = joblib.load(model_filename)
+    return svm_model
+
+def recognizeSpeech(audio, intervals):
+    """
+    Get the applicant answers from the speech intervals of the audio, with the ASR backend.
+
+    Parameters:
+    - audio (numpy.ndarray): The decoded audio of the video.
+    - intervals (list): The speech intervals in seconds.
+
+    Returns:
+    - applicantAnswers (str): The recognized text, empty if it could not be recognized.
+    """
+    return ASR.transcribe(audio, intervals)
+
+def analyzeEmotions(audio, intervals=None):
+    """
+    Detect the emotions in the applicant's voice.
+
+    Parameters:
+    - audio (numpy.ndarray): The decoded audio of the video.
+    - intervals (list, optional): Only analyze the speech intervals, in seconds. Defaults to the whole audio.
+
+    Returns:
+    - emotion_percentages (dict): The percentages of the emotions detected.
+    """
+    # Load the trained SVM model for emotion analysis
+    svm_model = loadSvmModel()
+    _, emotion_percentages = Voice_Analysis.classify_samples(audio, Audio_Extraction.SAMPLING_RATE, svm_model, intervals=intervals)
+    return emotion_percentages
+
+
+def Interview(videoPath, topLeftImagePath, topRightImagePath, bottomRightImagePath, bottomLeftImagePath, correctAnswers, processes=None):
     """
     Get interview results for a video interview.
     
@@ -23,95 +80,62 @@ def Interview(videoPath, topLeftImagePath, topRightImagePath, bottomRightImagePa
     - topRightImagePath (str): Path to the image file for the top right eye region.
     - bottomRightImagePath (str): Path to the image file for the bottom right eye region.
     - bottomLeftImagePath (str): Path to the image file for the bottom left eye region.
-    - correctAnswers (str): The correct answers to the interview questions.
+    - correctAnswers (str): The correct answers to the interview questions, or None to leave the answers unscored, e.g. to score
+      the answers of all the questions of an interview together with Similarity.getSimilarities.
+    - processes (concurrent.futures.Executor, optional): A long-lived executor running the stages of INTERVIEW_PROCESS_STAGES.
+      Defaults to a pool spawned for this interview.
     
     Returns:
     - eyeCheatingRate (float): The rate of eye cheating detected during the interview.
     - speakingCheatingRate (float): The rate of speaking cheating detected during the interview.
-    - similarity (float): The similarity score between the applicant's answers and the correct answers.
+    - similarity (float): The similarity score between the applicant's answers and the correct answers, None if correctAnswers is None.
     - emotion_percentages (dict): A dictionary containing the percentages of different emotions detected in the applicant's voice.
+    - eyeCheatingDurations (list): The durations where eye cheating occurs.
+    - speakingCheatingDurations (list): The durations where speaking cheating occurs.
+    - applicantAnswers (str): The recognized answers of the applicant.
     """
     
-    # Extract the audio from the video
-    audioOutput = os.path.splitext(videoPath)[0] + '.wav'
-    if os.path.isfile(audioOutput):
-        os.remove(audioOutput)
-    ffmpeg.input(videoPath).output(audioOutput).run()
-    
-    # Get the applicant answers from the audio
-    r = sr.Recognizer()
-    with sr.AudioFile(audioOutput) as source:
-        audio = r.record(source)
-    try:
-        applicantAnswers = r.recognize_google(audio)
-    except sr.UnknownValueError:
-        print("Google Speech Recognition could not understand the audio")
-        applicantAnswers = ""
-    except sr.RequestError as e:
-        print(f"Could not request results from Google Speech Recognition service; {e}")
-        applicantAnswers = ""
-    
-    # Perform eye cheating detection and get cheating rates and durations
-    eyeCheatingRate, speakingCheatingRate, eyeCheatingDurations, speakingCheatingDurations = Quiz(videoPath, topLeftImagePath, topRightImagePath, bottomRightImagePath, bottomLeftImagePath, isQuiz=False)
-    
+    # Run the independent stages concurrently once the audio is decoded, in threads unless configured otherwise
+    stages = StageExecutor(processes)
+    # Decode the audio of the video once, for the speech recognition, the VAD and the emotion analysis
+    stages.add('audio', Audio_Extraction.extract_audio, args=(videoPath,))
+    # Detect the speech intervals, shared by the speech recognition and the lip analysis
+    stages.add('vad', VAD.getVideoSpeechIntervals, args=(videoPath,), deps={'audio': 'audio'}, kind=getStageKind('vad'))
+    # Get the applicant answers from the speech intervals
+    stages.add('asr', recognizeSpeech, deps={'audio': 'audio', 'intervals': 'vad'}, kind=getStageKind('asr'))
     # Calculate the similarity between the applicant's answers and the correct answers
-    similarity = Similarity.getSimilarity(applicantAnswers, correctAnswers)
-    
-    print("Current working directory:", os.getcwd())
-    # Load the trained SVM model for emotion analysis
-    model_filename = 'models\HireUp_interview\\svm_emotion_model.pkl'
-    svm_model = joblib.load(model_filename)
-    output_folder = os.path.splitext(audioOutput)[0]
-    
-    # Combine the audio files for analysis
-    combined_audio_file = output_folder + '_combined.wav'
-    print("combined_audio_file:",combined_audio_file)
-    
-    Voice_Analysis.combine_wav_files(output_folder, combined_audio_file)
-    
-    # Classify the combined audio file to detect emotions
-    _, emotion_percentages = Voice_Analysis.classify_audio(combined_audio_file, svm_model)
-    
-    # Clean up temporary files (uncomment if needed)
-    # shutil.rmtree(output_folder)
-    # os.remove(combined_audio_file)
+    if correctAnswers is not None:
+        stages.add('similarity', Similarity.getSimilarity, kwargs={'s2': correctAnswers}, deps={'s1': 'asr'}, kind=getStageKind('similarity'))
+    # Perform eye cheating detection and get cheating rates and durations
+    stages.add('vision', Quiz, args=(videoPath, topLeftImagePath, topRightImagePath, bottomRightImagePath, bottomLeftImagePath), kwargs={'isQuiz': False}, deps={'intervals': 'vad'}, kind=getStageKind('vision'))
+    # Classify the speech segments of the audio to detect emotions
+    stages.add('emotion', analyzeEmotions, deps={'audio': 'audio', 'intervals': 'vad'}, kind=getStageKind('emotion'))
+    results = stages.run()
+    print("Stage timings:", {name: round(duration, 3) for name, duration in stages.timings.items()})
+
+    eyeCheatingRate, speakingCheatingRate, eyeCheatingDurations, speakingCheatingDurations = results['vision']
+    similarity = results.get('similarity')
+    emotion_percentages = results['emotion']
     
-    return eyeCheatingRate, speakingCheatingRate, similarity, emotion_percentages , eyeCheatingDurations, speakingCheatingDurations
-
-
-def wait_for_express_server():
-    while True:
-        try:
-            # Get the address of the Express server from the environment variable
-            express_server_address = os.getenv('EXPRESS_SERVER_ADDRESS', 'http://localhost:3000')
-            # Send a GET request to the Express server
-            response = requests.get(express_server_address)
-            if response.status_code == 200:
-                print("Express server started.")
-                break
-        except requests.exceptions.ConnectionError:
-            pass
-        print("Waiting for the Express server to start...")
-        time.sleep(1)
-        
-def login():
-    # Get the address of the Express server from the environment variable
-    express_server_address = os.getenv('EXPRESS_SERVER_ADDRESS', 'http://localhost:3000')
-    # Get the login credentials from the environment variables
-    email = os.getenv('EXPRESS_SERVER_EMAIL', 'email@example.com')
-    password = os.getenv('EXPRESS_SERVER_PASSWORD', 'password')
-    # Send a POST request to the Express server to login
-    response = requests.post(f"{express_server_address}/account/logIn", json={"email": email, "password": password})
-    if response.status_code == 200:
-        print("Login successful.")
-        return response.json().get('token')
-    else:
-        print("Login failed.")
-        
-def send_interview_question_data(applicationID, questionEyeCheating, questionFaceSpeechCheating, questionSimilarity, questionEmotions, eyeCheatingDurations, speakingCheatingDurations, token):
-    # Get the address of the Express server from the environment variable
-    express_server_address = os.getenv('EXPRESS_SERVER_ADDRESS', 'http://localhost:3000')
-      # Convert numpy.float32 to float
+    return eyeCheatingRate, speakingCheatingRate, similarity, emotion_percentages , eyeCheatingDurations, speakingCheatingDurations, results['asr']
+
+
+def get_interview_question_data(questionEyeCheating, questionFaceSpeechCheating, questionSimilarity, questionEmotions, eyeCheatingDurations, speakingCheatingDurations):
+    """
+    Build the JSON body of the interview question data sent to the Express server.
+
+    Parameters:
+    - questionEyeCheating (float): The eye cheating rate of the question.
+    - questionFaceSpeechCheating (float): The speaking cheating rate of the question.
+    - questionSimilarity (float): The similarity between the applicant's answer and the correct answer.
+    - questionEmotions (dict): The percentages of the emotions detected in the applicant's voice.
+    - eyeCheatingDurations (list): The durations where eye cheating occurs.
+    - speakingCheatingDurations (list): The durations where speaking cheating occurs.
+
+    Returns:
+    - questionData (dict): The serializable interview question data.
+    """
+    # Convert numpy.float32 to float
     questionEyeCheating = float(questionEyeCheating) if isinstance(questionEyeCheating, np.float32) else questionEyeCheating
     questionFaceSpeechCheating = float(questionFaceSpeechCheating) if isinstance(questionFaceSpeechCheating, np.float32) else questionFaceSpeechCheating
     questionSimilarity = float(questionSimilarity) if isinstance(questionSimilarity, np.float32) else questionSimilarity
@@ -121,14 +145,7 @@ def send_interview_question_data(applicationID, questionEyeCheating, questionFac
     emotion_percentages_serializable = {emotion: float(percentage) for emotion, percentage in questionEmotions.items()}
     # Convert it to a list of objects
     emotion_percentages_serializable = [{"emotion": emotion, "percentage": percentage} for emotion, percentage in emotion_percentages_serializable.items()]
-    # Send a POST request to the Express server to add the topic
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.post(f"{express_server_address}/application/{applicationID}/interviewQuestionData", json={"questionEyeCheating": questionEyeCheating, "questionFaceSpeechCheating": questionFaceSpeechCheating, "questionSimilarity": questionSimilarity,  "questionEmotions": emotion_percentages_serializable, "questionEyeCheatingDurations": eyeCheatingDurations, "questionSpeakingCheatingDurations": speakingCheatingDurations}, headers=headers)
-    if response.status_code == 200:
-        print(f"Interview Question Data added successfully.")
-    else:
-        print(response)
-        print(f"Failed to add Interview Question Data.")
+    return {"questionEyeCheating": questionEyeCheating, "questionFaceSpeechCheating": questionFaceSpeechCheating, "questionSimilarity": questionSimilarity,  "questionEmotions": emotion_percentages_serializable, "questionEyeCheatingDurations": eyeCheatingDurations, "questionSpeakingCheatingDurations": speakingCheatingDurations}
         
 def main():
     parser = argparse.ArgumentParser(description="Run the Interview process.")
@@ -139,6 +156,7 @@ def main():
     parser.add_argument("--downLeftImagePath", required=True, help="Path to the bottom left image file")
     parser.add_argument("--correctAnswer", required=True, help="Correct answers for the interview questions")
     parser.add_argument("--applicationID", required=True, help="Application ID")
+    parser.add_argument("--resultsPath", help="Write the interview question data to this JSON file instead of sending it to the Express server")
 
     args = parser.parse_args()
     print("Arguments: ", args)
@@ -147,14 +165,19 @@ def main():
     results = Interview(args.videoPath, args.upLeftImagePath, args.upRightImagePath, args.downRightImagePath, args.downLeftImagePath, args.correctAnswer)
     
     print("Results: ", results)
+    questionData = get_interview_question_data(results[0], results[1], results[2], results[3], results[4], results[5])
+    
+    # Let the caller submit the data of all the questions of the interview together
+    if args.resultsPath:
+        with open(args.resultsPath, 'w') as f:
+            json.dump(questionData, f)
+        return
+    
     # Load environment variables from .env file
     load_dotenv()
     
-    wait_for_express_server()
-    token = login()
-    
-    # Send the interview question data to the Express server
-    send_interview_question_data(args.applicationID, results[0], results[1], results[2], results[3], results[4], results[5], token)
+    # Queue the interview question data, the outbox flusher sends it to the Express server
+    Express_Outbox.enqueue('interviewQuestionData', args.applicationID, questionData)
     
 
 if __name__ == "__main__":
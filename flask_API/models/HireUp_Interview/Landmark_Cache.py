@@ -0,0 +1,172 @@
+import os
+import numpy as np
+from Face_Landmarks import NUM_LANDMARKS, FACE_ROI, ROI_SIZE, ROI_PADDING, FULL_FRAME_SIZE, ROI_REFRESH_FRAMES
+from Eye_Cheating import LEFT_EYE, RIGHT_EYE, LEFT_IRIS, RIGHT_IRIS, CENTER, LEFT_EYE_MOST_LEFT, LEFT_EYE_MOST_RIGHT, LEFT_EYE_MOST_UP, LEFT_EYE_MOST_DOWN, RIGHT_EYE_MOST_LEFT, RIGHT_EYE_MOST_RIGHT, RIGHT_EYE_MOST_UP, RIGHT_EYE_MOST_DOWN, TOP_LEFT_EYELASH, BOTTOM_LEFT_EYELASH, TOP_RIGHT_EYELASH, BOTTOM_RIGHT_EYELASH
+from lip_movements import UPPER_LIP, LOWER_LIP, LEFT_CHEEK, RIGHT_CHEEK
+
+# Version of the cache format, bumped when the cached landmarks or their meaning change
+CACHE_VERSION = 2
+
+# Landmarks used by the eye and lip analyzers, the only ones kept in the cache
+CACHED_LANDMARKS = np.array(sorted(set(
+    LEFT_EYE + RIGHT_EYE + LEFT_IRIS + RIGHT_IRIS + CENTER +
+    [LEFT_EYE_MOST_LEFT, LEFT_EYE_MOST_RIGHT, LEFT_EYE_MOST_UP, LEFT_EYE_MOST_DOWN,
+     RIGHT_EYE_MOST_LEFT, RIGHT_EYE_MOST_RIGHT, RIGHT_EYE_MOST_UP, RIGHT_EYE_MOST_DOWN,
+     TOP_LEFT_EYELASH, BOTTOM_LEFT_EYELASH, TOP_RIGHT_EYELASH, BOTTOM_RIGHT_EYELASH,
+     UPPER_LIP, LOWER_LIP, LEFT_CHEEK, RIGHT_CHEEK]
+)), dtype=np.int16)
+
+def get_cache_path(videoPath):
+    """
+    Get the path of the landmark cache of a video, next to the video.
+
+    Parameters:
+    videoPath (str): Path to the video file.
+
+    Returns:
+    str: Path to the landmark cache.
+    """
+    return os.path.splitext(videoPath)[0] + '_landmarks.npz'
+
+def get_landmark_mode(roi=FACE_ROI):
+    """
+    Get the settings of the landmark stage that change the landmarks, used to detect landmarks extracted in another mode.
+
+    Parameters:
+    roi (bool): True if the landmarks are extracted on a crop around the face.
+
+    Returns:
+    numpy.ndarray: The ROI mode and, in ROI mode, the size and padding of the crop, the size of the full frame and the refresh period.
+    """
+    if not roi:
+        return np.zeros(5, dtype=np.float64)
+    return np.array([1, ROI_SIZE, ROI_PADDING, FULL_FRAME_SIZE, ROI_REFRESH_FRAMES], dtype=np.float64)
+
+def get_video_signature(videoPath):
+    """
+    Get the size and modification time of a video, used to detect a replaced video.
+
+    Parameters:
+    videoPath (str): Path to the video file.
+
+    Returns:
+    numpy.ndarray: The size and modification time of the video.
+    """
+    stat = os.stat(videoPath)
+    return np.array([stat.st_size, stat.st_mtime], dtype=np.float64)
+
+class LandmarkCacheWriter:
+    """
+    Collects the landmarks of the frames of a video and writes them to a compact cache.
+
+    Only the CACHED_LANDMARKS are kept, as int16 pixel coordinates, with the timestamp and the face count of each frame.
+    The timestamps are stored in float32: float16 cannot tell the frames apart after about a minute of video.
+
+    Parameters:
+    fps (int): The number of frames analyzed per second of video.
+    budget (int): The landmark extraction budget per minute of video of the adaptive sampling, 0 if every frame was analyzed.
+    roi (bool): True if the landmarks are extracted on a crop around the face.
+    """
+
+    def __init__(self, fps, budget=0, roi=FACE_ROI):
+        self.fps = fps
+        self.budget = budget
+        self.roi = roi
+        self.frame_shape = None
+        self.timestamps = []
+        self.face_counts = []
+        self.points = []
+
+    def add(self, t, frame_shape, mesh_points, face_count):
+        """
+        Add the landmarks of the next frame.
+
+        Parameters:
+        t (float): The time of the frame, in seconds.
+        frame_shape (tuple): The shape of the frame.
+        mesh_points (numpy.ndarray): The mesh points of the frame if exactly one face is detected, None otherwise.
+        face_count (int): The number of faces detected.
+        """
+        self.frame_shape = frame_shape
+        self.timestamps.append(t)
+        self.face_counts.append(face_count)
+        if mesh_points is None:
+            self.points.append(np.zeros((len(CACHED_LANDMARKS), 2), dtype=np.int16))
+        else:
+            self.points.append(mesh_points[CACHED_LANDMARKS].astype(np.int16))
+
+    def save(self, videoPath):
+        """
+        Write the cache next to the video.
+
+        Parameters:
+        videoPath (str): Path to the video file.
+        """
+        cachePath = get_cache_path(videoPath)
+        tempPath = f'{cachePath}.{os.getpid()}.tmp.npz'
+        np.savez_compressed(
+            tempPath,
+            version=np.array(CACHE_VERSION),
+            signature=get_video_signature(videoPath),
+            fps=np.array(self.fps),
+            budget=np.array(self.budget),
+            landmark_mode=get_landmark_mode(self.roi),
+            frame_shape=np.array(self.frame_shape if self.frame_shape is not None else (0, 0, 0), dtype=np.int32),
+            indices=CACHED_LANDMARKS,
+            timestamps=np.array(self.timestamps, dtype=np.float32),
+            face_counts=np.array(self.face_counts, dtype=np.int8),
+            points=np.array(self.points, dtype=np.int16).reshape(-1, len(CACHED_LANDMARKS), 2),
+        )
+        os.replace(tempPath, cachePath)
+
+def load(videoPath, fps, budget=0, roi=FACE_ROI):
+    """
+    Load the landmark cache of a video if it matches the video and the analysis.
+
+    Parameters:
+    videoPath (str): Path to the video file.
+    fps (int): The number of frames analyzed per second of video.
+    budget (int): The landmark extraction budget per minute of video of the adaptive sampling, 0 if every frame is analyzed.
+    roi (bool): True if the landmarks are extracted on a crop around the face.
+
+    Returns:
+    dict: The cached arrays, or None if there is no usable cache.
+    """
+    cachePath = get_cache_path(videoPath)
+    if not os.path.exists(cachePath):
+        return None
+    try:
+        with np.load(cachePath) as data:
+            cache = {key: data[key] for key in data.files}
+    except (OSError, ValueError, KeyError):
+        return None
+    if int(cache['version']) != CACHE_VERSION or int(cache['fps']) != fps or int(cache.get('budget', 0)) != budget \
+            or not np.array_equal(cache['indices'], CACHED_LANDMARKS) \
+            or not np.array_equal(cache['landmark_mode'], get_landmark_mode(roi)) \
+            or not np.array_equal(cache['signature'], get_video_signature(videoPath)):
+        return None
+    return cache
+
+def iter_cached_landmarks(cache):
+    """
+    Replay the landmarks of a cache, in the format produced by the landmark stage.
+
+    Parameters:
+    cache (dict): The cached arrays returned by load.
+
+    Yields:
+    t (float): The time of the frame, in seconds.
+    frame_shape (tuple): The shape of the frame.
+    mesh_points (numpy.ndarray): The mesh points of the frame if exactly one face was detected, None otherwise.
+        Only the CACHED_LANDMARKS are set.
+    face_count (int): The number of faces detected.
+    """
+    frame_shape = tuple(cache['frame_shape'].tolist())
+    indices = cache['indices'].astype(np.intp)
+    for t, face_count, points in zip(cache['timestamps'], cache['face_counts'], cache['points']):
+        if face_count != 1:
+            yield float(t), frame_shape, None, int(face_count)
+            continue
+        mesh_points = np.zeros((NUM_LANDMARKS, 2), dtype=np.int32)
+        mesh_points[indices] = points
+        yield float(t), frame_shape, mesh_points, int(face_count)
@@ -0,0 +1,241 @@
+import os
+import multiprocessing
+
+# Analyze the videos while they are recorded instead of after the session
+ONLINE_ANALYSIS = os.getenv('ONLINE_ANALYSIS', '0') == '1'
+
+# Maximum number of seconds the socket processes wait for an online analysis before falling back to the offline analysis
+ONLINE_ANALYSIS_TIMEOUT = float(os.getenv('ONLINE_ANALYSIS_TIMEOUT', 120))
+
+# Maximum number of frames analyzed per second, as in Quiz
+MAX_FPS = 15
+
+# Number of samples given to the streaming VAD at once, as expected by the Silero model at 16 kHz
+VAD_CHUNK_SIZE = 512
+
+# Minimum duration of a speech segment, as in get_speech_timestamps
+MIN_SPEECH_SECONDS = 0.25
+
+class ChunkReader:
+    """
+    Read-only file object over the webm chunks received by the socket process, for the incremental demuxer.
+    Reads block until enough chunks arrived, and return less data only at the end of the recording.
+
+    Parameters:
+    chunks (multiprocessing.Queue): The chunks, followed by None at the end of the recording.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buffer = bytearray()
+        self.ended = False
+
+    def read(self, size=-1):
+        while not self.ended and (size < 0 or len(self.buffer) < size):
+            chunk = self.chunks.get()
+            if chunk is None:
+                self.ended = True
+            else:
+                self.buffer.extend(chunk)
+        if size < 0 or size > len(self.buffer):
+            size = len(self.buffer)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+class StreamingVAD:
+    """
+    Voice activity detection of an audio stream, fed while the video is recorded.
+    """
+
+    def __init__(self):
+        import numpy as np
+        import torch
+        from VAD import SAMPLING_RATE, loadModel
+
+        torch.set_num_threads(1)
+        model, utils = loadModel()
+        (_, _, _, VADIterator, _) = utils
+        self.np = np
+        self.torch = torch
+        self.sampling_rate = SAMPLING_RATE
+        self.iterator = VADIterator(model, sampling_rate=SAMPLING_RATE)
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.samples = 0
+        self.timestamps = []
+
+    def feed(self, samples):
+        """
+        Add mono 16 kHz float32 samples to the stream.
+
+        Parameters:
+        samples (numpy.ndarray): The samples.
+        """
+        self.pending = self.np.concatenate([self.pending, samples.astype(self.np.float32)])
+        while len(self.pending) >= VAD_CHUNK_SIZE:
+            chunk, self.pending = self.pending[:VAD_CHUNK_SIZE], self.pending[VAD_CHUNK_SIZE:]
+            self.samples += VAD_CHUNK_SIZE
+            event = self.iterator(self.torch.from_numpy(chunk))
+            if event and 'start' in event:
+                self.timestamps.append({'start': event['start'], 'end': None})
+            elif event and 'end' in event and self.timestamps:
+                self.timestamps[-1]['end'] = event['end']
+
+    def finish(self, margin=1, padding=0.4):
+        """
+        Close the stream and get its speech intervals, merged and padded like VAD.getSpeechIntervals.
+
+        Returns:
+        intervals (list): List of speech intervals in seconds.
+        """
+        import VAD
+
+        self.samples += len(self.pending)
+        timestamps = []
+        for timestamp in self.timestamps:
+            end = timestamp['end'] if timestamp['end'] is not None else self.samples
+            # Drop the segments too short to be speech
+            if end - timestamp['start'] >= MIN_SPEECH_SECONDS * self.sampling_rate:
+                timestamps.append({'start': timestamp['start'], 'end': end})
+        intervals = VAD.merge_intervals(timestamps, margin, padding, self.samples / self.sampling_rate, sampling_rate=self.sampling_rate)
+        return VAD.to_seconds(intervals, sampling_rate=self.sampling_rate)
+
+def get_analysis_fps(rate):
+    """
+    Get the number of frames analyzed per second for a video frame rate, as Quiz does.
+    """
+    fps = round(rate)
+    return MAX_FPS if fps > MAX_FPS else fps
+
+def analyze_stream(chunks):
+    """
+    Demux and decode the webm chunks of a recording as they arrive, extract the face landmarks of the analyzed frames
+    and detect the speech. Once the recording is finalized, the landmarks and speech intervals are saved next to the video,
+    where Quiz finds them and only scores them.
+
+    Parameters:
+    chunks (multiprocessing.Queue): The chunks, then None at the end of the recording, then the path of the finalized video
+        (or None to discard the analysis).
+    """
+    import av
+    from moviepy.editor import VideoFileClip
+    from Face_Landmarks import LandmarkExtractor
+    import Landmark_Cache
+    import VAD
+
+    extractor = None
+    vad = None
+    try:
+        container = av.open(ChunkReader(chunks), mode='r', format='matroska')
+        video_stream = container.streams.video[0] if container.streams.video else None
+        audio_stream = container.streams.audio[0] if container.streams.audio else None
+        fps = get_analysis_fps(video_stream.average_rate) if video_stream is not None and video_stream.average_rate else MAX_FPS
+
+        extractor = LandmarkExtractor()
+        writer = Landmark_Cache.LandmarkCacheWriter(fps)
+        vad = StreamingVAD() if audio_stream is not None else None
+        resampler = av.AudioResampler(format='flt', layout='mono', rate=VAD.SAMPLING_RATE) if vad is not None else None
+
+        index = 0
+        previous = None
+        last_time = 0
+
+        def analyze(image):
+            # Extract the landmarks of the frame shown at the next analyzed time
+            mesh_points, face_count = extractor.process(image)
+            writer.add(index / fps, image.shape, mesh_points, face_count)
+
+        streams = [stream for stream in (video_stream, audio_stream) if stream is not None]
+        for packet in container.demux(streams):
+            for frame in packet.decode():
+                if packet.stream is video_stream:
+                    time = float(frame.time) if frame.time is not None else last_time
+                    # The previous frame is shown at every analyzed time before this frame
+                    while previous is not None and index / fps < time:
+                        analyze(previous)
+                        index += 1
+                    previous = frame.to_ndarray(format='bgr24')
+                    last_time = time
+                else:
+                    for resampled in resampler.resample(frame):
+                        vad.feed(resampled.to_ndarray().reshape(-1))
+
+        # Analyze the tail of the recording
+        while previous is not None and index / fps <= last_time:
+            analyze(previous)
+            index += 1
+        container.close()
+
+        # Wait for the finalized video
+        videoPath = chunks.get()
+        if videoPath is None:
+            return
+        if vad is not None:
+            VAD.save_cached_intervals(videoPath, vad.finish())
+
+        # Only keep the landmarks if Quiz analyzes the finalized video at the same rate
+        video = VideoFileClip(videoPath, audio=False)
+        finalFps = get_analysis_fps(video.fps)
+        video.close()
+        if finalFps == fps:
+            writer.save(videoPath)
+        else:
+            print(f"Online analysis of {videoPath} done at {fps} fps instead of {finalFps} fps, discarding its landmarks.")
+    except Exception as e:
+        print(f"Online analysis failed: {e}")
+    finally:
+        if extractor is not None:
+            extractor.close()
+
+class OnlineAnalysis:
+    """
+    Analyzes a video in a background process while it is recorded by a socket process.
+
+    The socket process feeds the chunks it receives, ends the stream when the recording stops, finalizes the video and
+    tells the analysis where the finalized video is. Only the tail of the recording is left to analyze at that point.
+    """
+
+    def __init__(self):
+        self.chunks = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=analyze_stream, args=(self.chunks,), daemon=True)
+        self.process.start()
+
+    def feed(self, chunk):
+        """
+        Add a chunk of the recording.
+        """
+        self.chunks.put(bytes(chunk))
+
+    def end_stream(self):
+        """
+        Signal the end of the recording.
+        """
+        self.chunks.put(None)
+
+    def finish(self, videoPath):
+        """
+        Give the path of the finalized video, where the results are saved. Does not wait for the analysis.
+
+        Parameters:
+        videoPath (str): Path to the finalized video, or None to discard the analysis.
+        """
+        self.chunks.put(videoPath)
+
+    def wait(self, timeout=ONLINE_ANALYSIS_TIMEOUT):
+        """
+        Wait for the analysis to be saved. An analysis still running after the timeout (e.g. a hung demux or decode) is terminated,
+        and the offline analysis of the video computes the landmarks and speech intervals it did not save.
+
+        Parameters:
+        timeout (float): The maximum number of seconds to wait.
+
+        Returns:
+        bool: True if the analysis finished, False if it was terminated.
+        """
+        self.process.join(timeout)
+        if not self.process.is_alive():
+            return True
+        print(f"Online analysis still running after {timeout} seconds, terminating it.")
+        self.process.terminate()
+        self.process.join()
+        return False
@@ -0,0 +1,113 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import cv2
+from moviepy.editor import VideoFileClip
+from Face_Landmarks import LandmarkExtractor, NUM_LANDMARKS
+
+# Number of worker processes extracting the landmarks of a video, 1 to extract them in the analysis process
+LANDMARK_WORKERS = int(os.getenv('LANDMARK_WORKERS', 1))
+
+# Number of seconds decoded before each segment to let the face mesh tracking settle, their landmarks are discarded
+OVERLAP_SECONDS = float(os.getenv('LANDMARK_OVERLAP_SECONDS', 1))
+
+def count_frames(duration, fps):
+    """
+    Count the frames analyzed in a video, one every 1/fps seconds from 0 to the duration included.
+
+    Parameters:
+    duration (float): The duration of the video, in seconds.
+    fps (int): The number of frames analyzed per second of video.
+
+    Returns:
+    int: The number of frames.
+    """
+    return int(duration * fps + 1e-9) + 1
+
+def extract_segment(videoPath, fps, start, end, warmup):
+    """
+    Decode and extract the landmarks of a segment of a video with its own face mesh model.
+
+    Parameters:
+    videoPath (str): Path to the video file.
+    fps (int): The number of frames analyzed per second of video.
+    start (int): The index of the first frame of the segment.
+    end (int): The index after the last frame of the segment.
+    warmup (int): The index of the first decoded frame, before start, used to settle the tracking.
+
+    Returns:
+    frame_shape (tuple): The shape of the frames.
+    points (numpy.ndarray): The (frames, landmarks, 2) int16 mesh points of the segment, zero where not exactly one face is detected.
+    face_counts (numpy.ndarray): The number of faces detected in each frame of the segment.
+    """
+    video = VideoFileClip(videoPath, audio=False)
+    extractor = LandmarkExtractor()
+    points = np.zeros((end - start, NUM_LANDMARKS, 2), dtype=np.int16)
+    face_counts = np.zeros(end - start, dtype=np.int8)
+    frame_shape = None
+    try:
+        for index in range(warmup, end):
+            t = min(index / fps, video.duration)
+            frame = cv2.cvtColor(video.get_frame(t), cv2.COLOR_RGB2BGR)
+            frame_shape = frame.shape
+            mesh_points, face_count = extractor.process(frame)
+            # Only keep the landmarks of the segment itself
+            if index >= start:
+                face_counts[index - start] = face_count
+                if mesh_points is not None:
+                    points[index - start] = mesh_points
+    finally:
+        extractor.close()
+        video.close()
+    return frame_shape, points, face_counts
+
+def get_segments(frame_count, fps, workers, overlap_seconds=OVERLAP_SECONDS):
+    """
+    Split the frames of a video into one segment per worker, each preceded by a short overlap with the previous segment.
+
+    Parameters:
+    frame_count (int): The number of frames analyzed in the video.
+    fps (int): The number of frames analyzed per second of video.
+    workers (int): The number of worker processes.
+    overlap_seconds (float): The duration of the overlap, in seconds.
+
+    Returns:
+    list: The (start, end, warmup) frame indices of the segments.
+    """
+    overlap = int(round(overlap_seconds * fps))
+    bounds = np.linspace(0, frame_count, workers + 1).astype(int)
+    return [(int(start), int(end), max(0, int(start) - overlap)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+def iter_landmarks_parallel(videoPath, fps, duration, workers=LANDMARK_WORKERS):
+    """
+    Extract the landmarks of a video in time segments across a pool of worker processes, and stitch them back in order.
+
+    Each worker decodes its segment and runs its own face mesh model, starting a little before the segment so that the tracking
+    of the face is settled at the boundary. The analyzers only rely on the tracking and on no other state between frames,
+    so the stitched landmarks can be fed to them as if they were extracted sequentially.
+
+    Parameters:
+    videoPath (str): Path to the video file.
+    fps (int): The number of frames analyzed per second of video.
+    duration (float): The duration of the video, in seconds.
+    workers (int): The number of worker processes.
+
+    Yields:
+    t (float): The time of the frame, in seconds.
+    frame_shape (tuple): The shape of the frame.
+    mesh_points (numpy.ndarray): The mesh points of the frame if exactly one face is detected, None otherwise.
+    face_count (int): The number of faces detected.
+    """
+    frame_count = count_frames(duration, fps)
+    segments = get_segments(frame_count, fps, workers)
+
+    # Spawn the workers so that they do not inherit the face mesh models of this process
+    with ProcessPoolExecutor(max_workers=len(segments), mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(extract_segment, videoPath, fps, start, end, warmup) for start, end, warmup in segments]
+        # Yield the segments in order, as soon as each one is done
+        for (start, _, _), future in zip(segments, futures):
+            frame_shape, points, face_counts = future.result()
+            for offset, (face_points, face_count) in enumerate(zip(points, face_counts)):
+                mesh_points = face_points.astype(np.int32) if face_count == 1 else None
+                yield (start + offset) / fps, frame_shape, mesh_points, int(face_count)
@@ -1,20 +1,76 @@
-import time
 import numpy as np
 from moviepy.editor import VideoFileClip
 import cv2
-from Eye_Cheating import calibration, eyeCheating
-from moviepy.editor import VideoFileClip
-import ffmpeg
+from Eye_Cheating import calibration, EyeCheatingAnalyzer
+from Face_Landmarks import LandmarkExtractor
+import Landmark_Cache
+from Parallel_Landmarks import iter_landmarks_parallel, LANDMARK_WORKERS
+from Adaptive_Sampling import iter_landmarks_adaptive, FRAME_BUDGET
 import VAD
 import os
 import lip_movements
-import math
+import Intervals
 import argparse
-import requests
 from dotenv import load_dotenv
 import sys
 
-def Quiz(videoPath, topLeftImagePath, topRightImagePath, bottomRightImagePath, bottomLeftImagePath, isQuiz = True):
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import Express_Outbox
+
+def iterFrames(video, fps):
+    """
+    Decode the frames of a video one at a time.
+
+    Parameters:
+    video (VideoFileClip): The video.
+    fps (int): The number of frames decoded per second of video.
+
+    Yields:
+    t (float): The time of the frame, in seconds.
+    frame (numpy.ndarray): The frame, in BGR.
+    """
+    duration = video.duration
+    t = 0
+    while t <= duration:
+        frame = video.get_frame(t)
+        yield t, cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        t += 1/fps
+
+def iterLandmarks(video, fps, extractor):
+    """
+    Decode the frames of a video one at a time and extract their face landmarks.
+
+    Parameters:
+    video (VideoFileClip): The video.
+    fps (int): The number of frames decoded per second of video.
+    extractor (LandmarkExtractor): The landmark stage.
+
+    Yields:
+    t (float): The time of the frame, in seconds.
+    frame_shape (tuple): The shape of the frame.
+    mesh_points (numpy.ndarray): The mesh points of the frame if exactly one face is detected, None otherwise.
+    face_count (int): The number of faces detected.
+    """
+    for t, frame in iterFrames(video, fps):
+        mesh_points, face_count = extractor.process(frame)
+        yield t, frame.shape, mesh_points, face_count
+
+def cacheLandmarks(landmarks, cacheWriter):
+    """
+    Collect the landmarks of a video in a cache writer while they are analyzed.
+
+    Parameters:
+    landmarks (iterable): The (t, frame_shape, mesh_points, face_count) landmarks of the frames.
+    cacheWriter (LandmarkCacheWriter): Collects the landmarks to cache them.
+
+    Yields:
+    The landmarks, unchanged.
+    """
+    for t, frame_shape, mesh_points, face_count in landmarks:
+        cacheWriter.add(t, frame_shape, mesh_points, face_count)
+        yield t, frame_shape, mesh_points, face_count
+
+def Quiz(videoPath, topLeftImagePath, topRightImagePath, bottomRightImagePath, bottomLeftImagePath, isQuiz = True, useLandmarkCache = True, landmarkWorkers = LANDMARK_WORKERS, frameBudget = FRAME_BUDGET, audio = None, intervals = None):
     """
     Calculate the eye cheating rate and speaking cheating rate in a video quiz.
 
@@ -24,6 +80,12 @@ def Quiz(videoPath, topLeftImagePath, topRightImagePath, bottomRightImagePath, b
     topRightImagePath (str): Path to the top right calibration image.
     bottomRightImagePath (str): Path to the bottom right calibration image.
     bottomLeftImagePath (str): Path to the bottom left calibration image.
+    useLandmarkCache (bool): Reuse the face landmarks cached next to the video by a previous analysis, and cache them otherwise.
+    landmarkWorkers (int): The number of worker processes extracting the face landmarks of time segments of the video in parallel.
+    frameBudget (int): The maximum number of landmark extractions per minute of video with adaptive sampling, 0 to analyze every frame.
+        The rates and durations are still computed on every frame of the timeline, reusing the landmarks of the last analyzed frame.
+    audio (numpy.ndarray): The audio of the video already decoded by Audio_Extraction.extract_audio. Defaults to decoding it if needed.
+    intervals (list): The speech intervals of the video already detected by VAD.getVideoSpeechIntervals. Defaults to detecting them.
 
     Returns:
     eyeCheatingRate (float): The eye cheating rate in the video.
@@ -32,35 +94,19 @@ def Quiz(videoPath, topLeftImagePath, topRightImagePath, bottomRightImagePath, b
     speakingCheatingDurations (list): List of durations where speaking cheating occurs.
     """
 
-    # Convert video to audio
     print("videoPath:",os.path.splitext(videoPath))
-    if not os.path.exists(os.path.splitext(videoPath)[0]):
-        os.mkdir(os.path.splitext(videoPath)[0])
-    audioOutput = os.path.splitext(videoPath)[0] + '\\' + os.path.splitext(videoPath.split('\\')[-1])[0]  + '.wav'
-    if os.path.isfile(audioOutput):
-        os.remove(audioOutput)
-    ffmpeg.input(videoPath).output(audioOutput).run()
-
-    # Get speech intervals from audio
-    intervals = VAD.getSpeechIntervals(audioOutput)
-    # os.remove(audioOutput)
-
-    # Extract frames from video
+
+    # Get speech intervals from audio, unless they were computed while the video was recorded
+    if intervals is None:
+        intervals = VAD.getVideoSpeechIntervals(videoPath, audio)
+
+    # Open the video
     video = VideoFileClip(videoPath)
-    duration = video.duration
-    t = 0
-    videoFrames = []
     fps = round(video.fps)
     
     if fps > 15:
         video = video.set_fps(15)
         fps = round(video.fps)
-    
-    while t <= duration:
-        frame = video.get_frame(t)
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-        videoFrames.append(frame)
-        t += 1/fps
 
     # Load calibration images
     topLeftImage = cv2.cvtColor(cv2.imread(topLeftImagePath), cv2.COLOR_BGR2RGB)
@@ -70,99 +116,113 @@ def Quiz(videoPath, topLeftImagePath, topRightImagePath, bottomRightImagePath, b
 
     # Perform calibration and get calibration points
     calibrationPoints = calibration(topLeftImage, topRightImage, bottomRightImage, bottomLeftImage)
-    # Check if calibration is successful
-    if calibrationPoints is None:
-        # If calibration is not successful, return eye cheating rate as 1
-        eyeCheatingRate = 1
-        eyeCheatingDurations = []
+    # Check if calibration is successful. If not, the eye cheating rate is 1
+    eyeAnalyzer = EyeCheatingAnalyzer(calibrationPoints, fps) if calibrationPoints is not None else None
+
+    # Replay the cached landmarks of a previous analysis, or run the landmark stage shared by the eye analyzer
+    # and the lip analyzers of all the speech intervals
+    cache = Landmark_Cache.load(videoPath, fps, frameBudget) if useLandmarkCache else None
+    landmarkExtractor = None
+    cacheWriter = None
+    if cache is not None:
+        landmarks = Landmark_Cache.iter_cached_landmarks(cache)
     else:
-        # Calculate eye cheating rate and durations
-        eyeCheatingRate, eyeCheatingDurations = eyeCheating(videoFrames, calibrationPoints, fps)
+        if frameBudget > 0:
+            landmarkExtractor = LandmarkExtractor()
+            landmarks = iter_landmarks_adaptive(iterFrames(video, fps), fps, landmarkExtractor, frameBudget, intervals)
+        elif landmarkWorkers > 1:
+            landmarks = iter_landmarks_parallel(videoPath, fps, video.duration, landmarkWorkers)
+        else:
+            landmarkExtractor = LandmarkExtractor()
+            landmarks = iterLandmarks(video, fps, landmarkExtractor)
+        if useLandmarkCache:
+            cacheWriter = Landmark_Cache.LandmarkCacheWriter(fps, frameBudget)
+            landmarks = cacheLandmarks(landmarks, cacheWriter)
 
     # Initialize variables for overall speaking cheating rate and durations
-    t = 0
     overallSpeakingCheatingRate = 0
     overallSpeakingCheatingDurations = []
-    # Iterate over speech intervals
-    for i, interval in enumerate(intervals):
-        t = interval['start']
-        frames = []
-        # Extract frames for the interval
-        while t < interval['end']:
-            frame = video.get_frame(t)
-            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-            frames.append(frame)
-            t += 1/fps
-
-        # Calculate speaking cheating rate and durations for the interval
-        cheatingRate, cheatingDurations = lip_movements.cheatingRate(frames, fps, isQuiz)
-        
-        # Adjust durations to the original time scale
-        for i in range(len(cheatingDurations)):
-            cheatingDurations[i] = (cheatingDurations[i][0] + round(interval['start'],1), cheatingDurations[i][1] + round(interval['start'],1))
-            cheatingDurations[i] = (math.floor(cheatingDurations[i][0] * 2) /2, math.ceil(cheatingDurations[i][1] * 2) /2)
-            
-        # Update overall speaking cheating rate and durations
-        overallSpeakingCheatingRate += cheatingRate
-        overallSpeakingCheatingDurations.extend(cheatingDurations)
+    intervalIndex = 0
+    lipAnalyzer = None
+
+    def finish_interval():
+        # Add the speaking cheating rate and durations of the current speech interval to the overall ones
+        nonlocal overallSpeakingCheatingRate, intervalIndex, lipAnalyzer
+        if lipAnalyzer is not None:
+            cheatingRate, cheatingDurations = lipAnalyzer.result()
+            start = intervals[intervalIndex]['start']
+
+            # Adjust durations to the original time scale
+            starts, ends = Intervals.to_arrays(cheatingDurations)
+            starts, ends = Intervals.quantize(*Intervals.offset(starts, ends, round(start,1)))
+
+            # Update overall speaking cheating rate and durations
+            overallSpeakingCheatingRate += cheatingRate
+            overallSpeakingCheatingDurations.extend(Intervals.to_tuples(starts, ends))
+        intervalIndex += 1
+        lipAnalyzer = None
+
+    # Feed the face landmarks of each frame to the eye analyzer, and to the lip analyzer if the frame is inside a speech interval
+    frameCount = 0
+    for t, frame_shape, mesh_points, _ in landmarks:
+        frameCount += 1
+        if eyeAnalyzer is not None:
+            eyeAnalyzer.update_landmarks(mesh_points, frame_shape)
+
+        # Close the speech intervals that ended before this frame
+        while intervalIndex < len(intervals) and t >= intervals[intervalIndex]['end']:
+            finish_interval()
+        if intervalIndex < len(intervals) and t >= intervals[intervalIndex]['start']:
+            if lipAnalyzer is None:
+                lipAnalyzer = lip_movements.LipMovementAnalyzer(fps, isQuiz)
+            lipAnalyzer.update_landmarks(mesh_points)
+
+    # Close the remaining speech intervals
+    while intervalIndex < len(intervals):
+        finish_interval()
+
+    if eyeAnalyzer is not None:
+        # Calculate eye cheating rate and durations
+        eyeCheatingRate, eyeCheatingDurations = eyeAnalyzer.result()
+    else:
+        # If calibration is not successful, return eye cheating rate as 1
+        eyeCheatingRate = 1
+        eyeCheatingDurations = []
         
     # Merge overlapping durations
     speakingCheatingDurations = lip_movements.merge_overlapping_durations(overallSpeakingCheatingDurations)
     
     if isQuiz:
-        speakingCheatingRate = overallSpeakingCheatingRate / len(videoFrames)
+        speakingCheatingRate = overallSpeakingCheatingRate / max(frameCount, 1)
     else:
         speakingCheatingRate = overallSpeakingCheatingRate / (len(intervals) + 0.00001)
     
     video.close()
+    if landmarkExtractor is not None:
+        landmarkExtractor.close()
+    if cacheWriter is not None:
+        cacheWriter.save(videoPath)
 
     return eyeCheatingRate, speakingCheatingRate  , eyeCheatingDurations, speakingCheatingDurations
 
 
-def wait_for_express_server():
-    while True:
-        try:
-            # Get the address of the Express server from the environment variable
-            express_server_address = os.getenv('EXPRESS_SERVER_ADDRESS', 'http://localhost:3000')
-            # Send a GET request to the Express server
-            response = requests.get(express_server_address)
-            if response.status_code == 200:
-                print("Express server started.")
-                break
-        except requests.exceptions.ConnectionError:
-            pass
-        print("Waiting for the Express server to start...")
-        time.sleep(1)
-        
-def login():
-    # Get the address of the Express server from the environment variable
-    express_server_address = os.getenv('EXPRESS_SERVER_ADDRESS', 'http://localhost:3000')
-    # Get the login credentials from the environment variables
-    email = os.getenv('EXPRESS_SERVER_EMAIL', 'email@example.com')
-    password = os.getenv('EXPRESS_SERVER_PASSWORD', 'password')
-    # Send a POST request to the Express server to login
-    response = requests.post(f"{express_server_address}/account/logIn", json={"email": email, "password": password})
-    if response.status_code == 200:
-        print("Login successful.")
-        return response.json().get('token')
-    else:
-        print("Login failed.")
-        
-def send_quiz_cheating_data(applicationID, eyeCheatingRate, speakingCheatingRate, eyeCheatingDurations, speakingCheatingDurations, token):
-    # Get the address of the Express server from the environment variable
-    express_server_address = os.getenv('EXPRESS_SERVER_ADDRESS', 'http://localhost:3000')
-      # Convert numpy.float32 to float
+def get_quiz_cheating_data(eyeCheatingRate, speakingCheatingRate, eyeCheatingDurations, speakingCheatingDurations):
+    """
+    Build the JSON body of the quiz cheating data sent to the Express server.
+
+    Parameters:
+    eyeCheatingRate (float): The eye cheating rate in the video.
+    speakingCheatingRate (float): The speaking cheating rate in the video.
+    eyeCheatingDurations (list): List of durations where eye cheating occurs.
+    speakingCheatingDurations (list): List of durations where speaking cheating occurs.
+
+    Returns:
+    quizData (dict): The serializable quiz cheating data.
+    """
+    # Convert numpy.float32 to float
     eyeCheatingRate = float(eyeCheatingRate) if isinstance(eyeCheatingRate, np.float32) else eyeCheatingRate
     speakingCheatingRate = float(speakingCheatingRate) if isinstance(speakingCheatingRate, np.float32) else speakingCheatingRate
-
-    # Send a POST request to the Express server to add the topic
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.post(f"{express_server_address}/application/{applicationID}/quizCheatingData", json={"quizEyeCheating": eyeCheatingRate, 'quizFaceSpeechCheating': speakingCheatingRate, 'eyeCheatingDurations': eyeCheatingDurations, 'speakingCheatingDurations': speakingCheatingDurations}, headers=headers)
-    if response.status_code == 200:
-        print(f"Quiz Cheating Data added successfully.")
-    else:
-        print(response)
-        print(f"Failed to add Quiz Cheating Data.")
+    return {"quizEyeCheating": eyeCheatingRate, 'quizFaceSpeechCheating': speakingCheatingRate, 'eyeCheatingDurations': eyeCheatingDurations, 'speakingCheatingDurations': speakingCheatingDurations}
 
 def main():
     parser = argparse.ArgumentParser(description='Process video for cheating detection.')
@@ -172,24 +232,23 @@ def main():
     parser.add_argument('--downRightImagePath', required=True, help='Path to the down right image file')
     parser.add_argument('--downLeftImagePath', required=True, help='Path to the down left image file')
     parser.add_argument("--applicationID", required=True, help="Application ID")
+    parser.add_argument("--noLandmarkCache", action="store_true", help="Run the face landmark extraction even if the landmarks of the video are cached")
+    parser.add_argument("--landmarkWorkers", type=int, default=LANDMARK_WORKERS, help="Number of worker processes extracting the face landmarks in parallel")
+    parser.add_argument("--frameBudget", type=int, default=FRAME_BUDGET, help="Maximum number of landmark extractions per minute of video, 0 to analyze every frame")
 
     args = parser.parse_args()
 
-    eyeCheatingRate, speakingCheatingRate, eyeCheatingDurations, speakingCheatingDurations = Quiz(args.videoPath, args.upLeftImagePath, args.upRightImagePath, args.downRightImagePath, args.downLeftImagePath)
+    eyeCheatingRate, speakingCheatingRate, eyeCheatingDurations, speakingCheatingDurations = Quiz(args.videoPath, args.upLeftImagePath, args.upRightImagePath, args.downRightImagePath, args.downLeftImagePath, useLandmarkCache=not args.noLandmarkCache, landmarkWorkers=args.landmarkWorkers, frameBudget=args.frameBudget)
 
     print(f"Eye Cheating Rate: {eyeCheatingRate}")
     print(f"Speaking Cheating Rate: {speakingCheatingRate}")
     
     # Load environment variables from .env file
     load_dotenv()
-    
-    wait_for_express_server()
-    token = login()
-    print(token)
     print(args.applicationID)
     
-    # Send the interview question data to the Express server
-    send_quiz_cheating_data(args.applicationID, eyeCheatingRate, speakingCheatingRate, eyeCheatingDurations, speakingCheatingDurations, token)
+    # Queue the quiz cheating data, the outbox flusher sends it to the Express server
+    Express_Outbox.enqueue('quizCheatingData', args.applicationID, get_quiz_cheating_data(eyeCheatingRate, speakingCheatingRate, eyeCheatingDurations, speakingCheatingDurations))
 
 if __name__ == "__main__":
     # Redirect stderr to the null device
@@ -1,4 +1,5 @@
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+import numpy as np
 from transformers import AutoTokenizer, AutoModel
 import torch
 import torch.nn.functional as F
@@ -12,6 +13,12 @@ from nltk.tokenize import word_tokenize
 import nltk
 import os
 import sys
+import time
+import json
+import hashlib
+import sqlite3
+import argparse
+import Word_Vectors
 
 nltk.download('punkt', quiet=True)
 nltk.download('stopwords', quiet=True)
@@ -144,14 +151,23 @@ def replaceNegativeWords(sentence):
     return " ".join(temp)
 
 
+# English stop words, loaded once per process
+stop_words = None
+
+def getStopWords():
+    global stop_words
+    if stop_words is None:
+        stop_words = set(stopwords.words('english'))
+    return stop_words
+
+
 def preprocessSentence(sentence):
     
     sentence = sentence.lower()
     
     tokens = word_tokenize(sentence)
     
-    stop_words = set(stopwords.words('english'))
-    tokens = [word for word in tokens if word not in stop_words]
+    tokens = [word for word in tokens if word not in getStopWords()]
     
     tokens = [re.sub(r'[^a-zA-Z]', '', word) for word in tokens if word.isalnum()]
     
@@ -167,38 +183,199 @@ def countNegations(tokens):
     return count
 
 
-def getSimilarity(s1, s2):
-    
+# Compact word-vector store converted from the fastText model by Word_Vectors.py, used instead of the model when it exists
+WORD_VECTORS_PATH = os.getenv('WORD_VECTORS_PATH', os.path.join('models', 'HireUp_Interview', 'cc.en.300.vectors'))
+
+# Path to the fastText model
+FASTTEXT_MODEL_PATH = "models\HireUp_interview\\cc.en.300.bin"
+
+# Local cache of the embeddings of the correct answers, by answer and model version
+REFERENCE_CACHE_PATH = os.getenv('REFERENCE_CACHE_PATH', os.path.join('logs', 'reference_embeddings.sqlite3'))
+
+# fastText model or word-vector store, loaded once per process, and its version
+model_en = None
+model_version = None
+
+def loadModel():
+    """
+    Load the word-vector store, or the fastText model if there is none, on first use and keep it resident for the next similarities.
+
+    Returns:
+    - model_en: The word-vector store or the fastText model, both providing get_sentence_vector.
+    """
+    global model_en, model_version
+    if model_en is None and os.path.isfile(os.path.join(WORD_VECTORS_PATH, Word_Vectors.META_FILE)):
+        model_en = Word_Vectors.WordVectors(WORD_VECTORS_PATH)
+        model_version = getFileVersion(os.path.join(WORD_VECTORS_PATH, Word_Vectors.WORDS_FILE))
+    if model_en is None:
+        try:
+            model_en = fasttext.load_model(FASTTEXT_MODEL_PATH)
+            model_version = getFileVersion(FASTTEXT_MODEL_PATH)
+        except Exception as e:
+            print("Error: ", e)
+            sys.exit(1)
+    return model_en
+
+
+def getFileVersion(path):
+    """
+    Get the version of a model file, from its name, size and modification time.
+    """
+    stat = os.stat(path)
+    return f'{os.path.basename(path)}:{stat.st_size}:{int(stat.st_mtime)}'
+
+
+def connectReferenceCache(cache_path=REFERENCE_CACHE_PATH):
+    """
+    Open the cache of the embeddings of the correct answers, creating it on first use.
+
+    Parameters:
+    - cache_path (str): The path of the SQLite database.
+
+    Returns:
+    - sqlite3.Connection: The connection to the cache.
+    """
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    connection = sqlite3.connect(cache_path, timeout=30, isolation_level=None)
+    # Let the analysis workers read while another one is writing
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS reference_embeddings (
+            answer_hash TEXT NOT NULL,
+            model_version TEXT NOT NULL,
+            embedding BLOB NOT NULL,
+            created REAL NOT NULL,
+            PRIMARY KEY (answer_hash, model_version)
+        )
+    ''')
+    return connection
+
+
+def getReferenceEmbeddings(answers, cache_path=REFERENCE_CACHE_PATH):
+    """
+    Get the embeddings of correct answers, computed once per answer and model version and kept in the local cache.
+
+    Parameters:
+    - answers (list): The correct answers.
+    - cache_path (str): The path of the SQLite database.
+
+    Returns:
+    - embeddings (numpy.ndarray): The embedding of each answer.
+    """
+    model_en = loadModel()
+    hashes = [hashlib.sha256(answer.encode('utf-8')).hexdigest() for answer in answers]
+    embeddings = {}
+    connection = None
     try:
-        model_en = fasttext.load_model("models\HireUp_interview\\cc.en.300.bin")
-    except Exception as e:
-        print("Error: ", e)
-        sys.exit(1)
+        connection = connectReferenceCache(cache_path)
+        for answer_hash in set(hashes):
+            row = connection.execute('SELECT embedding FROM reference_embeddings WHERE answer_hash = ? AND model_version = ?', (answer_hash, model_version)).fetchone()
+            if row is not None:
+                embeddings[answer_hash] = np.frombuffer(row[0], dtype=np.float32)
+    except sqlite3.Error as e:
+        print(f"Reference embedding cache unavailable: {e}")
 
-    s1 = s1.lower()
-    s2 = s2.lower()
-    
-    s1 = replaceNegativeWords(s1)
-    s2 = replaceNegativeWords(s2)
-    
-    neg_count1 = countNegations(s1.split())
-    neg_count2 = countNegations(s2.split())
-    
-    tokens1 = preprocessSentence(s1)
-    tokens2 = preprocessSentence(s2)
-    
-    
-    embedding1 = model_en.get_sentence_vector(tokens1)
-    embedding2 = model_en.get_sentence_vector(tokens2)
+    try:
+        # Embed the answers that are not cached yet, and cache them
+        for answer, answer_hash in zip(answers, hashes):
+            if answer_hash in embeddings:
+                continue
+            embeddings[answer_hash] = np.asarray(model_en.get_sentence_vector(preprocessAnswer(answer)), dtype=np.float32)
+            if connection is not None:
+                try:
+                    connection.execute('INSERT OR REPLACE INTO reference_embeddings (answer_hash, model_version, embedding, created) VALUES (?, ?, ?, ?)',
+                                       (answer_hash, model_version, embeddings[answer_hash].tobytes(), time.time()))
+                except sqlite3.Error as e:
+                    print(f"Could not cache the reference embedding: {e}")
+    finally:
+        if connection is not None:
+            connection.close()
+
+    return np.array([embeddings[answer_hash] for answer_hash in hashes])
+
+
+def precomputeReferenceEmbeddings(answers):
+    """
+    Compute and cache the embeddings of the correct answers of a job's questions before the applicants are scored.
+
+    Parameters:
+    - answers (list): The correct answers.
+
+    Returns:
+    - int: The number of answers.
+    """
+    return len(getReferenceEmbeddings(answers))
+
+
+def preprocessAnswer(sentence):
+    """
+    Preprocess an answer before its embedding: lowercase, replace the negative words, remove the stop words and punctuation.
+    """
+    sentence = sentence.lower()
+    sentence = replaceNegativeWords(sentence)
+    return preprocessSentence(sentence)
+
+
+def getSimilarities(pairs):
+    """
+    Calculate the similarities of many pairs of answers at once, e.g. the applicant and correct answers of all the questions
+    of an interview. The distinct applicant answers are embedded once into a matrix, the correct answers are looked up in
+    the reference embedding cache, and all the cosine similarities are computed in one vectorized operation.
 
-    # embedding1 *= (-1) ** neg_count1
-    # embedding2 *= (-1) ** neg_count2
+    Parameters:
+    - pairs (list): The (applicant answer, correct answer) pairs.
+
+    Returns:
+    - similarities (numpy.ndarray): The cosine similarity of each pair, as getSimilarity.
+    """
+    if not pairs:
+        return np.zeros(0, dtype=np.float32)
+
+    model_en = loadModel()
+
+    # Embed each distinct preprocessed applicant answer once
+    tokens = [preprocessAnswer(s1) for s1, _ in pairs]
+    unique = list(dict.fromkeys(tokens))
+    index = {sentence: i for i, sentence in enumerate(unique)}
+    embeddings = np.array([model_en.get_sentence_vector(sentence) for sentence in unique])
+
+    # Look up the embeddings of the correct answers in the cache
+    references = getReferenceEmbeddings([s2 for _, s2 in pairs])
+
+    # Normalize the embeddings like cosine_similarity, the null embeddings stay null
+    embeddings1 = normalize(embeddings)[[index[sentence] for sentence in tokens]]
+    embeddings2 = normalize(references)
+
+    return np.einsum('ij,ij->i', embeddings1, embeddings2)
+
+
+def getSimilarity(s1, s2):
+    """
+    Calculate the similarity between an applicant answer and the correct answer.
+
+    Parameters:
+    - s1 (str): The applicant answer.
+    - s2 (str): The correct answer.
+
+    Returns:
+    - similarity_score (float): The cosine similarity of the embeddings of the answers.
+    """
+    return getSimilarities([(s1, s2)])[0]
+
+###########################################################################
 
-    embedding1 = embedding1.reshape(1, -1)
-    embedding2 = embedding2.reshape(1, -1)
 
-    similarity_score = cosine_similarity(embedding1, embedding2)[0][0]
+def main():
+    parser = argparse.ArgumentParser(description="Score the answers of the questions of an interview in one batch.")
+    parser.add_argument("--pairsPath", required=True, help="JSON file of the [applicant answer, correct answer] pairs")
+    parser.add_argument("--resultsPath", required=True, help="JSON file where the similarity of each pair is written")
+    args = parser.parse_args()
 
-    return similarity_score
+    with open(args.pairsPath, 'r') as f:
+        pairs = [tuple(pair) for pair in json.load(f)]
+    similarities = [float(similarity) for similarity in getSimilarities(pairs)]
+    with open(args.resultsPath, 'w') as f:
+        json.dump(similarities, f)
 
-###########################################################################
\ No newline at end of file
+if __name__ == "__main__":
+    main()
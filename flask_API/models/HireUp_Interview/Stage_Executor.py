@@ -0,0 +1,101 @@
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# Kinds of stages: network waits and GIL-releasing work in threads, CPU-bound work in processes
+THREAD = 'thread'
+PROCESS = 'process'
+
+class Stage:
+    """
+    A stage of an analysis.
+
+    Parameters:
+    name (str): The name of the stage.
+    func (callable): The function run by the stage. It must be importable from a module for a process stage.
+    args (tuple): The positional arguments of the function.
+    kwargs (dict): The keyword arguments of the function.
+    deps (dict): The keyword arguments given the results of other stages, as {argument name: stage name}.
+    kind (str): THREAD or PROCESS.
+    """
+
+    def __init__(self, name, func, args=(), kwargs=None, deps=None, kind=THREAD):
+        if kind not in (THREAD, PROCESS):
+            raise ValueError(f"Unknown stage kind '{kind}', expected '{THREAD}' or '{PROCESS}'")
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.deps = deps or {}
+        self.kind = kind
+
+class StageExecutor:
+    """
+    Runs the stages of an analysis as a DAG, each stage as soon as the stages it depends on are done,
+    so that independent stages run concurrently and the latency is about the longest path instead of the sum of the stages.
+
+    The duration of each stage, from its start to its end, is recorded in timings.
+
+    Parameters:
+    processes (concurrent.futures.Executor, optional): A long-lived executor running the process stages, e.g. a pool of pre-warmed
+        workers kept by the caller. Without it, each run spawns its own pool of processes, which import the modules and load the
+        models again.
+    """
+
+    def __init__(self, processes=None):
+        self.stages = {}
+        self.timings = {}
+        self.processes = processes
+
+    def add(self, name, func, args=(), kwargs=None, deps=None, kind=THREAD):
+        """
+        Add a stage, see Stage for the parameters.
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already added")
+        self.stages[name] = Stage(name, func, args, kwargs, deps, kind)
+
+    def run(self):
+        """
+        Run all the stages.
+
+        Returns:
+        dict: The result of each stage, by name.
+
+        Raises:
+        The exception of the first stage that failed. The stages that did not start are cancelled.
+        """
+        results = {}
+        self.timings = {}
+        pending = dict(self.stages)
+        running = {}
+        processCount = sum(stage.kind == PROCESS for stage in pending.values())
+        threads = ThreadPoolExecutor(max_workers=max(len(pending) - processCount, 1))
+        processes = self.processes
+        ownProcesses = processes is None and processCount > 0
+        if ownProcesses:
+            # Spawn the processes so that they do not inherit the threads and models of this process
+            processes = ProcessPoolExecutor(max_workers=processCount, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            while pending or running:
+                # Start the stages whose dependencies are done
+                for name, stage in list(pending.items()):
+                    if all(dep in results for dep in stage.deps.values()):
+                        kwargs = dict(stage.kwargs)
+                        kwargs.update({argument: results[dep] for argument, dep in stage.deps.items()})
+                        executor = processes if stage.kind == PROCESS else threads
+                        running[executor.submit(stage.func, *stage.args, **kwargs)] = (name, time.perf_counter())
+                        del pending[name]
+                if not running:
+                    raise ValueError(f"Stages {list(pending)} depend on unknown stages")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, start = running.pop(future)
+                    results[name] = future.result()
+                    self.timings[name] = time.perf_counter() - start
+        finally:
+            threads.shutdown(cancel_futures=True)
+            if ownProcesses:
+                processes.shutdown(cancel_futures=True)
+        return results
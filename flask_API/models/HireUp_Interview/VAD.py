@@ -1,8 +1,13 @@
 from pydub import AudioSegment
 import os
+import json
+import shutil
+import argparse
 import torchaudio
 from IPython.display import Audio
 import torch
+from Audio_Extraction import extract_audio
+import Intervals
 
 SAMPLING_RATE = 16000
 
@@ -29,25 +34,15 @@ def merge_intervals(intervals, margin, padding, audio_duration, sampling_rate =
     # Convert audio duration from seconds to samples
     audio_duration = audio_duration * sampling_rate
 
-    # Add padding to the start and end of each interval
-    intervals = [{'start': max(0, i['start'] - padding), 'end': min(i['end'] + padding, audio_duration)} for i in intervals]
+    starts, ends = Intervals.to_arrays([(i['start'], i['end']) for i in intervals])
 
-    # Sort intervals based on the start time
-    intervals.sort(key=lambda x: x['start'])
+    # Add padding to the start and end of each interval
+    starts, ends = Intervals.pad(starts, ends, padding, 0, audio_duration)
 
-    # Merge overlapping intervals
-    if (len(intervals) > 0):
-        merged = [intervals[0]]
-    else:
-        merged = []
-    for current in intervals[1:]:
-        last = merged[-1]
-        if current['start'] <= last['end'] + margin:
-            last['end'] = max(last['end'], current['end'])
-        else:
-            merged.append(current)
+    # Sort and merge overlapping intervals
+    starts, ends = Intervals.merge(starts, ends, margin)
 
-    return merged
+    return [{'start': start, 'end': end} for start, end in Intervals.to_tuples(starts, ends)]
 
 def log_intervals(intervals, log_file):
     """
@@ -149,36 +144,193 @@ def VAD(audio_path, model, read_audio, get_speech_timestamps, sampling_rate = SA
 
     return intervals
 
+# Local copy of the Silero VAD repository, vendored next to the models with `python models/HireUp_Interview/VAD.py --vendor`
+# or left by a previous torch.hub download
+SILERO_VAD_DIR = os.getenv('SILERO_VAD_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'silero-vad'))
 
-def getSpeechIntervals(audio_path):
+# Run the ONNX variant of the model, which needs onnxruntime
+SILERO_VAD_ONNX = os.getenv('SILERO_VAD_ONNX', '0') == '1'
+
+# Silero VAD models and their utilities, loaded once per process for each variant
+vad_models = {}
+
+def get_local_repositories():
     """
-    Get the speech intervals in an audio file using Voice Activity Detection (VAD).
+    Get the local copies of the Silero VAD repository, in order of preference.
+
+    Returns:
+    - list: Paths of the existing local repositories.
+    """
+    hub_dir = os.path.join(torch.hub.get_dir(), 'snakers4_silero-vad_master')
+    return [path for path in (SILERO_VAD_DIR, hub_dir) if os.path.isfile(os.path.join(path, 'hubconf.py'))]
+
+def vendorModel(path=SILERO_VAD_DIR):
+    """
+    Download the Silero VAD repository, with its JIT and ONNX models, and copy it to path so that the model loads without any
+    network access. Run once on a machine with network access, then deploy the copy with the other models.
 
     Parameters:
-    - audio_path (str): Path to the audio file.
+    - path (str): The directory of the local copy.
+    """
+    torch.hub.load(repo_or_dir='snakers4/silero-vad', model='silero_vad', trust_repo=True)
+    hub_dir = os.path.join(torch.hub.get_dir(), 'snakers4_silero-vad_master')
+    shutil.copytree(hub_dir, path, dirs_exist_ok=True)
+    print(f"Silero VAD vendored to {path}")
+
+def loadModel(onnx=SILERO_VAD_ONNX):
+    """
+    Load the VAD model on first use and keep it resident for the next audio files.
+    The model is loaded from a local copy of the Silero VAD repository without any network access.
+
+    Parameters:
+    - onnx (bool): Load the ONNX variant of the model.
 
     Returns:
-    - intervals (list): List of speech intervals in seconds.
+    - model: The VAD model.
+    - utils: The utilities of the model.
+
+    Raises:
+    - FileNotFoundError: If there is no local copy of the repository.
+    """
+    if onnx not in vad_models:
+        repositories = get_local_repositories()
+        if not repositories:
+            raise FileNotFoundError(f"No local copy of the Silero VAD model in {SILERO_VAD_DIR} or in the torch.hub cache. "
+                                    f"Vendor it with 'python models/HireUp_Interview/VAD.py --vendor' on a machine with network access, "
+                                    f"or set SILERO_VAD_DIR to an existing copy.")
+        vad_models[onnx] = torch.hub.load(repo_or_dir=repositories[0],
+                            source='local',
+                            model='silero_vad',
+                            onnx=onnx)
+    return vad_models[onnx]
+
+def getSpeechIntervalsBatch(audios, margin=1, padding=0.4):
+    """
+    Get the speech intervals of many audio files or arrays in one call, e.g. all the questions of an interview,
+    with a single VAD model.
+
+    Parameters:
+    - audios (list): Paths to the audio files, or 16 kHz mono audio arrays or tensors.
+    - margin (float): Margin in seconds to consider intervals as overlapping.
+    - padding (float): Padding in seconds to be added to the start and end of each interval.
+
+    Returns:
+    - list: The list of speech intervals in seconds of each audio.
     """
-    
     # Set the number of threads to 1 for better performance
     torch.set_num_threads(1)
-    
+
     # Set the audio backend to "soundfile" for compatibility
     torchaudio.set_audio_backend("soundfile")
 
-    # Load the VAD model from the Silero VAD repository
-    model, utils = torch.hub.load(repo_or_dir='snakers4/silero-vad',
-                                model='silero_vad',
-                                force_reload=True,
-                                onnx=False)
+    model, utils = loadModel()
     (get_speech_timestamps,
     save_audio,
     read_audio,
     VADIterator,
     collect_chunks) = utils
-    
-    # Perform VAD on the audio file and get the speech intervals
-    intervals = VAD(audio_path, model, read_audio, get_speech_timestamps, sampling_rate=SAMPLING_RATE, margin=1, padding=0.4)
-        
+
+    intervalsList = []
+    for audio in audios:
+        if isinstance(audio, str):
+            intervalsList.append(VAD(audio, model, read_audio, get_speech_timestamps, sampling_rate=SAMPLING_RATE, margin=margin, padding=padding))
+            continue
+        wav = torch.as_tensor(audio, dtype=torch.float32)
+        # The states of the model are reset for each audio by get_speech_timestamps
+        speech_timestamps = get_speech_timestamps(wav, model, sampling_rate=SAMPLING_RATE)
+        intervals = merge_intervals(speech_timestamps, margin, padding, len(wav) / SAMPLING_RATE, sampling_rate=SAMPLING_RATE)
+        intervalsList.append(to_seconds(intervals, sampling_rate=SAMPLING_RATE))
+    return intervalsList
+
+def getSpeechIntervals(audio_path):
+    """
+    Get the speech intervals in an audio file using Voice Activity Detection (VAD).
+
+    Parameters:
+    - audio_path (str): Path to the audio file.
+
+    Returns:
+    - intervals (list): List of speech intervals in seconds.
+    """
+    return getSpeechIntervalsBatch([audio_path], margin=1, padding=0.4)[0]
+
+def getVideoSpeechIntervals(videoPath, audio=None):
+    """
+    Get the speech intervals of a video, unless they were computed while the video was recorded.
+
+    Parameters:
+    - videoPath (str): Path to the video file.
+    - audio (numpy.ndarray, optional): The audio of the video already decoded by Audio_Extraction.extract_audio.
+
+    Returns:
+    - intervals (list): List of speech intervals in seconds.
+    """
+    intervals = load_cached_intervals(videoPath)
+    if intervals is None:
+        if audio is None:
+            audio = extract_audio(videoPath)
+        intervals = getSpeechIntervalsBatch([audio])[0]
     return intervals
+
+def get_intervals_cache_path(videoPath):
+    """
+    Get the path of the speech intervals computed for a video while it was recorded.
+
+    Parameters:
+    - videoPath (str): Path to the video file.
+
+    Returns:
+    - str: Path to the speech intervals file, next to the video.
+    """
+    return os.path.splitext(videoPath)[0] + '_speech.json'
+
+def save_cached_intervals(videoPath, intervals):
+    """
+    Save the speech intervals of a video next to it.
+
+    Parameters:
+    - videoPath (str): Path to the video file.
+    - intervals (list): List of speech intervals in seconds.
+    """
+    stat = os.stat(videoPath)
+    cachePath = get_intervals_cache_path(videoPath)
+    tempPath = f'{cachePath}.{os.getpid()}.tmp'
+    with open(tempPath, 'w') as f:
+        json.dump({'size': stat.st_size, 'mtime': stat.st_mtime, 'intervals': intervals}, f)
+    os.replace(tempPath, cachePath)
+
+def load_cached_intervals(videoPath):
+    """
+    Load the speech intervals saved next to a video, if they were computed for its current content.
+
+    Parameters:
+    - videoPath (str): Path to the video file.
+
+    Returns:
+    - intervals (list): List of speech intervals in seconds, or None if there are none.
+    """
+    cachePath = get_intervals_cache_path(videoPath)
+    try:
+        with open(cachePath, 'r') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    stat = os.stat(videoPath)
+    if cached.get('size') != stat.st_size or cached.get('mtime') != stat.st_mtime:
+        return None
+    return cached['intervals']
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the Silero VAD model.")
+    parser.add_argument("--vendor", action="store_true", help="Download the Silero VAD model and copy it to SILERO_VAD_DIR")
+    parser.add_argument("--path", default=SILERO_VAD_DIR, help="Directory of the local copy of the model")
+    args = parser.parse_args()
+
+    if args.vendor:
+        vendorModel(args.path)
+    else:
+        loadModel()
+        print(f"Silero VAD loaded from {get_local_repositories()[0]}")
+
+if __name__ == "__main__":
+    main()
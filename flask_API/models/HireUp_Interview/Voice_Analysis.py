@@ -60,6 +60,20 @@ def split_audio(file_path, segment_length=4):
     # Load the audio file
     y, sr = librosa.load(file_path, sr=None)
 
+    return split_samples(y, sr, segment_length), sr
+
+def split_samples(y, sr, segment_length=4):
+    """
+    Splits decoded audio into segments of a specified length.
+
+    Parameters:
+    - y (numpy.ndarray): The audio samples.
+    - sr (int): Sample rate of the audio.
+    - segment_length (int): Length of each segment in seconds. Default is 4 seconds.
+
+    Returns:
+    - segments (list): List of audio segments.
+    """
     # Calculate the total duration of the audio file
     total_duration = librosa.get_duration(y=y, sr=sr)
 
@@ -76,7 +90,7 @@ def split_audio(file_path, segment_length=4):
         segment = y[int(start * sr):int(end * sr)]
         segments.append(segment)
 
-    return segments, sr
+    return segments
 
 
 def classify_audio(file_path, svm_model):
@@ -91,24 +105,74 @@ def classify_audio(file_path, svm_model):
     - emotion_counts (defaultdict): Dictionary containing the count of each predicted emotion.
     - emotion_percentages (dict): Dictionary containing the percentage of each predicted emotion.
     """
-    # Split the audio file into segments
-    segments, sr = split_audio(file_path)
+    # Load the audio file
+    y, sr = librosa.load(file_path, sr=None)
 
-    # Initialize empty lists and dictionaries
-    predictions = []
-    emotion_counts = defaultdict(int)
+    return classify_samples(y, sr, svm_model)
+
+def get_segment_mfcc_means(y, sr, segment_length=4, n_mfcc=13, hop_length=512):
+    """
+    Computes the mean MFCC features of each segment of audio, with a single MFCC pass over the whole signal.
+    Each segment gets the frames centered inside it, so the segment means only differ from per-segment MFCCs at the boundaries.
 
-    # Iterate over each segment and classify it
-    for segment in segments:
-        # Extract MFCC features from the segment
-        mfcc_features = librosa.feature.mfcc(y=segment, sr=sr, n_mfcc=13)
-        mfcc_features_mean = np.mean(mfcc_features.T, axis=0)
-        mfcc_features_mean = mfcc_features_mean.reshape(1, -1)
+    Parameters:
+    - y (numpy.ndarray): The audio samples.
+    - sr (int): Sample rate of the audio.
+    - segment_length (int): Length of each segment in seconds. Default is 4 seconds.
+    - n_mfcc (int): Number of MFCC features.
+    - hop_length (int): Number of samples between two MFCC frames.
+
+    Returns:
+    - numpy.ndarray: The (segments, n_mfcc) mean MFCC features.
+    """
+    if len(y) == 0:
+        return np.zeros((0, n_mfcc))
+
+    # Extract MFCC features from the whole signal
+    mfcc_features = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=n_mfcc, hop_length=hop_length)
+
+    # First frame of each segment, as in split_samples
+    starts = (np.arange(0, len(y) / sr, segment_length) * sr).astype(int)
+    bounds = -(-starts // hop_length)
+    # A last segment starting inside the final hop has no frame of its own
+    bounds = bounds[bounds < mfcc_features.shape[1]]
+
+    # Average the frames of each segment
+    sums = np.add.reduceat(mfcc_features, bounds, axis=1)
+    counts = np.diff(np.append(bounds, mfcc_features.shape[1]))
+    return (sums / counts).T
+
+def classify_samples(y, sr, svm_model, intervals=None):
+    """
+    Classifies the segments of decoded audio using a support vector machine (SVM) model.
+
+    Parameters:
+    - y (numpy.ndarray): The audio samples.
+    - sr (int): Sample rate of the audio.
+    - svm_model (object): Trained SVM model for classification.
+    - intervals (list, optional): Only classify the speech intervals, as dictionaries with 'start' and 'end' in seconds.
+
+    Returns:
+    - emotion_counts (defaultdict): Dictionary containing the count of each predicted emotion.
+    - emotion_percentages (dict): Dictionary containing the percentage of each predicted emotion.
+    """
+    # Join the speech intervals, instead of writing and combining WAV files
+    if intervals is not None:
+        parts = [y[int(interval['start'] * sr):int(interval['end'] * sr)] for interval in intervals]
+        y = np.concatenate(parts) if parts else y[:0]
+
+    # Extract the MFCC features of all the segments
+    features = get_segment_mfcc_means(y, sr)
+
+    # Initialize empty dictionaries
+    emotion_counts = defaultdict(int)
+    if len(features) == 0:
+        return emotion_counts, {}
 
-        # Predict the emotion using the SVM model
-        prediction = svm_model.predict(mfcc_features_mean)
-        predictions.append(prediction[0])
-        emotion_counts[prediction[0]] += 1
+    # Predict the emotions of all the segments at once using the SVM model
+    predictions = svm_model.predict(features)
+    for prediction in predictions:
+        emotion_counts[prediction] += 1
 
     # Calculate the total number of segments
     total_segments = len(predictions)
@@ -116,4 +180,4 @@ def classify_audio(file_path, svm_model):
     # Calculate the percentage of each predicted emotion
     emotion_percentages = {emotion: (count / total_segments) * 100 for emotion, count in emotion_counts.items()}
 
-    return emotion_counts, emotion_percentages
\ No newline at end of file
+    return emotion_counts, emotion_percentages
@@ -0,0 +1,177 @@
+import os
+import json
+import argparse
+import numpy as np
+
+# Number of words of the fastText vocabulary kept by the conversion, the most frequent ones
+TOP_WORDS = 200000
+
+# Files of a word-vector store
+META_FILE = 'meta.json'
+WORDS_FILE = 'words.npy'
+BUCKETS_FILE = 'buckets.npy'
+
+def fnv_hash(data):
+    """
+    Hash the bytes of a character n-gram like fastText does (32-bit FNV-1a over sign-extended bytes).
+
+    Parameters:
+    data (bytes): The UTF-8 bytes of the n-gram.
+
+    Returns:
+    int: The 32-bit hash.
+    """
+    h = 2166136261
+    for byte in data:
+        h ^= (byte - 256 if byte > 127 else byte) & 0xffffffff
+        h = (h * 16777619) & 0xffffffff
+    return h
+
+def get_subword_buckets(word, minn, maxn, bucket):
+    """
+    Get the buckets of the character n-grams of a word, like fastText's Dictionary::computeSubwords.
+
+    Parameters:
+    word (str): The word.
+    minn (int): The minimum length of the n-grams, in characters.
+    maxn (int): The maximum length of the n-grams, in characters.
+    bucket (int): The number of buckets.
+
+    Returns:
+    list: The buckets of the n-grams.
+    """
+    data = ('<' + word + '>').encode('utf-8')
+    buckets = []
+    for i in range(len(data)):
+        # Start the n-grams at the first byte of a character
+        if data[i] & 0xC0 == 0x80:
+            continue
+        j = i
+        n = 1
+        while j < len(data) and n <= maxn:
+            j += 1
+            while j < len(data) and data[j] & 0xC0 == 0x80:
+                j += 1
+            if n >= minn and not (n == 1 and (i == 0 or j == len(data))):
+                buckets.append(fnv_hash(data[i:j]) % bucket)
+            n += 1
+    return buckets
+
+class WordVectors:
+    """
+    Compact, memory-mapped replacement of a fastText model for sentence vectors.
+
+    The store keeps the precomputed vectors of the most frequent words and the vectors of the subword buckets, in float16.
+    The other words get the average of the vectors of their character n-grams, like the out-of-vocabulary words of fastText.
+    The files are memory-mapped read-only, so loading takes milliseconds and the pages are shared by all the processes using the store.
+
+    Parameters:
+    path (str): The directory of the store, written by convert.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.dim = meta['dim']
+        self.minn = meta['minn']
+        self.maxn = meta['maxn']
+        self.bucket = meta['bucket']
+        self.index = {word: i for i, word in enumerate(meta['words'])}
+        self.words = np.load(os.path.join(path, WORDS_FILE), mmap_mode='r')
+        self.buckets = np.load(os.path.join(path, BUCKETS_FILE), mmap_mode='r')
+
+    def get_dimension(self):
+        return self.dim
+
+    def get_word_vector(self, word):
+        """
+        Get the vector of a word, like fastText's get_word_vector.
+
+        Parameters:
+        word (str): The word.
+
+        Returns:
+        numpy.ndarray: The float32 vector.
+        """
+        i = self.index.get(word)
+        if i is not None:
+            return self.words[i].astype(np.float32)
+        buckets = get_subword_buckets(word, self.minn, self.maxn, self.bucket) if self.maxn > 0 else []
+        if not buckets:
+            return np.zeros(self.dim, dtype=np.float32)
+        return self.buckets[buckets].astype(np.float32).mean(axis=0)
+
+    def get_sentence_vector(self, text):
+        """
+        Get the vector of a sentence, like fastText's get_sentence_vector for an unsupervised model:
+        the average of the normalized vectors of its words, ignoring the words with a null vector.
+
+        Parameters:
+        text (str): The sentence, words separated by whitespace.
+
+        Returns:
+        numpy.ndarray: The float32 vector.
+        """
+        if '\n' in text:
+            raise ValueError("predict processes one line at a time (remove '\\n')")
+        vector = np.zeros(self.dim, dtype=np.float32)
+        count = 0
+        for word in text.split():
+            wordVector = self.get_word_vector(word)
+            norm = np.linalg.norm(wordVector)
+            if norm > 0:
+                vector += wordVector / norm
+                count += 1
+        if count > 0:
+            vector /= count
+        return vector
+
+def convert(modelPath, outputPath, topWords=TOP_WORDS, chunkSize=65536):
+    """
+    Convert a fastText model to a word-vector store.
+
+    Parameters:
+    modelPath (str): Path to the fastText .bin model.
+    outputPath (str): The directory of the store.
+    topWords (int): The number of most frequent words whose vectors are precomputed. The other words of the vocabulary lose their
+        whole-word vector and get the average of their n-grams, check the drift with Word_Vectors_Equivalence.py.
+    chunkSize (int): The number of rows copied at once, to bound the memory used by the conversion.
+    """
+    import fasttext
+
+    model = fasttext.load_model(modelPath)
+    args = model.f.getArgs()
+    allWords = model.get_words(on_unicode_error='replace')
+    words = allWords[:topWords]
+    os.makedirs(outputPath, exist_ok=True)
+
+    # Precompute the vectors of the most frequent words, their word vector and n-grams averaged
+    wordVectors = np.lib.format.open_memmap(os.path.join(outputPath, WORDS_FILE), mode='w+', dtype=np.float16, shape=(len(words), args.dim))
+    for i, word in enumerate(words):
+        wordVectors[i] = model.get_word_vector(word)
+    wordVectors.flush()
+
+    # Copy the vectors of the subword buckets, after the vectors of the whole vocabulary in the input matrix
+    inputMatrix = model.get_input_matrix()
+    nwords = len(allWords)
+    bucketVectors = np.lib.format.open_memmap(os.path.join(outputPath, BUCKETS_FILE), mode='w+', dtype=np.float16, shape=(args.bucket, args.dim))
+    for start in range(0, args.bucket, chunkSize):
+        end = min(start + chunkSize, args.bucket)
+        bucketVectors[start:end] = inputMatrix[nwords + start:nwords + end]
+    bucketVectors.flush()
+
+    with open(os.path.join(outputPath, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'dim': args.dim, 'minn': args.minn, 'maxn': args.maxn, 'bucket': args.bucket, 'words': words}, f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a fastText model to a compact memory-mapped word-vector store.")
+    parser.add_argument("--modelPath", required=True, help="Path to the fastText .bin model")
+    parser.add_argument("--outputPath", required=True, help="Directory of the word-vector store")
+    parser.add_argument("--topWords", type=int, default=TOP_WORDS, help="Number of most frequent words whose vectors are kept")
+    args = parser.parse_args()
+
+    convert(args.modelPath, args.outputPath, args.topWords)
+    print(f"Word-vector store written to {args.outputPath}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import random
+import argparse
+import numpy as np
+from Word_Vectors import WordVectors
+
+# Misspelled and made up words, out of the vocabulary of the fastText model
+OOV_WORDS = ['recieve', 'definately', 'seperate', 'occured', 'untill', 'goverment', 'accomodate', 'tommorow',
+             'hireupness', 'microservicey', 'refactorization', 'kubernetized', 'café', 'naïve', 'déjà', 'straße']
+
+def sample_sentences(store, modelWords, count=200, length=8, seed=0):
+    """
+    Sample sentences of in-vocabulary, pruned and out-of-vocabulary words.
+
+    Parameters:
+    - store (WordVectors): The word-vector store.
+    - modelWords (list): The vocabulary of the fastText model.
+    - count (int): The number of sentences of each kind.
+    - length (int): The number of words of each sentence.
+    - seed (int): The seed of the sampling.
+
+    Returns:
+    - sentences (dict): The sentences of each kind.
+    """
+    rng = random.Random(seed)
+    inVocabulary = list(store.index)
+    pruned = [word for word in modelWords if word not in store.index]
+    kinds = {'in-vocabulary': inVocabulary, 'pruned': pruned, 'out-of-vocabulary': OOV_WORDS}
+    sentences = {}
+    for kind, words in kinds.items():
+        if words:
+            sentences[kind] = [' '.join(rng.choice(words) for _ in range(length)) for _ in range(count)]
+    # Sentences mixing the three kinds of words, as the answers of the applicants do
+    mixed = [word for words in kinds.values() for word in words[:10000]]
+    sentences['mixed'] = [' '.join(rng.choice(mixed) for _ in range(length)) for _ in range(count)]
+    return sentences
+
+def compare_sentence_vectors(store, model, sentences):
+    """
+    Compare the sentence vectors of the word-vector store against the fastText model.
+
+    The vectors of the store are stored in float16, so they differ slightly from the fastText ones. The words beyond the topWords
+    kept by the conversion lose their whole-word vector: their vector is the average of their character n-grams only, like the
+    out-of-vocabulary words, so the pruned sentences drift the most.
+
+    Parameters:
+    - store (WordVectors): The word-vector store.
+    - model (fasttext.FastText._FastText): The fastText model the store was converted from.
+    - sentences (list): The sentences to embed.
+
+    Returns:
+    - report (dict): The cosine similarity and the maximum absolute difference between the vectors.
+    """
+    expected = np.array([model.get_sentence_vector(sentence) for sentence in sentences], dtype=np.float32)
+    actual = np.array([store.get_sentence_vector(sentence) for sentence in sentences], dtype=np.float32)
+
+    norms = np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+    # Both vectors are null for the sentences without any known n-gram
+    cosine = np.where(norms > 0, np.sum(expected * actual, axis=1) / np.maximum(norms, 1e-12), 1.0)
+
+    return {
+        'sentences': len(sentences),
+        'mean_cosine': float(cosine.mean()),
+        'min_cosine': float(cosine.min()),
+        'max_abs_diff': float(np.abs(expected - actual).max()),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the sentence vectors of a word-vector store against its fastText model.")
+    parser.add_argument("--modelPath", required=True, help="Path to the fastText .bin model")
+    parser.add_argument("--storePath", required=True, help="Directory of the word-vector store")
+    parser.add_argument("--sentences", type=int, default=200, help="Number of sentences of each kind")
+    args = parser.parse_args()
+
+    import fasttext
+
+    model = fasttext.load_model(args.modelPath)
+    store = WordVectors(args.storePath)
+    for kind, sentences in sample_sentences(store, model.get_words(on_unicode_error='replace'), args.sentences).items():
+        report = compare_sentence_vectors(store, model, sentences)
+        print(f"{kind}: {report['sentences']} sentences, "
+              f"cosine mean {report['mean_cosine']:.5f} min {report['min_cosine']:.5f}, "
+              f"max absolute difference {report['max_abs_diff']:.5f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,84 @@
-import numpy as np
-import mediapipe as mp
 import math
-from Frames_To_Durations import frame_indices_to_durations, merge_overlapping_durations
+from Face_Landmarks import LandmarkExtractor, create_face_mesh as create_landmarks_face_mesh
+from Frames_To_Durations import DurationsBuilder, merge_overlapping_durations
 
-def cheatingRate(frames, fps, isQuiz = True):
+# Threshold for significant lip movement
+THRESHOLD = 0.04
+
+# Interval of voting frames
+INTERVAL = 5
+
+# Landmarks of the upper and lower lips and of the cheeks
+UPPER_LIP = 13
+LOWER_LIP = 14
+LEFT_CHEEK = 118
+RIGHT_CHEEK = 347
+
+def create_face_mesh():
     """
-    Calculates the cheating rate based on lip movements in a sequence of frames.
+    Creates the face mesh model used to detect lip movements.
+
+    Returns:
+        FaceMesh: The Mediapipe face mesh model.
+    """
+    # Load the face mesh model
+    return create_landmarks_face_mesh(max_num_faces=1)
+
+class LipMovementAnalyzer:
+    """
+    Detects lip movements in the frames of a speech interval, one frame at a time.
+
+    Only the frames of the current voting interval are kept, so the memory used does not grow with the length of the interval.
+    The frames can be given directly, or as face landmarks extracted by a landmark stage shared with the eye analyzer.
 
     Args:
-        frames (list): List of frames.
         fps (float): Frames per second of the video.
+        isQuiz (bool): Whether the rate is computed for a quiz or for an interview question.
+        face_mesh (FaceMesh, optional): The face mesh model used for the frames given directly. Defaults to a new model on first use.
+    """
 
-    Returns:
-        tuple: A tuple containing the cheating rate (float) and the cheating durations (list).
+    def __init__(self, fps, isQuiz=True, face_mesh=None):
+        self.isQuiz = isQuiz
+        self.face_mesh = face_mesh
+        self.extractor = None
 
-    Note:
-        - The function uses the Mediapipe library to detect lip movements.
-        - It calculates the distance between the upper and lower lips and the distance between the left and right corners of the mouth.
-        - It calculates the ratio of the lip distance to the face distance.
-        - It compares the current ratio with the previous ratio to determine if there is a significant change in lip movements.
-        - It calculates the cheating rate based on the ratio of frames with significant lip movements.
-        - It merges overlapping durations of frames with significant lip movements.
+        # Initialize variables
+        self.previousDistance = 0
+        self.intevalRatios = []
+        self.cheatingRate = []
+        self.cheating_frames_interval = []
+        self.frame_idx = 0
+        self.durations = DurationsBuilder(fps)
 
-    """
+    def update(self, frame):
+        """
+        Processes the next frame of the interval.
 
-    mp_face_mesh = mp.solutions.face_mesh
+        Args:
+            frame (numpy.ndarray): The next frame.
+        """
+        if self.extractor is None:
+            self.extractor = LandmarkExtractor(self.face_mesh if self.face_mesh is not None else create_face_mesh(), max_num_faces=1)
+        mesh_points, _ = self.extractor.process(frame)
+        self.update_landmarks(mesh_points)
 
-    # Load the face mesh model
-    face_mesh = mp_face_mesh.FaceMesh(
-        max_num_faces=1,
-        refine_landmarks=True,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5
-    )
-
-    # Threshold for significant lip movement
-    threshold = 0.04
-    
-    # Interval of voting frames
-    interval = 5
-    
-    # Initialize variables
-    previousDistance = 0
-    intevalRatios = []
-    cheatingRate = []
-    cheating_frames_idx = []
-    cheating_frames_interval = []
-    
-    for frame_idx, frame in enumerate(frames):
-        frame_height, frame_width, _ = frame.shape
-        # Process the frame to detect face landmarks
-        results = face_mesh.process(frame)
+    def update_landmarks(self, mesh_points):
+        """
+        Processes the face landmarks of the next frame of the interval.
+
+        Args:
+            mesh_points (numpy.ndarray): The mesh points of the frame if exactly one face is detected, None otherwise.
+        """
+        distance = self.previousDistance
         
         # Check if face landmarks are detected and only one face is detected
-        if results.multi_face_landmarks and len(results.multi_face_landmarks) == 1:
+        if mesh_points is not None:
             
             # Extract lip and face landmarks
-            mesh_points = np.array([[int(point.x*frame_width), int(point.y*frame_height)] for point in results.multi_face_landmarks[0].landmark])
-            up = mesh_points[13]
-            down = mesh_points[14]
-            left = mesh_points[118]
-            right = mesh_points[347]
+            up = mesh_points[UPPER_LIP]
+            down = mesh_points[LOWER_LIP]
+            left = mesh_points[LEFT_CHEEK]
+            right = mesh_points[RIGHT_CHEEK]
             
             # Calculate lip distance and face distance
             mouthDistance = math.sqrt((up[0] - down[0])**2 + (up[1] - down[1])**2)
@@ -76,45 +94,74 @@ def cheatingRate(frames, fps, isQuiz = True):
             distance = distance if distance > 0.01 else 0
             
             # Calculate the ratio of the current distance to the previous distance
-            ratio = abs(distance - previousDistance) / (max(distance, previousDistance) + 10e-10)
+            ratio = abs(distance - self.previousDistance) / (max(distance, self.previousDistance) + 10e-10)
             
             # Append the ratio to the list of ratios
-            intevalRatios.append(ratio < threshold and distance < 0.02)
+            self.intevalRatios.append(ratio < THRESHOLD and distance < 0.02)
             
             # Check if the ratio is below the threshold and add the frame index to the list of cheating frames
-            if ratio < threshold and distance < 0.02:
-                cheating_frames_interval.append(frame_idx)
+            if ratio < THRESHOLD and distance < 0.02:
+                self.cheating_frames_interval.append(self.frame_idx)
             
         else:
             # Append False to the list of ratios and add the frame index to the list of cheating frames if the face is not detected or multiple faces are detected
-            intevalRatios.append(True)
-            cheating_frames_interval.append(frame_idx)
+            self.intevalRatios.append(True)
+            self.cheating_frames_interval.append(self.frame_idx)
                 
         # Check if enough frames have been processed
-        if len(intevalRatios) >= interval:
+        if len(self.intevalRatios) >= INTERVAL:
             # Calculate the percentage of frames with significant lip movements in the interval. If the percentage is greater than 50%, the person is speaking.
-            notSpeeking = sum(intevalRatios) / len(intevalRatios) > 0.5
-            cheatingRate.append(notSpeeking)
+            notSpeeking = sum(self.intevalRatios) / len(self.intevalRatios) > 0.5
+            self.cheatingRate.append(notSpeeking)
             
-            # If not speaking, add the cheating frames to the list of cheating frames
+            # If not speaking, add the cheating frames to the cheating durations
             if notSpeeking:
-                cheating_frames_idx.extend(cheating_frames_interval)
+                for frame_idx in self.cheating_frames_interval:
+                    self.durations.add(frame_idx)
             
             # Reset the lists of ratios and cheating frames
-            intevalRatios = []
-            cheating_frames_interval = []
+            self.intevalRatios = []
+            self.cheating_frames_interval = []
                 
         # Update the previous distance for the next frame
-        previousDistance = distance
+        self.previousDistance = distance
+        self.frame_idx += 1
+
+    def result(self):
+        """
+        Returns the cheating rate and durations of the frames processed so far.
+
+        Returns:
+            tuple: A tuple containing the cheating rate (float) and the cheating durations (list).
+        """
+        if self.isQuiz:
+            return sum(self.cheatingRate) * INTERVAL, self.durations.durations
         
-    # Convert frame indices to durations
-    durations = frame_indices_to_durations(cheating_frames_idx, fps)
-    
-    # Merge overlapping durations
-    merged_durations = merge_overlapping_durations(durations)
-    
-    if isQuiz:
-        return sum(cheatingRate) * interval, merged_durations
-    
-    else:
-        return sum(cheatingRate) / len(cheatingRate), merged_durations
\ No newline at end of file
+        else:
+            return sum(self.cheatingRate) / max(len(self.cheatingRate), 1), self.durations.durations
+
+def cheatingRate(frames, fps, isQuiz = True, face_mesh = None):
+    """
+    Calculates the cheating rate based on lip movements in a sequence of frames.
+
+    Args:
+        frames (iterable): The frames, e.g. a list or a generator decoding the video.
+        fps (float): Frames per second of the video.
+        face_mesh (FaceMesh, optional): The face mesh model. Defaults to a new model.
+
+    Returns:
+        tuple: A tuple containing the cheating rate (float) and the cheating durations (list).
+
+    Note:
+        - The function uses the Mediapipe library to detect lip movements.
+        - It calculates the distance between the upper and lower lips and the distance between the left and right corners of the mouth.
+        - It calculates the ratio of the lip distance to the face distance.
+        - It compares the current ratio with the previous ratio to determine if there is a significant change in lip movements.
+        - It calculates the cheating rate based on the ratio of frames with significant lip movements.
+        - It merges overlapping durations of frames with significant lip movements.
+
+    """
+    analyzer = LipMovementAnalyzer(fps, isQuiz, face_mesh)
+    for frame in frames:
+        analyzer.update(frame)
+    return analyzer.result()
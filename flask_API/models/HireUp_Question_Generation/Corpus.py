@@ -0,0 +1,100 @@
+import re
+from nltk.tokenize import word_tokenize
+
+NON_ALPHABETIC_PATTERN = re.compile(r'[^a-zA-Z\s]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def preprocess_document(text, isText=False):
+    """
+    Lowercases, cleans and tokenizes a document.
+
+    Args:
+        text (str): The document to be preprocessed.
+        isText (bool, optional): Indicates whether the document comes from a text or a PDF file. Defaults to False.
+
+    Returns:
+        list: The tokens of the document.
+    """
+    # Convert the text to lowercase
+    text = text.lower()
+
+    if not isText:
+        # Remove special characters and numbers
+        text = NON_ALPHABETIC_PATTERN.sub(' ', text)
+
+        # Remove extra whitespaces
+        text = WHITESPACE_PATTERN.sub(' ', text)
+
+    # Tokenize the text
+    return word_tokenize(text.strip())
+
+class Corpus:
+    """
+    Builds the original documents, the preprocessed documents and the vocabulary of a corpus in a single pass.
+
+    Documents can be added one at a time or consumed from a generator. The vocabulary is kept in a dictionary
+    mapping each word to the number of documents containing it, so adding a document only costs its own length.
+
+    Attributes:
+        original_documents (list): The documents as they were added.
+        preprocessed_documents (list): The preprocessed documents, with the tokens joined by spaces.
+        document_frequencies (dict): The number of documents containing each word of the vocabulary.
+        isText (bool): Indicates whether the documents come from a text or a PDF file.
+    """
+
+    def __init__(self, isText=False):
+        self.original_documents = []
+        self.preprocessed_documents = []
+        self.document_frequencies = {}
+        self.isText = isText
+
+    def add(self, document):
+        """
+        Preprocesses a document and adds it to the corpus.
+
+        Args:
+            document (str): The document to be added.
+        """
+        # Store the original document
+        self.original_documents.append(document)
+
+        # Preprocess the document and store it
+        words = preprocess_document(document, self.isText)
+        self.preprocessed_documents.append(' '.join(words))
+
+        # Update the document frequencies of the words of the document
+        for word in set(words):
+            self.document_frequencies[word] = self.document_frequencies.get(word, 0) + 1
+
+    def extend(self, documents):
+        """
+        Adds all the documents of an iterable (e.g. a generator) to the corpus.
+
+        Args:
+            documents (iterable): The documents to be added.
+
+        Returns:
+            Corpus: The corpus itself.
+        """
+        for document in documents:
+            self.add(document)
+        return self
+
+    @property
+    def vocabulary(self):
+        """
+        list: The unique words of the corpus.
+        """
+        return list(self.document_frequencies)
+
+    def __len__(self):
+        return len(self.original_documents)
+
+    def as_lists(self):
+        """
+        Returns the corpus in the format used by the summarization functions.
+
+        Returns:
+            tuple: A tuple containing the original documents, preprocessed documents, and vocabulary.
+        """
+        return self.original_documents, self.preprocessed_documents, self.vocabulary
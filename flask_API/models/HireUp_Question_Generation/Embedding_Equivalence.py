@@ -0,0 +1,112 @@
+import os
+import re
+import time
+import argparse
+import numpy as np
+from PDF_Extraction import get_outliers_boundary, extract_texts_from_pdfs
+from Corpus import Corpus
+from Embeddings import BACKENDS, getDocumentsVector
+
+def load_corpus(folderPath):
+    """
+    Load the preprocessed documents of a topic folder, without the grammar correction step.
+
+    Parameters:
+    - folderPath (str): The path to the topic folder containing the PDF files.
+
+    Returns:
+    - documents (list): The preprocessed documents of the topic.
+    """
+    file_paths = [os.path.join(folderPath, file_name) for file_name in os.listdir(folderPath) if os.path.isfile(os.path.join(folderPath, file_name))]
+    corpus = Corpus()
+    for text in extract_texts_from_pdfs(file_paths):
+        # Split the text into documents and drop the short outliers, as the summarization does
+        documents = re.split(r'[\.:]\s*\n', text)
+        lower_bound, _ = get_outliers_boundary([len(document) for document in documents])
+        corpus.extend(document for document in documents if len(document) > lower_bound)
+    return corpus.preprocessed_documents
+
+def top_documents(embeddings, numberOfTopics, numberOfDocuments):
+    """
+    Get the indices of the top documents of the top topics, as selected by the summarization.
+
+    Parameters:
+    - embeddings (numpy.ndarray): The document embeddings.
+    - numberOfTopics (int): The number of topics to consider.
+    - numberOfDocuments (int): The number of top documents in each topic.
+
+    Returns:
+    - indices (set): The indices of the selected documents.
+    """
+    U, _, _ = np.linalg.svd(embeddings, full_matrices=False)
+    indices = set()
+    for i in range(min(numberOfTopics, U.shape[1])):
+        indices.update(np.abs(U[:, i]).argsort()[-numberOfDocuments:].tolist())
+    return indices
+
+def compare_backends(documents, backend, reference_backend='torch', numberOfTopics=10, numberOfDocuments=3):
+    """
+    Compare the embeddings of a backend against the reference backend.
+
+    Parameters:
+    - documents (list): The documents to embed.
+    - backend (str): The backend to evaluate.
+    - reference_backend (str): The reference backend.
+    - numberOfTopics (int): The number of topics used for the ranking comparison.
+    - numberOfDocuments (int): The number of documents per topic used for the ranking comparison.
+
+    Returns:
+    - report (dict): The cosine drift, ranking overlap and timings of the backend.
+    """
+    # Load both models before timing them
+    getDocumentsVector(documents[:1], backend=reference_backend)
+    getDocumentsVector(documents[:1], backend=backend)
+
+    start = time.perf_counter()
+    reference = getDocumentsVector(documents, backend=reference_backend)
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    embeddings = getDocumentsVector(documents, backend=backend)
+    backend_time = time.perf_counter() - start
+
+    # The embeddings are normalized, so the cosine similarity is the dot product
+    cosine = np.sum(reference * embeddings, axis=1)
+
+    # Compare the documents selected by the summarization with both embeddings
+    reference_top = top_documents(reference, numberOfTopics, numberOfDocuments)
+    backend_top = top_documents(embeddings, numberOfTopics, numberOfDocuments)
+
+    return {
+        'documents': len(documents),
+        'mean_cosine': float(cosine.mean()),
+        'min_cosine': float(cosine.min()),
+        'max_drift': float(1 - cosine.min()),
+        'ranking_overlap': len(reference_top & backend_top) / max(len(reference_top), 1),
+        'reference_time': reference_time,
+        'backend_time': backend_time,
+        'speedup': reference_time / max(backend_time, 1e-9),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a quantized embedding backend against the fp32 reference on the bundled corpora.")
+    parser.add_argument("--backend", default='onnx-int8', choices=BACKENDS, help="Backend to evaluate")
+    parser.add_argument("--topicsPath", default='topics_data', help="Folder containing one folder of PDF files per topic")
+    parser.add_argument("--maxDocuments", type=int, default=500, help="Maximum number of documents per topic")
+    args = parser.parse_args()
+
+    for topic in sorted(os.listdir(args.topicsPath)):
+        folderPath = os.path.join(args.topicsPath, topic)
+        if not os.path.isdir(folderPath):
+            continue
+        documents = load_corpus(folderPath)[:args.maxDocuments]
+        if not documents:
+            continue
+        report = compare_backends(documents, args.backend)
+        print(f"{topic}: {report['documents']} documents, "
+              f"cosine mean {report['mean_cosine']:.5f} min {report['min_cosine']:.5f}, "
+              f"top documents overlap {report['ranking_overlap']:.2%}, "
+              f"{report['reference_time']:.2f}s -> {report['backend_time']:.2f}s ({report['speedup']:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import os
+import numpy as np
+import torch
+import torch.nn.functional as F
+from transformers import AutoTokenizer, AutoModel
+
+MODEL_NAME = 'dmlls/all-mpnet-base-v2-negation'
+
+# Inference backends of the embedding model:
+# - 'torch': the fp32 PyTorch model (reference)
+# - 'torch-int8': the PyTorch model with dynamically quantized int8 linear layers
+# - 'onnx-int8': the model exported to ONNX with dynamic int8 quantization, run by onnxruntime
+BACKENDS = ('torch', 'torch-int8', 'onnx-int8')
+BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')
+
+# Folder where the ONNX export of the model is stored
+ONNX_FOLDER = os.getenv('EMBEDDING_ONNX_FOLDER', os.path.join('models', 'HireUp_Question_Generation', 'Embedding_Model'))
+
+# Number of documents embedded together
+BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 16))
+
+# Models already loaded by this process, by backend
+loaded_models = {}
+
+# Mean Pooling - Take attention mask into account for correct averaging
+def mean_pooling(model_output, attention_mask):
+    """
+    Perform mean pooling on the token embeddings, taking the attention mask into account for correct averaging.
+
+    Parameters:
+    - model_output (tuple): The output of the model, containing the token embeddings.
+    - attention_mask (tensor): The attention mask.
+
+    Returns:
+    - pooled_embeddings (tensor): The mean-pooled embeddings.
+
+    """
+    token_embeddings = model_output[0] # First element of model_output contains all token embeddings
+    input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
+    pooled_embeddings = torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
+    return pooled_embeddings
+
+def export_onnx_model(folder=ONNX_FOLDER):
+    """
+    Export the embedding model to ONNX and quantize its weights to int8.
+
+    Parameters:
+    - folder (str): The folder where the fp32 and int8 ONNX models are written.
+
+    Returns:
+    - quantized_path (str): The path of the int8 ONNX model.
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(folder, exist_ok=True)
+    model_path = os.path.join(folder, 'model.onnx')
+    quantized_path = os.path.join(folder, 'model.int8.onnx')
+
+    # Export the fp32 model with dynamic batch and sequence axes
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModel.from_pretrained(MODEL_NAME)
+    model.eval()
+    sample = tokenizer(['export sample'], padding=True, return_tensors='pt')
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample['input_ids'], sample['attention_mask']),
+            model_path,
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['last_hidden_state'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'last_hidden_state': {0: 'batch', 1: 'sequence'},
+            },
+            opset_version=14,
+        )
+
+    # Quantize the weights of the model to int8
+    quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+
+    return quantized_path
+
+def load_model(backend=None):
+    """
+    Load the tokenizer and the embedding model for a backend, once per process.
+
+    Parameters:
+    - backend (str, optional): One of BACKENDS. Defaults to the EMBEDDING_BACKEND environment variable.
+
+    Returns:
+    - tokenizer: The tokenizer of the model.
+    - model: The PyTorch model or the onnxruntime inference session.
+    """
+    backend = backend or BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {BACKENDS}")
+
+    if backend not in loaded_models:
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        if backend == 'onnx-int8':
+            import onnxruntime
+            quantized_path = os.path.join(ONNX_FOLDER, 'model.int8.onnx')
+            # Export the model the first time the backend is used
+            if not os.path.exists(quantized_path):
+                quantized_path = export_onnx_model(ONNX_FOLDER)
+            model = onnxruntime.InferenceSession(quantized_path, providers=['CPUExecutionProvider'])
+        else:
+            model = AutoModel.from_pretrained(MODEL_NAME)
+            model.eval()
+            if backend == 'torch-int8':
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        loaded_models[backend] = (tokenizer, model)
+
+    return loaded_models[backend]
+
+def getDocumentsVector(documents, backend=None, batch_size=BATCH_SIZE):
+    """
+    Compute sentence embeddings for a list of documents.
+
+    Args:
+        documents (list): A list of documents (strings).
+        backend (str, optional): The inference backend, one of BACKENDS. Defaults to the EMBEDDING_BACKEND environment variable.
+        batch_size (int, optional): The number of documents embedded together. Defaults to BATCH_SIZE.
+
+    Returns:
+        numpy.ndarray: A numpy array containing the sentence embeddings.
+
+    """
+    backend = backend or BACKEND
+    tokenizer, model = load_model(backend)
+
+    # Sort the documents by length so that each batch needs little padding
+    order = sorted(range(len(documents)), key=lambda i: len(documents[i]))
+
+    # Initialize an empty array to store the sentence embeddings
+    sentence_embeddings = None
+
+    # Iterate over the batches of documents
+    for start in range(0, len(order), batch_size):
+        batch_indices = order[start:start + batch_size]
+
+        # Tokenize the documents of the batch
+        encoded_input = tokenizer([documents[i] for i in batch_indices], padding=True, truncation=True, return_tensors='pt')
+
+        # Compute token embeddings
+        if backend == 'onnx-int8':
+            token_embeddings = model.run(['last_hidden_state'], {
+                'input_ids': encoded_input['input_ids'].numpy(),
+                'attention_mask': encoded_input['attention_mask'].numpy(),
+            })[0]
+            model_output = (torch.from_numpy(token_embeddings),)
+        else:
+            with torch.no_grad():
+                model_output = model(input_ids=encoded_input['input_ids'], attention_mask=encoded_input['attention_mask'])
+
+        # Perform pooling
+        batch_embeddings = mean_pooling(model_output, encoded_input['attention_mask'])
+
+        # Normalize the document embeddings
+        batch_embeddings = F.normalize(batch_embeddings, p=2, dim=1).numpy()
+
+        # Put the embeddings of the batch back in the order of the documents
+        if sentence_embeddings is None:
+            sentence_embeddings = np.zeros((len(documents), batch_embeddings.shape[1]), dtype=batch_embeddings.dtype)
+        sentence_embeddings[batch_indices] = batch_embeddings
+
+    if sentence_embeddings is None:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    return sentence_embeddings
@@ -0,0 +1,256 @@
+import os
+import re
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import PyPDF2
+
+# Bump this whenever the cleaning below changes so that stale cache entries are ignored
+EXTRACTION_VERSION = 1
+
+# Folder holding the extracted text of every PDF that has already been parsed
+CACHE_FOLDER = os.getenv('PDF_CACHE_FOLDER', 'topics_cache')
+
+# Number of pages extracted by a single worker task
+PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', 50))
+
+# Number of worker processes used for the extraction (defaults to the number of cores)
+WORKERS = int(os.getenv('PDF_EXTRACTION_WORKERS', os.cpu_count() or 1))
+
+REFERENCES_PATTERN = re.compile(r'\n[0-9]+[A-Z]')
+HYPHENATION_PATTERN = re.compile(r'-\s*\n')
+TRAILING_SPACES_PATTERN = re.compile(r'\s+(?=\n)')
+LINE_BREAK_PATTERN = re.compile(r'(?<![.:])\n')
+
+def get_outliers_boundary(data):
+    """
+    This function calculates the lower and upper boundaries for identifying outliers in a dataset.
+
+    Parameters:
+    - data: A list or array of numerical data.
+
+    Returns:
+    - q1: The lower boundary (first quartile) for identifying outliers.
+    - q3: The upper boundary (third quartile) for identifying outliers.
+    """
+    q1 = np.percentile(data, 25)
+    q3 = np.percentile(data, 75)
+    iqr = q3 - q1
+    lower_bound = q1 - 1.5 * iqr
+    upper_bound = q3 + 1.5 * iqr
+    return lower_bound, upper_bound
+
+def count_pdf_pages(pdf_path):
+    """
+    This function counts the pages of a PDF file.
+
+    Parameters:
+    - pdf_path: The path to the PDF file.
+
+    Returns:
+    - count: The number of pages in the PDF.
+    """
+    with open(pdf_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+def extract_pages_text(pdf_path, start, end):
+    """
+    This function extracts and cleans the text of a range of pages of a PDF file.
+    It is the unit of work sent to the worker processes.
+
+    Parameters:
+    - pdf_path: The path to the PDF file.
+    - start: The index of the first page to extract.
+    - end: The index after the last page to extract.
+
+    Returns:
+    - pages: The list of the cleaned text of each page in the range.
+    """
+    pages = []
+    # Open the PDF file in read-binary mode
+    with open(pdf_path, 'rb') as file:
+        # Create a PDF file reader
+        reader = PyPDF2.PdfReader(file)
+        # Iterate over the pages of the range
+        for page_index in range(start, min(end, len(reader.pages))):
+            # Extract text from the page
+            page_text = reader.pages[page_index].extract_text()
+            # Remove the first line of the page (the page header)
+            page_text = '\n'.join(page_text.split('\n')[1:])
+            # remove the references section from the page
+            match = REFERENCES_PATTERN.search(page_text)
+            if match:
+                # if the references section is found at the end of the page, remove it
+                if match.start() > int(len(page_text) * 0.9):
+                    page_text = page_text[:match.start()+1]
+            # append the page text to the pages list
+            pages.append(page_text)
+    return pages
+
+def join_pages_text(pages):
+    """
+    This function drops the outlier pages and joins the remaining pages into a single cleaned text.
+
+    Parameters:
+    - pages: The list of the cleaned text of each page.
+
+    Returns:
+    - text: The text of the document.
+    """
+    if not pages:
+        return ''
+    text = ''
+    # Calculate the lower and upper boundaries for identifying outliers in the page lengths
+    lower_bound, upper_bound = get_outliers_boundary([len(page) for page in pages])
+    # Concatenate the text of the pages that are within the lower and upper boundaries
+    for page in pages:
+        if len(page) > lower_bound and len(page) < upper_bound:
+            text += page
+    # Fix hyphenated words at the end of the lines and remove line breaks
+    text = HYPHENATION_PATTERN.sub('', text)
+    # Remove line breaks that are not followed by a period or colon
+    text = TRAILING_SPACES_PATTERN.sub('', text)
+    text = LINE_BREAK_PATTERN.sub(' ', text)
+    return text
+
+def get_file_hash(file_path):
+    """
+    This function calculates the SHA-256 hash of the content of a file.
+
+    Parameters:
+    - file_path: The path to the file.
+
+    Returns:
+    - hash: The hex digest of the file content.
+    """
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def write_json_atomic(file_path, data):
+    """
+    This function writes a JSON file through a temporary file so readers never see a partial file.
+
+    Parameters:
+    - file_path: The path to the JSON file.
+    - data: The data to be written.
+    """
+    temp_path = f'{file_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    os.replace(temp_path, file_path)
+
+def get_file_fingerprint(file_path, cache_folder=CACHE_FOLDER):
+    """
+    This function returns the content hash of a file.
+    The hash is recorded with the size and modification time of the file, so unchanged files are not hashed again.
+
+    Parameters:
+    - file_path: The path to the file.
+    - cache_folder: The folder of the extraction cache.
+
+    Returns:
+    - hash: The hex digest of the file content.
+    """
+    stat = os.stat(file_path)
+    index_folder = os.path.join(cache_folder, 'index')
+    os.makedirs(index_folder, exist_ok=True)
+    # Every file has its own index entry named after its absolute path
+    index_path = os.path.join(index_folder, hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest() + '.json')
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+            if entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                return entry['sha256']
+        except (ValueError, KeyError):
+            pass
+    # The file is new or has changed, hash its content
+    file_hash = get_file_hash(file_path)
+    write_json_atomic(index_path, {'path': os.path.abspath(file_path), 'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': file_hash})
+    return file_hash
+
+def get_cache_path(file_hash, cache_folder=CACHE_FOLDER):
+    """
+    This function returns the path of the cached text of a PDF file.
+
+    Parameters:
+    - file_hash: The content hash of the PDF file.
+    - cache_folder: The folder of the extraction cache.
+
+    Returns:
+    - path: The path of the cached text.
+    """
+    return os.path.join(cache_folder, f'{file_hash}_v{EXTRACTION_VERSION}.txt')
+
+def extract_texts_from_pdfs(pdf_paths, workers=WORKERS, use_cache=True, cache_folder=CACHE_FOLDER):
+    """
+    This function extracts the text of several PDF files.
+    The pages of all the PDF files that are not cached are split into ranges which are extracted in parallel.
+
+    Parameters:
+    - pdf_paths: The list of paths to the PDF files.
+    - workers: The number of worker processes.
+    - use_cache: Whether to read and write the extraction cache.
+    - cache_folder: The folder of the extraction cache.
+
+    Returns:
+    - texts: The list of the extracted texts, in the same order as the paths.
+    """
+    texts = [None] * len(pdf_paths)
+    cache_paths = [None] * len(pdf_paths)
+    tasks = []
+
+    for file_index, pdf_path in enumerate(pdf_paths):
+        # Read the text from the cache if the file did not change since it was parsed
+        if use_cache:
+            cache_paths[file_index] = get_cache_path(get_file_fingerprint(pdf_path, cache_folder), cache_folder)
+            if os.path.exists(cache_paths[file_index]):
+                with open(cache_paths[file_index], 'r', encoding='utf-8') as file:
+                    texts[file_index] = file.read()
+                continue
+        # Split the pages of the file into ranges
+        page_count = count_pdf_pages(pdf_path)
+        for start in range(0, page_count, PAGES_PER_TASK):
+            tasks.append((file_index, pdf_path, start, start + PAGES_PER_TASK))
+
+    # Extract the page ranges, in the current process if there is no work to share
+    if workers <= 1 or len(tasks) <= 1:
+        results = [extract_pages_text(pdf_path, start, end) for _, pdf_path, start, end in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            futures = [executor.submit(extract_pages_text, pdf_path, start, end) for _, pdf_path, start, end in tasks]
+            results = [future.result() for future in futures]
+
+    # Gather the pages of each file in order
+    pages = {}
+    for (file_index, _, _, _), page_texts in zip(tasks, results):
+        pages.setdefault(file_index, []).extend(page_texts)
+
+    # Clean the text of each file and store it in the cache
+    for file_index, file_pages in pages.items():
+        texts[file_index] = join_pages_text(file_pages)
+        if use_cache:
+            temp_path = f'{cache_paths[file_index]}.{os.getpid()}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                file.write(texts[file_index])
+            os.replace(temp_path, cache_paths[file_index])
+
+    return texts
+
+def extract_text_from_pdf(pdf_path, workers=WORKERS, use_cache=True):
+    """
+    This function extracts text from a PDF file.
+
+    Parameters:
+    - pdf_path: The path to the PDF file.
+    - workers: The number of worker processes used for large files.
+    - use_cache: Whether to read and write the extraction cache.
+
+    Returns:
+    - text: The extracted text from the PDF.
+    """
+    return extract_texts_from_pdfs([pdf_path], workers=workers, use_cache=use_cache)[0]
@@ -1,4 +1,3 @@
-import PyPDF2
 import os
 import math
 import re
@@ -11,9 +10,9 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.decomposition import TruncatedSVD
 from nltk.tokenize import sent_tokenize
 import language_tool_python
-import torch
-import torch.nn.functional as F
-from transformers import AutoTokenizer, AutoModel
+from PDF_Extraction import get_outliers_boundary, extract_text_from_pdf, extract_texts_from_pdfs
+from Corpus import Corpus, preprocess_document
+from Embeddings import getDocumentsVector
 
 nltk.download('punkt')
 nltk.download('stopwords')
@@ -21,83 +20,9 @@ nltk.download('averaged_perceptron_tagger')
 stop_words = set(stopwords.words('english')) 
 tool = language_tool_python.LanguageTool('en-US')
 
-def get_outliers_boundary(data):
-    """
-    This function calculates the lower and upper boundaries for identifying outliers in a dataset.
-
-    Parameters:
-    - data: A list or array of numerical data.
-
-    Returns:
-    - q1: The lower boundary (first quartile) for identifying outliers.
-    - q3: The upper boundary (third quartile) for identifying outliers.
-    """
-    q1 = np.percentile(data, 25)
-    q3 = np.percentile(data, 75)
-    iqr = q3 - q1
-    lower_bound = q1 - 1.5 * iqr
-    upper_bound = q3 + 1.5 * iqr
-    return lower_bound, upper_bound
-
-def extract_text_from_pdf(pdf_path):
-    """
-    This function extracts text from a PDF file.
-
-    Parameters:
-    - pdf_path: The path to the PDF file.
-
-    Returns:
-    - text: The extracted text from the PDF.
-    """
-    page_lengths = []
-    pages = []
-    text = ''
-    # Open the PDF file in read-binary mode
-    with open(pdf_path, 'rb') as file:
-        # Create a PDF file reader
-        reader = PyPDF2.PdfReader(file)
-        # Iterate over all the pages of the PDF file
-        for page in reader.pages:
-            # Extract text from the page and append it to the text string
-            page_text = page.extract_text()
-            # split the text by new line
-            page_text = page_text.split('\n')
-            # remove the first element of the list
-            page_text = page_text[1:]
-            # join the list elements to form a string
-            page_text = '\n'.join(page_text)
-            # remove the references section from the page
-            pattern = re.compile(r'\n[0-9]+[A-Z]')
-            match = pattern.search(page_text)
-            if match:
-                # if the references section is found at the end of the page, remove it
-                if match.start() > int(len(page_text) * 0.9):
-                    page_text = page_text[:match.start()+1]
-            # append the length of the page to the page_lengths list
-            page_lengths.append(len(page_text))
-            # append the page text to the pages list
-            pages.append(page_text)
-        # Calculate the lower and upper boundaries for identifying outliers in the page lengths
-        lower_bound, upper_bound = get_outliers_boundary(page_lengths)
-        # Concatenate the text of the pages that are within the lower and upper boundaries
-        for page in pages:
-            if len(page) > lower_bound and len(page) < upper_bound:
-                text += page
-        # Fix hyphenated words at the end of the lines and remove line breaks
-        pattern = re.compile(r'-\s*\n')
-        text = pattern.sub('', text)
-        # Remove line breaks that are not followed by a period or colon
-        # pattern = re.compile(r'[^\.:]\s*\n')
-        # text = pattern.sub(' ', text)
-        text = re.sub(r'\s+(?=\n)', '', text)
-        text = re.sub(r'(?<![.:])\n', ' ', text)
-    # Return the extracted text
-    return text
-
-from nltk.stem import WordNetLemmatizer
-from nltk.stem import PorterStemmer
-from nltk.tokenize import word_tokenize
-import re
+DOCUMENT_SPLIT_PATTERN = re.compile(r'[\.:]\s*\n')
+URL_PATTERN = re.compile(r'[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b([-a-zA-Z0-9()@:%_\+.~#?&//=]*)')
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
 
 def preprocess_text(text, original_text=None, preprocessed_text=None, vocabulary=None, isText=False):
     """
@@ -112,6 +37,9 @@ def preprocess_text(text, original_text=None, preprocessed_text=None, vocabulary
 
     Returns:
         tuple: A tuple containing the original text, preprocessed text, and vocabulary.
+
+    Note:
+        - Building a corpus with this function rebuilds the vocabulary for every document, use the Corpus class instead.
     """
     # Initialize the lists if they are not provided
     if original_text is None:
@@ -124,23 +52,8 @@ def preprocess_text(text, original_text=None, preprocessed_text=None, vocabulary
     # Store the original text
     original_text.append(text)
     
-    # Tokenize the text
-    words = word_tokenize(text)
-    
-    # Convert the words to lowercase
-    text = text.lower()
-
-    if not isText:
-        # Remove special characters and numbers
-        text = re.sub(r'[^a-zA-Z\s]', ' ', text)
-        
-        # Remove extra whitespaces
-        text = re.sub(r'\s+', ' ', text)
-
-    text = text.strip()
-    
-    # Tokenize the text
-    words = word_tokenize(text)
+    # Preprocess and tokenize the text
+    words = preprocess_document(text, isText)
     
     # Add the words to the vocabulary
     vocabulary.extend(words)
@@ -150,32 +63,18 @@ def preprocess_text(text, original_text=None, preprocessed_text=None, vocabulary
 
     return original_text, preprocessed_text, vocabulary
 
-def getDocuments_from_pdf(filePath, original_documents=None, preprocessed_documents=None, vocabulary=None):
+def iterDocuments_from_text(text):
     """
-    Extracts text from a PDF file and preprocesses it.
+    Splits the text extracted from a PDF file into documents and yields the corrected documents one at a time.
 
     Args:
-        filePath (str): The path to the PDF file.
-        original_documents (list, optional): List to store the original documents. Defaults to None.
-        preprocessed_documents (list, optional): List to store the preprocessed documents. Defaults to None.
-        vocabulary (list, optional): List to store the vocabulary. Defaults to None.
+        text (str): The text extracted from the PDF file.
 
-    Returns:
-        tuple: A tuple containing the original documents, preprocessed documents, and vocabulary.
+    Yields:
+        str: The corrected documents that do not contain a URL or an email address.
     """
-    if original_documents is None:
-        original_documents = []
-    if preprocessed_documents is None:
-        preprocessed_documents = []
-    if vocabulary is None:
-        vocabulary = []
-
-    # Extract text from the PDF file
-    text = extract_text_from_pdf(filePath)
-
     # Split the text into individual documents based on certain patterns
-    pattern = re.compile(r'[\.:]\s*\n')
-    documents = pattern.split(text)
+    documents = DOCUMENT_SPLIT_PATTERN.split(text)
 
     # Calculate the lengths of each document
     document_lengths = [len(document) for document in documents]
@@ -191,18 +90,27 @@ def getDocuments_from_pdf(filePath, original_documents=None, preprocessed_docume
             matches = tool.check(document)
             document = language_tool_python.utils.correct(document, matches)
 
-            # Check for URLs and email addresses in the document
-            urlPattern = re.compile(r'[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b([-a-zA-Z0-9()@:%_\+.~#?&//=]*)')
-            emailPattern = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
-            
             # Skip the document if it contains a URL or email address
-            if urlPattern.search(document) or emailPattern.search(document):
+            if URL_PATTERN.search(document) or EMAIL_PATTERN.search(document):
                 continue
 
-            # Preprocess the document and update the lists
-            original_documents, preprocessed_documents, vocabulary = preprocess_text(document, original_documents, preprocessed_documents, vocabulary)
+            yield document
+
+def getDocuments_from_pdf(filePath):
+    """
+    Extracts text from a PDF file and preprocesses it.
+
+    Args:
+        filePath (str): The path to the PDF file.
+
+    Returns:
+        tuple: A tuple containing the original documents, preprocessed documents, and vocabulary.
+    """
+    # Extract text from the PDF file
+    text = extract_text_from_pdf(filePath)
 
-    return original_documents, preprocessed_documents, vocabulary
+    # Build the corpus from the documents of the text
+    return Corpus().extend(iterDocuments_from_text(text)).as_lists()
 
 def getAllDocuments(folderPath):
     """
@@ -218,21 +126,19 @@ def getAllDocuments(folderPath):
     # Get the list of files in the folder
     dir_list = os.listdir(folderPath)
 
-    # Initialize empty lists for original documents, preprocessed documents, and vocabulary
-    original_documents = []
-    preprocessed_documents = []
-    vocabulary = []
+    # Create the file paths by concatenating the folder path and file names
+    file_paths = [folderPath + file_name for file_name in dir_list if os.path.isfile(folderPath + file_name)]
 
-    # Iterate through each file in the folder
-    for file_name in dir_list:
-        # Create the file path by concatenating the folder path and file name
-        file_path = folderPath + file_name
+    # Extract the text of all the PDF files in parallel (unchanged files are read from the cache)
+    texts = extract_texts_from_pdfs(file_paths)
 
-        # Call the getDocuments_from_pdf function to extract documents from the PDF file
-        original_documents, preprocessed_documents, vocabulary = getDocuments_from_pdf(file_path, original_documents, preprocessed_documents, vocabulary)
+    # Stream the documents of every file into the corpus
+    corpus = Corpus()
+    for text in texts:
+        corpus.extend(iterDocuments_from_text(text))
 
     # Return the original documents, preprocessed documents, and vocabulary
-    return original_documents, preprocessed_documents, vocabulary
+    return corpus.as_lists()
 
 def TF_IDF(documents, vocabulary):
     """
@@ -405,14 +311,8 @@ def Summarize_Document(document, num_sentences):
     # Limit the number of sentences to summarize
     num_sentences = min(num_sentences, len(sentences))
     
-    # Initialize lists for original sentences, preprocessed sentences, and vocabulary
-    original_sentences = []
-    preprocessed_sentences = []
-    vocabulary = []
-    
     # Preprocess each sentence in the document
-    for i in range(len(sentences)):
-        original_sentences, preprocessed_sentences, vocabulary = preprocess_text(sentences[i], original_sentences, preprocessed_sentences, vocabulary)
+    original_sentences, preprocessed_sentences, vocabulary = Corpus().extend(sentences).as_lists()
     
     # Get the sentence embeddings using the getDocumentsVector function
     sentenceEmbeddings = getDocumentsVector(preprocessed_sentences)
@@ -453,69 +353,6 @@ def Summarize_Document(document, num_sentences):
     # Return the summarized sentences
     return summarization
 
-# Mean Pooling - Take attention mask into account for correct averaging
-def mean_pooling(model_output, attention_mask):
-    """
-    Perform mean pooling on the token embeddings, taking the attention mask into account for correct averaging.
-
-    Parameters:
-    - model_output (tuple): The output of the model, containing the token embeddings.
-    - attention_mask (tensor): The attention mask.
-
-    Returns:
-    - pooled_embeddings (tensor): The mean-pooled embeddings.
-
-    """
-    token_embeddings = model_output[0] # First element of model_output contains all token embeddings
-    input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
-    pooled_embeddings = torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
-    return pooled_embeddings
-
-def getDocumentsVector(documents):
-    """
-    Compute sentence embeddings for a list of documents.
-
-    Args:
-        documents (list): A list of documents (strings).
-
-    Returns:
-        numpy.ndarray: A numpy array containing the sentence embeddings.
-
-    """
-
-    # Load model from HuggingFace Hub
-    tokenizer = AutoTokenizer.from_pretrained('dmlls/all-mpnet-base-v2-negation')
-    model = AutoModel.from_pretrained('dmlls/all-mpnet-base-v2-negation')
-
-    # Initialize an empty list to store the sentence embeddings
-    sentence_embeddings = []
-
-    # Iterate over each document
-    for document in documents:
-        # Tokenize the document
-        encoded_input = tokenizer(document, padding=True, truncation=True, return_tensors='pt')
-
-        # Compute token embeddings
-        with torch.no_grad():
-            model_output = model(**encoded_input)
-
-        # Perform pooling
-        document_embedding = mean_pooling(model_output, encoded_input['attention_mask'])
-
-        # Normalize the document embedding
-        document_embedding = F.normalize(document_embedding, p=2, dim=1)
-
-        # Append the document embedding to the list
-        sentence_embeddings.append(document_embedding)
-
-    # Concatenate the document embeddings along the first dimension
-    sentence_embeddings = torch.cat(sentence_embeddings, dim=0)
-
-    # Convert sentence_embeddings to numpy array
-    sentence_embeddings = sentence_embeddings.numpy()
-
-    return sentence_embeddings
-
 def getAllDocumentsFromGivenString(text):
     """
     Preprocesses a given text and returns the original documents, preprocessed documents, and vocabulary.
@@ -529,28 +366,14 @@ def getAllDocumentsFromGivenString(text):
         list: A list of vocabulary.
 
     """
-    original_documents = []
-    preprocessed_documents = []
-    vocabulary = []
-    
-    # Split the text into individual documents
-    documents = text.split('\n')
+    # Split the text into individual documents, skipping empty documents
+    documents = (document for document in text.split('\n') if document != '')
     
-    # Iterate over each document
-    for document in documents:
-        # Skip empty documents
-        if document == '':
-            continue
-        
-        # Perform spell checking and correction using language_tool_python
-        matches = tool.check(document)
-        document = language_tool_python.utils.correct(document, matches)
-        
-        # Preprocess the document and update the original documents, preprocessed documents, and vocabulary lists
-        original_documents, preprocessed_documents, vocabulary = preprocess_text(document, original_documents, preprocessed_documents, vocabulary, isText=True)
+    # Perform spell checking and correction using language_tool_python
+    documents = (language_tool_python.utils.correct(document, tool.check(document)) for document in documents)
     
-    # Return the original documents, preprocessed documents, and vocabulary
-    return original_documents, preprocessed_documents, vocabulary
+    # Preprocess the documents and build the original documents, preprocessed documents, and vocabulary lists
+    return Corpus(isText=True).extend(documents).as_lists()
 
 def summarization(numberOfTopics, numberOfDocuments, numberOfSentences, folderPath = None, text = None, isText = False):
     """
@@ -569,9 +392,6 @@ def summarization(numberOfTopics, numberOfDocuments, numberOfSentences, folderPa
         list: A list of the original paragraphs containing the important sentences.
     """
 
-    sentences = []
-    paragraphs = []
-
     # Get the original documents, preprocessed documents, and vocabulary
     if isText:
         original_documents, preprocessed_documents, vocabulary = getAllDocumentsFromGivenString(text)
@@ -583,6 +403,27 @@ def summarization(numberOfTopics, numberOfDocuments, numberOfSentences, folderPa
     documentsEmbeddings = getDocumentsVector(preprocessed_documents)
     # tfidf_matrix = TF_IDF(preprocessed_documents, vocabulary)
 
+    return summarizeDocuments(original_documents, documentsEmbeddings, numberOfTopics, numberOfDocuments, numberOfSentences)
+
+def summarizeDocuments(original_documents, documentsEmbeddings, numberOfTopics, numberOfDocuments, numberOfSentences):
+    """
+    Summarizes already embedded documents based on topic-document distribution using Singular Value Decomposition (SVD).
+
+    Args:
+        original_documents (list): The original documents.
+        documentsEmbeddings (numpy.ndarray): The embeddings of the preprocessed documents, one row per document.
+        numberOfTopics (int): The number of topics to consider.
+        numberOfDocuments (int): The number of top documents to retrieve in each topic.
+        numberOfSentences (int): The number of sentences to include in the summary.
+
+    Returns:
+        list: A list of the most important sentences in the documents.
+        list: A list of the original paragraphs containing the important sentences.
+    """
+
+    sentences = []
+    paragraphs = []
+
     # Perform Singular Value Decomposition (SVD) on the document embeddings
     U, s, V = SVD_Np(documentsEmbeddings)
 
@@ -0,0 +1,129 @@
+import os
+import json
+import hashlib
+from PDF_Extraction import CACHE_FOLDER, get_cache_path, write_json_atomic
+
+# Folder holding the manifest of every populated topic
+MANIFEST_FOLDER = os.getenv('TOPICS_MANIFEST_FOLDER', os.path.join(CACHE_FOLDER, 'manifests'))
+
+# Stages computed for each PDF file of a topic, in order
+FILE_STAGES = ('extraction', 'correction', 'embeddings')
+
+def get_manifest_path(topic, manifest_folder=MANIFEST_FOLDER):
+    """
+    Get the path of the manifest of a topic.
+
+    Parameters:
+    topic (str): The name of the topic.
+    manifest_folder (str): The folder holding the manifests.
+
+    Returns:
+    str: The path of the manifest.
+    """
+    return os.path.join(manifest_folder, f'{topic}.json')
+
+def load_manifest(topic, manifest_folder=MANIFEST_FOLDER):
+    """
+    Load the manifest of a topic, or create an empty one if the topic was never populated.
+
+    The manifest records:
+    - files: the content hash of each PDF file of the topic and the stages already computed for it.
+    - sentences: the questions generated for each summarized sentence.
+    - created: whether the topic was created on the Express server.
+    - sent: the sentences whose questions were already sent to the Express server.
+
+    Parameters:
+    topic (str): The name of the topic.
+    manifest_folder (str): The folder holding the manifests.
+
+    Returns:
+    dict: The manifest of the topic.
+    """
+    manifest = {"name": topic, "fingerprint": None, "files": {}, "sentences": {}, "created": False, "sent": []}
+    manifest_path = get_manifest_path(topic, manifest_folder)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest.update(json.load(f))
+    return manifest
+
+def save_manifest(manifest, manifest_folder=MANIFEST_FOLDER):
+    """
+    Write the manifest of a topic to disk.
+
+    Parameters:
+    manifest (dict): The manifest of the topic.
+    manifest_folder (str): The folder holding the manifests.
+    """
+    os.makedirs(manifest_folder, exist_ok=True)
+    write_json_atomic(get_manifest_path(manifest['name'], manifest_folder), manifest)
+
+def get_stage_path(file_hash, stage, backend=None):
+    """
+    Get the path of the output of a stage for a PDF file.
+    The outputs are named after the content hash of the file, so they are shared by identical files.
+
+    Parameters:
+    file_hash (str): The content hash of the PDF file.
+    stage (str): One of FILE_STAGES.
+    backend (str): The embedding backend, used by the embeddings stage.
+
+    Returns:
+    str: The path of the output of the stage.
+    """
+    if stage == 'extraction':
+        return get_cache_path(file_hash)
+    if stage == 'correction':
+        return os.path.join(CACHE_FOLDER, f'{file_hash}_corrected.json')
+    return os.path.join(CACHE_FOLDER, f'{file_hash}_{backend}.npy')
+
+def get_fingerprint(file_names, file_hashes):
+    """
+    Get the fingerprint of the content of a topic folder.
+
+    Parameters:
+    file_names (list): The names of the PDF files of the topic.
+    file_hashes (list): The content hashes of the PDF files.
+
+    Returns:
+    str: The fingerprint of the topic.
+    """
+    return hashlib.sha256(json.dumps(list(zip(file_names, file_hashes))).encode('utf-8')).hexdigest()
+
+def is_stage_done(manifest, file_name, file_hash, stage, backend=None):
+    """
+    Check if a stage was already computed for the current content of a PDF file.
+
+    Parameters:
+    manifest (dict): The manifest of the topic.
+    file_name (str): The name of the PDF file.
+    file_hash (str): The current content hash of the PDF file.
+    stage (str): One of FILE_STAGES.
+    backend (str): The embedding backend, used by the embeddings stage.
+
+    Returns:
+    bool: True if the output of the stage is available, False otherwise.
+    """
+    entry = manifest['files'].get(file_name)
+    if entry is None or entry['sha256'] != file_hash or stage not in entry['stages']:
+        return False
+    return os.path.exists(get_stage_path(file_hash, stage, backend))
+
+def mark_stage_done(manifest, file_name, file_hash, stage, manifest_folder=MANIFEST_FOLDER):
+    """
+    Record that a stage was computed for a PDF file and write the manifest.
+
+    Parameters:
+    manifest (dict): The manifest of the topic.
+    file_name (str): The name of the PDF file.
+    file_hash (str): The content hash of the PDF file.
+    stage (str): One of FILE_STAGES.
+    manifest_folder (str): The folder holding the manifests.
+    """
+    entry = manifest['files'].get(file_name)
+    # Forget the stages of the previous content of the file
+    if entry is None or entry['sha256'] != file_hash:
+        entry = {"sha256": file_hash, "stages": []}
+        manifest['files'][file_name] = entry
+    if stage not in entry['stages']:
+        entry['stages'].append(stage)
+    save_manifest(manifest, manifest_folder)
@@ -1,10 +1,31 @@
 import os
+import json
+import sys
 import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 from dotenv import load_dotenv
-import requests
 import QG
 import Text_Summarization
-from Text_Summarization import summarization
+from Text_Summarization import summarization, summarizeDocuments, iterDocuments_from_text
+from PDF_Extraction import get_file_fingerprint, extract_text_from_pdf, extract_texts_from_pdfs, WORKERS as PDF_EXTRACTION_WORKERS
+from Corpus import Corpus
+import Embeddings
+import Topic_Manifest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import Express_Client
+
+# Number of topics populated concurrently
+TOPIC_WORKERS = int(os.getenv('TOPIC_WORKERS', max(1, (os.cpu_count() or 1) // 4)))
+
+# Question generation model, loaded once per process
+QG_model = None
+
+# Queue used by a topic worker to report its progress to the scheduler
+progress_queue = None
 
 # Define the generate_questions function as provided
 def myScore(template, question, answer):
@@ -41,6 +62,70 @@ def myScore(template, question, answer):
     
     return 0.2 * score_1 + 0.2 * score_2
 
+def load_QG_model():
+    """
+    Load the question generation model, once per process.
+
+    Returns:
+    tuple: The parameters of the question generation model, as returned by QG.loadModel.
+    """
+    global QG_model
+    if QG_model is None:
+        QG_model = QG.loadModel('models\\HireUp_Question_Generation\\Trained_Model_Dev')
+    return QG_model
+
+def generate_sentence_questions(sentence, model, topQuestions=10):
+    """
+    Generate the top questions for a sentence.
+
+    Parameters:
+    sentence (str): The sentence to generate questions for.
+    model (tuple): The parameters of the question generation model.
+    topQuestions (int): The number of top questions to select.
+
+    Returns:
+    list: The top questions, sorted by score in descending order.
+    """
+    unigram, bigram, trigram, wordCount, questionTemplates, answerTemplates, questionGuards, answerGuards, questionWordCount, questionCount = model
+    questionsWithScore = []
+    uniqueQuestions = set()
+    
+    # Get the sentence structure
+    doc, results = QG.getSentenceStructure(sentence)
+    
+    # Skip if the sentence structure is not available
+    if results is None:
+        return []
+    
+    # Generate questions for each question template
+    for i in range(len(questionTemplates)):
+        question = QG.generateQuestion(sentence, questionTemplates[i], questionGuards[i])
+        
+        # Skip if the question is already generated
+        if question in uniqueQuestions:
+            continue
+        
+        answer = QG.generateQuestion(sentence, answerTemplates[i], answerGuards[i])
+        
+        # Add the question-answer pair to the list if both question and answer are generated
+        if question is not None and answer is not None:
+            score = myScore(questionTemplates[i], question, answer) + 0.6 * QG.calculateScore(question, unigram, bigram, trigram, wordCount, answer, questionWordCount, questionCount)
+            questionsWithScore.append((question, answer, score))
+            uniqueQuestions.add(question)
+    
+    # Sort the questions based on score in descending order
+    questionsWithScore.sort(key=lambda x: x[2], reverse=True)
+    
+    # Select the top questions
+    length = min(topQuestions, len(questionsWithScore))
+    question_list = []
+    for i in range(length):
+        print(questionsWithScore[i][0])   
+        print("Answer: ", questionsWithScore[i][1])
+        question_list.append(questionsWithScore[i][0])
+    
+    return question_list
+
 def generate_questions(folderPath='', numberOfTopics=10, numberOfDocuments=3, numberOfSentences=1, topQuestions=10, text='', isText=False):
     """
     Generate questions for a given folder path or text.
@@ -63,7 +148,7 @@ def generate_questions(folderPath='', numberOfTopics=10, numberOfDocuments=3, nu
         sentences, paragraphs = summarization(numberOfTopics, numberOfDocuments, numberOfSentences, folderPath=folderPath, text=text, isText=isText)
         
         # Load the question generation model
-        unigram, bigram, trigram, wordCount, questionTemplates, answerTemplates, questionGuards, answerGuards, questionWordCount, questionCount = QG.loadModel('models\\HireUp_Question_Generation\\Trained_Model_Dev')
+        model = load_QG_model()
         
         # Get the folder name from the folder path
         normalized_path = os.path.normpath(folderPath)
@@ -77,42 +162,7 @@ def generate_questions(folderPath='', numberOfTopics=10, numberOfDocuments=3, nu
         
         # Generate questions for each sentence
         for sentence_idx, sentence in enumerate(sentences):
-            questionsWithScore = []
-            uniqueQuestions = set()
-            
-            # Get the sentence structure
-            doc, results = QG.getSentenceStructure(sentence)
-            
-            # Skip if the sentence structure is not available
-            if results is None:
-                continue
-            
-            # Generate questions for each question template
-            for i in range(len(questionTemplates)):
-                question = QG.generateQuestion(sentence, questionTemplates[i], questionGuards[i])
-                
-                # Skip if the question is already generated
-                if question in uniqueQuestions:
-                    continue
-                
-                answer = QG.generateQuestion(sentence, answerTemplates[i], answerGuards[i])
-                
-                # Add the question-answer pair to the list if both question and answer are generated
-                if question is not None and answer is not None:
-                    score = myScore(questionTemplates[i], question, answer) + 0.6 * QG.calculateScore(question, unigram, bigram, trigram, wordCount, answer, questionWordCount, questionCount)
-                    questionsWithScore.append((question, answer, score))
-                    uniqueQuestions.add(question)
-            
-            # Sort the questions based on score in descending order
-            questionsWithScore.sort(key=lambda x: x[2], reverse=True)
-            
-            # Select the top questions
-            length = min(topQuestions, len(questionsWithScore))
-            question_list = []
-            for i in range(length):
-                print(questionsWithScore[i][0])   
-                print("Answer: ", questionsWithScore[i][1])
-                question_list.append(questionsWithScore[i][0])
+            question_list = generate_sentence_questions(sentence, model, topQuestions)
             
             # Add the questions and answer to the result dictionary
             if question_list:
@@ -129,59 +179,324 @@ def generate_questions(folderPath='', numberOfTopics=10, numberOfDocuments=3, nu
         print(f"An unexpected error occurred: {e}")
 
         
-def wait_for_express_server():
-    print("Waiting for the Express server to start...")
-    while True:
-        try:
-            # Get the address of the Express server from the environment variable
-            express_server_address = os.getenv('EXPRESS_SERVER_ADDRESS', 'http://localhost:3000')
-            # Send a GET request to the Express server
-            response = requests.get(express_server_address)
-            if response.status_code == 200:
-                print("Express server started.")
-                break
-        except requests.exceptions.ConnectionError:
-            pass
-        time.sleep(1)
-        
-def login():
-    # Get the address of the Express server from the environment variable
-    express_server_address = os.getenv('EXPRESS_SERVER_ADDRESS', 'http://localhost:3000')
-    # Get the login credentials from the environment variables
-    email = os.getenv('EXPRESS_SERVER_EMAIL', 'email@example.com')
-    password = os.getenv('EXPRESS_SERVER_PASSWORD', 'password')
-    # Send a POST request to the Express server to login
-    response = requests.post(f"{express_server_address}/account/logIn", json={"email": email, "password": password})
-    if response.status_code == 200:
-        print("Login successful.")
-        return response.json().get('token')
-    else:
-        print("Login failed.")
-        
-def send_topic(topic, token):
-    # Get the address of the Express server from the environment variable
-    express_server_address = os.getenv('EXPRESS_SERVER_ADDRESS', 'http://localhost:3000')
-    # Send a POST request to the Express server to add the topic
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.post(f"{express_server_address}/topic", json={"name": topic['name'], "questions": topic['questions']}, headers=headers)
-    if response.status_code == 201:
-        print(f"Topic '{topic['name']}' added successfully.")
+def report_progress(topic_name, stage, detail=''):
+    """
+    Report the progress of a topic, to the scheduler if the topic runs in a worker process.
+
+    Parameters:
+    topic_name (str): The name of the topic.
+    stage (str): The stage the topic is in.
+    detail (str): An optional detail about the stage.
+    """
+    if progress_queue is not None:
+        progress_queue.put((topic_name, stage, detail, time.time()))
     else:
-        print(response)
-        print(f"Failed to add topic '{topic['name']}'.")
+        print(f"[{topic_name}] {stage} {detail}".rstrip())
+
+def prepare_topic(subdir_path, pdf_workers=None, numberOfTopics=10, numberOfDocuments=3, numberOfSentences=1, topQuestions=10):
+    """
+    Compute the questions of a topic incrementally.
+
+    Every stage (extraction, correction, embeddings) is computed only for the PDF files that are new or changed since the last run,
+    and is recorded in the manifest of the topic as soon as it is done, so an interrupted run resumes where it stopped.
+    The questions of the sentences that were already summarized are reused.
+
+    Parameters:
+    subdir_path (str): The path to the topic folder containing the PDF files.
+    pdf_workers (int): The number of processes used to extract the text of the PDF files. Defaults to PDF_EXTRACTION_WORKERS.
+    numberOfTopics (int): The number of topics to generate questions for.
+    numberOfDocuments (int): The number of documents to consider for each topic.
+    numberOfSentences (int): The number of sentences to consider for each document.
+    topQuestions (int): The number of top questions to select for each sentence.
+
+    Returns:
+    dict: The manifest of the topic.
+    list: The (sentence, question) pairs of the topic, or None if the topic is up to date or empty.
+    str: The fingerprint of the content of the topic folder.
+    """
+    topic_name = os.path.basename(os.path.normpath(subdir_path))
+    manifest = Topic_Manifest.load_manifest(topic_name)
+    backend = Embeddings.BACKEND
+
+    # Get the content hash of every PDF file of the topic
+    file_names = sorted(f for f in os.listdir(subdir_path) if os.path.isfile(os.path.join(subdir_path, f)))
+    file_paths = [os.path.join(subdir_path, f) for f in file_names]
+    file_hashes = [get_file_fingerprint(file_path) for file_path in file_paths]
+
+    # Skip the topic if none of its files changed and all its questions were sent
+    fingerprint = Topic_Manifest.get_fingerprint(file_names, file_hashes)
+    if manifest['fingerprint'] == fingerprint and manifest['created']:
+        report_progress(topic_name, 'up to date')
+        return manifest, None, fingerprint
+
+    # Forget the files that were removed from the topic
+    for file_name in list(manifest['files']):
+        if file_name not in file_names:
+            del manifest['files'][file_name]
+
+    # Extraction: extract the text of the new or changed files in parallel
+    pending = [i for i in range(len(file_names)) if not Topic_Manifest.is_stage_done(manifest, file_names[i], file_hashes[i], 'extraction')]
+    report_progress(topic_name, 'extraction', f'{len(pending)}/{len(file_names)} files')
+    extract_texts_from_pdfs([file_paths[i] for i in pending], workers=pdf_workers or PDF_EXTRACTION_WORKERS)
+    for i in pending:
+        Topic_Manifest.mark_stage_done(manifest, file_names[i], file_hashes[i], 'extraction')
+
+    # Correction: split the text into documents and correct them
+    for i in range(len(file_names)):
+        if not Topic_Manifest.is_stage_done(manifest, file_names[i], file_hashes[i], 'correction'):
+            report_progress(topic_name, 'correction', file_names[i])
+            documents = list(iterDocuments_from_text(extract_text_from_pdf(file_paths[i])))
+            with open(Topic_Manifest.get_stage_path(file_hashes[i], 'correction'), 'w', encoding='utf-8') as f:
+                json.dump(documents, f)
+            Topic_Manifest.mark_stage_done(manifest, file_names[i], file_hashes[i], 'correction')
+
+    # Embeddings: embed the preprocessed documents
+    original_documents = []
+    documentsEmbeddings = []
+    for i in range(len(file_names)):
+        with open(Topic_Manifest.get_stage_path(file_hashes[i], 'correction'), 'r', encoding='utf-8') as f:
+            documents = json.load(f)
+        if not documents:
+            continue
+        embeddings_path = Topic_Manifest.get_stage_path(file_hashes[i], 'embeddings', backend)
+        if not Topic_Manifest.is_stage_done(manifest, file_names[i], file_hashes[i], 'embeddings', backend):
+            report_progress(topic_name, 'embeddings', file_names[i])
+            np.save(embeddings_path, Embeddings.getDocumentsVector(Corpus().extend(documents).preprocessed_documents, backend=backend))
+            Topic_Manifest.mark_stage_done(manifest, file_names[i], file_hashes[i], 'embeddings')
+        original_documents.extend(documents)
+        documentsEmbeddings.append(np.load(embeddings_path))
+
+    if not original_documents:
+        report_progress(topic_name, 'empty')
+        return manifest, None, fingerprint
+
+    # Summarize the documents of all the files of the topic
+    report_progress(topic_name, 'summarization', f'{len(original_documents)} documents')
+    sentences, paragraphs = summarizeDocuments(original_documents, np.vstack(documentsEmbeddings), numberOfTopics, numberOfDocuments, numberOfSentences)
+
+    # Questions: generate the questions of the sentences that were not summarized before
+    model = load_QG_model()
+    questions = []
+    for sentence, paragraph in zip(sentences, paragraphs):
+        if sentence not in manifest['sentences']:
+            report_progress(topic_name, 'questions', f'{len(questions) + 1}/{len(sentences)} sentences')
+            manifest['sentences'][sentence] = generate_sentence_questions(sentence, model, topQuestions)
+            Topic_Manifest.save_manifest(manifest)
+        if manifest['sentences'][sentence]:
+            questions.append((sentence, {"question": manifest['sentences'][sentence], "answer": paragraph}))
 
-# Main function to check directories and call generate_questions
+    # Forget the questions of the sentences that are no longer summarized, e.g. from a changed or removed file
+    current = set(sentences)
+    if any(sentence not in current for sentence in manifest['sentences']):
+        manifest['sentences'] = {sentence: question for sentence, question in manifest['sentences'].items() if sentence in current}
+        Topic_Manifest.save_manifest(manifest)
+
+    report_progress(topic_name, 'prepared', f'{len(questions)} questions')
+    return manifest, questions, fingerprint
+
+def record_topic(manifest, questions, fingerprint, sent):
+    """
+    Record the questions of a topic that reached the Express server and write its manifest.
+
+    Parameters:
+    manifest (dict): The manifest of the topic.
+    questions (list): The (sentence, question) pairs of the topic.
+    fingerprint (str): The fingerprint of the content of the topic folder.
+    sent (set): The sentences whose questions were sent.
+    """
+    manifest['sent'] = sorted(sent)
+    # Record the content of the topic only once all its questions reached the Express server
+    if manifest['created'] and all(sentence in sent for sentence, _ in questions):
+        manifest['fingerprint'] = fingerprint
+    Topic_Manifest.save_manifest(manifest)
+
+def publish_topics(prepared_topics, client):
+    """
+    Send the prepared topics to the Express server.
+    The new topics are created in a single request, and only the new questions of the existing topics are sent.
+
+    Parameters:
+    prepared_topics (list): The (manifest, questions, fingerprint, adopt) tuples of the topics, where adopt is True if the topic
+        was populated before the manifests existed. The current questions of an adopted topic are recorded as sent without sending them.
+    client (Express_Client.ExpressClient): The client of the Express server.
+
+    Returns:
+    list: The updated manifests of the topics.
+    """
+    new_topics = []
+    for manifest, questions, fingerprint, adopt in prepared_topics:
+        topic_name = manifest['name']
+        sent = set(manifest['sent'])
+        if not manifest['created'] and adopt:
+            print(f"Topic '{topic_name}' was populated before, recording its questions as sent.")
+            manifest['created'] = True
+            sent.update(sentence for sentence, _ in questions)
+        elif not manifest['created']:
+            new_topics.append((manifest, questions, fingerprint))
+            continue
+        else:
+            new_questions = [(sentence, question) for sentence, question in questions if sentence not in sent]
+            if not new_questions or client.send_topic_questions(topic_name, [question for _, question in new_questions]):
+                sent.update(sentence for sentence, _ in new_questions)
+        record_topic(manifest, questions, fingerprint, sent)
+
+    # Create all the new topics in a single request
+    if new_topics:
+        created, existing = client.send_topics([{"name": manifest['name'], "questions": [question for _, question in questions]} for manifest, questions, _ in new_topics])
+        for manifest, questions, fingerprint in new_topics:
+            sent = set(manifest['sent'])
+            if manifest['name'] in created:
+                manifest['created'] = True
+                sent.update(sentence for sentence, _ in questions)
+            elif manifest['name'] in existing:
+                # Adopt the topic created on the server by a previous run, and add its questions the server does not have yet
+                print(f"Topic '{manifest['name']}' already exists, adding its missing questions.")
+                manifest['created'] = True
+                new_questions = [(sentence, question) for sentence, question in questions if sentence not in sent]
+                if not new_questions or client.send_topic_questions(manifest['name'], [question for _, question in new_questions]):
+                    sent.update(sentence for sentence, _ in new_questions)
+            record_topic(manifest, questions, fingerprint, sent)
+
+    return [manifest for manifest, _, _, _ in prepared_topics]
+
+def populate_topic(subdir_path, client, adopt=False, **kwargs):
+    """
+    Populate a topic incrementally in the current process.
+
+    Parameters:
+    subdir_path (str): The path to the topic folder containing the PDF files.
+    client (Express_Client.ExpressClient): The client of the Express server.
+    adopt (bool): True if the topic was populated before the manifests existed.
+    **kwargs: The summarization and question generation parameters of prepare_topic.
+
+    Returns:
+    dict: The manifest of the topic.
+    """
+    manifest, questions, fingerprint = prepare_topic(subdir_path, **kwargs)
+    if questions is None:
+        return manifest
+    return publish_topics([(manifest, questions, fingerprint, adopt)], client)[0]
+
+def init_topic_worker(queue):
+    """
+    Initialize a topic worker process.
+    Every worker holds its own embedding model, LanguageTool server (started when Text_Summarization is imported) and QG model.
+
+    Parameters:
+    queue: The queue used to report the progress of the topics to the scheduler.
+    """
+    global progress_queue
+    progress_queue = queue
+    Embeddings.load_model()
+    load_QG_model()
+
+def print_progress(queue, topic_names):
+    """
+    Print the progress reported by the topic workers until None is received.
+
+    Parameters:
+    queue: The queue the workers report their progress to.
+    topic_names (list): The names of the scheduled topics.
+    """
+    stages = {topic_name: 'waiting' for topic_name in topic_names}
+    while True:
+        report = queue.get()
+        if report is None:
+            break
+        topic_name, stage, detail, _ = report
+        stages[topic_name] = f"{stage} {detail}".rstrip()
+        done = sum(1 for status in stages.values() if status.startswith(('prepared', 'up to date', 'empty')))
+        print(f"[{done}/{len(stages)}] {topic_name}: {stages[topic_name]}")
+
+def populate_topics(subdir_paths, client, processed_directories, processed_file, workers=TOPIC_WORKERS):
+    """
+    Populate several topics concurrently across a bounded pool of worker processes.
+
+    The workers run the CPU-heavy stages of the topics (extraction, correction, embeddings, summarization and question generation)
+    while the scheduler sends the new questions of the existing topics as soon as they are ready. The new topics are created together
+    in a single request at the end of the run.
+
+    Parameters:
+    subdir_paths (list): The paths to the topic folders.
+    client (Express_Client.ExpressClient): The client of the Express server.
+    processed_directories (set): The directories that were already populated.
+    processed_file (str): The file recording the populated directories.
+    workers (int): The number of worker processes.
+
+    Returns:
+    dict: The time taken by each topic, in seconds.
+    """
+    workers = max(1, min(workers, len(subdir_paths)))
+    # Share the cores between the topic workers for the PDF extraction
+    pdf_workers = max(1, (os.cpu_count() or 1) // workers)
+    topic_names = [os.path.basename(os.path.normpath(subdir_path)) for subdir_path in subdir_paths]
+    timings = {}
+
+    manager = multiprocessing.Manager()
+    queue = manager.Queue()
+    printer = threading.Thread(target=print_progress, args=(queue, topic_names), daemon=True)
+    printer.start()
+
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_topic_worker, initargs=(queue,)) as executor:
+        futures = {}
+        for subdir_path, topic_name in zip(subdir_paths, topic_names):
+            adopt = topic_name in processed_directories
+            futures[executor.submit(prepare_topic, subdir_path, pdf_workers)] = (topic_name, adopt)
+
+        # Send the existing topics as soon as they are prepared, and keep the new ones for a single bulk request
+        new_topics = []
+        for future in as_completed(futures):
+            topic_name, adopt = futures[future]
+            try:
+                manifest, questions, fingerprint = future.result()
+            except Exception as e:
+                print(f"Failed to prepare topic '{topic_name}': {e}")
+                continue
+            timings[topic_name] = time.time() - start
+            if questions is None:
+                continue
+            if manifest['created'] or adopt:
+                publish_topics([(manifest, questions, fingerprint, adopt)], client)
+            else:
+                new_topics.append((manifest, questions, fingerprint, adopt))
+            record_processed_directory(manifest, processed_directories, processed_file)
+
+    publish_topics(new_topics, client)
+    for manifest, _, _, _ in new_topics:
+        record_processed_directory(manifest, processed_directories, processed_file)
+
+    queue.put(None)
+    printer.join()
+    manager.shutdown()
+    return timings
+
+def record_processed_directory(manifest, processed_directories, processed_file):
+    """
+    Record a populated directory in the processed file right away.
+
+    Parameters:
+    manifest (dict): The manifest of the topic.
+    processed_directories (set): The directories that were already populated.
+    processed_file (str): The file recording the populated directories.
+    """
+    if manifest['created'] and manifest['name'] not in processed_directories:
+        processed_directories.add(manifest['name'])
+        with open(processed_file, 'a') as f:
+            f.write(f"{manifest['name']}\n")
+
+# Main function to check directories and populate their topics
 def main(base_directory, processed_file):
     
     # Load environment variables from .env file
     load_dotenv()
     
-    wait_for_express_server()
-    
-    token = login()
+    client = Express_Client.get_client()
+    if not client.wait_for_server():
+        return
     
     print(f"Processing directories in {base_directory}...")
-    # Read the list of processed directories from the file
+    # Read the list of directories populated before the manifests existed
     if os.path.exists(processed_file):
         with open(processed_file, 'r') as f:
             processed_directories = set(f.read().splitlines())
@@ -192,23 +507,18 @@ def main(base_directory, processed_file):
     subdirectories = [d for d in os.listdir(base_directory) if os.path.isdir(os.path.join(base_directory, d))]
     print(f"Found {len(subdirectories)} subdirectories.")
 
-    # Process each subdirectory
-    for subdir in subdirectories:
-        if subdir not in processed_directories:
+    if TOPIC_WORKERS > 1 and len(subdirectories) > 1:
+        # Process the subdirectories concurrently
+        timings = populate_topics([os.path.join(base_directory, subdir) for subdir in subdirectories], client, processed_directories, processed_file)
+        for topic_name, elapsed in sorted(timings.items(), key=lambda item: item[1]):
+            print(f"{topic_name}: done after {elapsed:.1f}s")
+    else:
+        # Process each subdirectory, only recomputing its new or changed files
+        for subdir in subdirectories:
             subdir_path = os.path.join(base_directory, subdir)
-            if os.path.exists(subdir_path):
-                print(f"Processing directory: {subdir_path}")
-                topic = generate_questions(folderPath=subdir_path+"\\")
-                print(f"Generated questions for topic: {topic['name']}")
-                send_topic(topic, token)
-                processed_directories.add(subdir)
-            else:
-                print(f"Directory does not exist: {subdir_path}")
-
-    # Write the updated list of processed directories to the file
-    with open(processed_file, 'w') as f:
-        for dir in processed_directories:
-            f.write(f"{dir}\n")
+            print(f"Processing directory: {subdir_path}")
+            manifest = populate_topic(subdir_path, client, adopt=subdir in processed_directories)
+            record_processed_directory(manifest, processed_directories, processed_file)
             
     print("Processing complete.")
 
@@ -216,4 +526,4 @@ def main(base_directory, processed_file):
 base_directory = 'topics_data'
 processed_file = 'topics.txt'
 if __name__ == "__main__":
-    main(base_directory, processed_file)
+    main(base_directory, processed_file)
\ No newline at end of file